@@ -0,0 +1,336 @@
+"""Aggregator for several track controllers on the LAN.
+
+Browses for `_track-api._tcp.local.` services (and/or takes controller URLs
+directly), keeps one pooled keep-alive HTTP client and one results
+WebSocket per track, and merges every track's results and recent history
+into one feed. A scoreboard connects to the aggregator instead of to every
+Pi.
+
+All buffering is bounded: each track keeps its last HISTORY_PER_TRACK heats,
+and each feed subscriber has a queue of SUBSCRIBER_QUEUE_SIZE messages that
+drops its oldest entries if the subscriber falls behind.
+
+Usage:
+    python cli.py aggregate                                  # mDNS discovery
+    python cli.py aggregate -c http://pi-a:8000 -c http://pi-b:8000 --no-discovery
+"""
+
+import json
+import socket
+import asyncio
+import heapq
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional, Set
+
+import httpx
+import websockets
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from zeroconf import ServiceStateChange
+from zeroconf.asyncio import AsyncZeroconf, AsyncServiceBrowser, AsyncServiceInfo
+
+from discovery import SERVICE_TYPE
+
+# Constants
+HISTORY_PER_TRACK = 200        # Recent heats kept per track
+SUBSCRIBER_QUEUE_SIZE = 100    # Pending messages per feed subscriber
+MAX_CONNECTIONS = 32           # Shared HTTP connection pool
+RECONNECT_DELAY_SEC = 2.0
+RESOLVE_TIMEOUT_MS = 3000
+
+
+def _feedKey(item: dict) -> str:
+    """Sort key for merging feeds: heat start time (ISO strings sort by time)."""
+    return item["heat"].get("started_at") or ""
+
+
+class ControllerLink:
+    """One track controller: its tracks, their result streams and recent heats."""
+
+    def __init__(self, name: str, base_url: str, aggregator: "Aggregator"):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.aggregator = aggregator
+        self.track_names: List[str] = []
+        self.heats: Dict[str, Deque[dict]] = {}
+        self.connected_tracks: Set[str] = set()
+        self.is_track_list_known = False
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Discover the controller's tracks and follow each one's results."""
+        track_names = await self._fetchTracks()
+        if track_names is None:
+            # Unreachable for now - follow the default track and ask again on reconnect
+            track_names = [""]
+        self._followTracks(track_names)
+
+    async def _fetchTracks(self) -> Optional[List[str]]:
+        """The controller's track names, or None if it can't be reached."""
+        try:
+            r = await self.aggregator.client.get(f"{self.base_url}/tracks")
+            r.raise_for_status()
+            track_names = [track["name"] for track in r.json()["tracks"]]
+        except httpx.TransportError as e:
+            print(f"[{self.name}] Unreachable ({e}), will fetch its tracks on reconnect")
+            return None
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            # Older single-track controller (no /tracks) - follow its default track
+            print(f"[{self.name}] No track list ({e}), using the default track")
+            track_names = [""]
+        self.is_track_list_known = True
+        return track_names
+
+    def _followTracks(self, track_names: List[str]):
+        self.track_names = track_names
+        for track_name in track_names:
+            self.heats[track_name] = deque(maxlen=HISTORY_PER_TRACK)
+            self._tasks.append(asyncio.create_task(self._followTrack(track_name)))
+        print(f"[{self.name}] Following {len(track_names)} track(s) at {self.base_url}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _trackPath(self, track_name: str) -> str:
+        return f"/tracks/{track_name}" if track_name else ""
+
+    async def _loadHistory(self, track_name: str):
+        """Seed the track's buffer from its history (fills gaps after a reconnect)."""
+        r = await self.aggregator.client.get(
+            f"{self.base_url}{self._trackPath(track_name)}/history",
+            params={"limit": HISTORY_PER_TRACK},
+        )
+        r.raise_for_status()
+        # History is newest first, the buffer oldest first
+        for heat in reversed(r.json()["heats"]):
+            self._addHeat(track_name, heat)
+
+    def _addHeat(self, track_name: str, heat: dict):
+        """Buffer a result, replacing the entry for its heat_id if there is one.
+
+        A re-run reuses the heat_id, so a result whose ID is already buffered is
+        the newer run and takes the old one's place.
+        """
+        buffer = self.heats[track_name]
+        for i, known in enumerate(buffer):
+            if known["heat_id"] == heat["heat_id"]:
+                buffer[i] = heat
+                return
+        buffer.append(heat)
+
+    async def _followTrack(self, track_name: str):
+        """Keep a results WebSocket open to one track, reconnecting as needed."""
+        ws_url = self.base_url.replace("http", "ws", 1) + f"{self._trackPath(track_name)}/ws/results"
+        while True:
+            if not self.is_track_list_known:
+                # Unreachable at discovery: this may be a multi-track controller
+                track_names = await self._fetchTracks()
+                if track_names is not None and track_names != [""]:
+                    del self.heats[track_name]
+                    self._followTracks(track_names)
+                    return
+            try:
+                async with websockets.connect(ws_url) as ws:
+                    await self._loadHistory(track_name)
+                    self.connected_tracks.add(track_name)
+                    async for message in ws:
+                        event = json.loads(message)
+                        if event.get("type") == "race_result":
+                            self._addHeat(track_name, event["data"])
+                            self.aggregator.publish(self.name, track_name, event["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{self.name}] Track '{track_name or 'default'}' stream lost: {e}")
+            self.connected_tracks.discard(track_name)
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    def getInfo(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.base_url,
+            "tracks": [
+                {"name": track_name, "is_connected": track_name in self.connected_tracks,
+                 "buffered_heats": len(self.heats.get(track_name, ()))}
+                for track_name in self.track_names
+            ],
+        }
+
+
+class Aggregator:
+    """Merges result streams and histories from many track controllers."""
+
+    def __init__(self, static_urls: Optional[List[str]] = None, is_discovery: bool = True):
+        self.static_urls = static_urls or []
+        self.is_discovery = is_discovery
+        self.controllers: Dict[str, ControllerLink] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._zeroconf: Optional[AsyncZeroconf] = None
+        self._browser: Optional[AsyncServiceBrowser] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    # ----- Lifecycle -----
+
+    async def start(self):
+        # One pooled keep-alive client shared by every controller
+        self.client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+        for url in self.static_urls:
+            await self.addController(url, url)
+        if self.is_discovery:
+            self._zeroconf = AsyncZeroconf()
+            self._browser = AsyncServiceBrowser(
+                self._zeroconf.zeroconf, SERVICE_TYPE, handlers=[self._onServiceStateChange]
+            )
+            print(f"Browsing for {SERVICE_TYPE}")
+
+    async def stop(self):
+        if self._browser:
+            await self._browser.async_cancel()
+        if self._zeroconf:
+            await self._zeroconf.async_close()
+        for link in list(self.controllers.values()):
+            await link.stop()
+        self.controllers.clear()
+        if self.client:
+            await self.client.aclose()
+
+    # ----- Controllers -----
+
+    async def addController(self, name: str, base_url: str):
+        """Start following a controller (no-op if already followed at that URL)."""
+        existing = self.controllers.get(name)
+        if existing and existing.base_url == base_url.rstrip("/"):
+            return
+        if existing:
+            await existing.stop()
+        link = ControllerLink(name, base_url, self)
+        self.controllers[name] = link
+        await link.start()
+
+    async def removeController(self, name: str):
+        link = self.controllers.pop(name, None)
+        if link:
+            await link.stop()
+            print(f"[{name}] Controller gone")
+
+    def _onServiceStateChange(self, zeroconf, service_type: str, name: str, state_change: ServiceStateChange):
+        """Zeroconf browser callback (runs on the event loop)."""
+        if state_change is ServiceStateChange.Removed:
+            coro = self.removeController(name.removesuffix("." + service_type))
+        else:
+            coro = self._resolveController(zeroconf, service_type, name)
+        task = asyncio.ensure_future(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _resolveController(self, zeroconf, service_type: str, name: str):
+        info = AsyncServiceInfo(service_type, name)
+        if not await info.async_request(zeroconf, RESOLVE_TIMEOUT_MS) or not info.addresses:
+            print(f"Could not resolve {name}")
+            return
+        address = socket.inet_ntoa(info.addresses[0])
+        await self.addController(name.removesuffix("." + service_type), f"http://{address}:{info.port}")
+
+    # ----- Feed -----
+
+    def publish(self, controller: str, track: str, heat: dict):
+        """Fan a result out to feed subscribers, dropping the oldest if one falls behind."""
+        message = json.dumps({"type": "race_result", "controller": controller, "track": track, "data": heat})
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def getHistory(self, limit: int = 100) -> List[dict]:
+        """Most recent heats across every track, newest first."""
+        streams = [
+            [{"controller": link.name, "track": track_name, "heat": heat} for heat in reversed(heats)]
+            for link in self.controllers.values()
+            for track_name, heats in link.heats.items()
+        ]
+        merged = heapq.merge(*streams, key=_feedKey, reverse=True)
+        return [item for _, item in zip(range(limit), merged)]
+
+
+def MakeAggregatorApp(aggregator: Aggregator) -> FastAPI:
+    """Create the aggregator's API: merged history and a merged results WebSocket."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await aggregator.start()
+        yield
+        await aggregator.stop()
+
+    app = FastAPI(title="Pinewood Derby Track Aggregator", version="1.0.0", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.get("/health")
+    def healthCheck():
+        return {
+            "status": "healthy",
+            "num_controllers": len(aggregator.controllers),
+            "num_subscribers": len(aggregator._subscribers),
+        }
+
+    # Async so they read the buffers on the loop, between the followers' updates
+    @app.get("/controllers")
+    async def getControllers():
+        """List followed controllers and the connection state of each track."""
+        return {"controllers": [link.getInfo() for link in aggregator.controllers.values()]}
+
+    @app.get("/history")
+    async def getHistory(limit: int = 100):
+        """Recent heats from every track, newest first."""
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be positive")
+        heats = aggregator.getHistory(limit)
+        return {"heats": heats, "count": len(heats)}
+
+    @app.websocket("/ws/results")
+    async def resultsWebsocket(websocket: WebSocket):
+        """Merged live results from every track, tagged with controller and track."""
+        await websocket.accept()
+        queue = aggregator.subscribe()
+
+        async def forward():
+            while True:
+                await websocket.send_text(await queue.get())
+
+        forward_task = asyncio.create_task(forward())
+        try:
+            while True:
+                data = await websocket.receive_text()
+                try:
+                    if json.loads(data).get("type") == "ping":
+                        await websocket.send_text(json.dumps({"type": "pong"}))
+                except json.JSONDecodeError:
+                    pass
+        except WebSocketDisconnect:
+            pass
+        finally:
+            forward_task.cancel()
+            aggregator.unsubscribe(queue)
+
+    return app
@@ -0,0 +1,257 @@
+"""Compressed, time-partitioned archive of older heat results.
+
+Heats that age out of the hot history are written to immutable segment
+files, one per day of racing per archive batch:
+
+    heat_archive/
+        2024-01-15-000003.seg        # zlib-compressed blocks of NDJSON heats
+        2024-01-15-000003.idx.json   # block offsets, time ranges and heat IDs
+
+Each block is compressed on its own, so a lookup by heat_id or date range
+only decompresses the blocks it needs. The index is written last; a segment
+without one is an interrupted write and is ignored. Both files and the
+directory entry are fsynced before archiveHeats returns, so the caller can
+drop its own copies.
+
+Reads may come from threadpool routes while a save archives a batch in
+another thread; loading the indexes and registering segments take a lock.
+"""
+
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Constants
+ARCHIVE_DIR = "heat_archive"
+BLOCK_SIZE = 64          # Heats per compressed block
+COMPRESSION_LEVEL = 6
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx.json"
+
+
+def _dayOf(heat: dict) -> str:
+    """Partition key for a heat: the date it started (YYYY-MM-DD)."""
+    return str(heat.get("started_at", ""))[:10] or "undated"
+
+
+def _fsyncDir(path: str):
+    """Make renames in a directory durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _parseTime(value: str) -> Optional[datetime]:
+    """Parse an ISO timestamp, ignoring timezone so naive and aware values compare."""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def _overlaps(start: Optional[str], end: Optional[str],
+              range_start: Optional[datetime], range_end: Optional[datetime]) -> bool:
+    """Check if [start, end] overlaps the requested range (open ends match anything)."""
+    block_start = _parseTime(start)
+    block_end = _parseTime(end)
+    if range_start and block_end and block_end < range_start:
+        return False
+    if range_end and block_start and block_start > range_end:
+        return False
+    return True
+
+
+class HeatArchive:
+    """Read/append access to the archive segments in a directory."""
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self.segments: List[dict] = []
+        self._locations: Dict[str, Tuple[int, int]] = {}  # heat_id -> (segment, block)
+        self._next_seq = 0
+        self._is_loaded = False
+        self._lock = threading.Lock()
+
+    def _loadIndexes(self):
+        """Load every segment index (but no heat bodies) on first use.
+
+        Deferred so startup time doesn't grow with the size of the archive.
+        Marked loaded only once every index is in, so concurrent first
+        readers wait rather than see a partial archive.
+        """
+        if self._is_loaded:
+            return
+        with self._lock:
+            if not self._is_loaded:
+                self._loadAllIndexes()
+                self._is_loaded = True
+
+    def _loadAllIndexes(self):
+        if not os.path.isdir(self.archive_dir):
+            return
+
+        for name in sorted(os.listdir(self.archive_dir)):
+            if not name.endswith(INDEX_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.archive_dir, name), "r") as f:
+                    index = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Skipping unreadable archive index {name}: {e}")
+                continue
+            self._registerSegment(index)
+
+        # Keep lookups deterministic: later segments win for duplicate heat_ids
+        self.segments.sort(key=lambda s: s["seq"])
+        self._locations = {}
+        for seg_idx, segment in enumerate(self.segments):
+            for block_idx, block in enumerate(segment["blocks"]):
+                for heat_id in block["heat_ids"]:
+                    self._locations[heat_id] = (seg_idx, block_idx)
+
+    def _addSegment(self, index: dict):
+        """Register a newly written segment index in memory."""
+        with self._lock:
+            self._registerSegment(index)
+
+    def _registerSegment(self, index: dict):
+        seg_idx = len(self.segments)
+        self.segments.append(index)
+        self._next_seq = max(self._next_seq, index["seq"] + 1)
+        for block_idx, block in enumerate(index["blocks"]):
+            for heat_id in block["heat_ids"]:
+                self._locations[heat_id] = (seg_idx, block_idx)
+
+    def __len__(self) -> int:
+        self._loadIndexes()
+        return len(self._locations)
+
+    def __contains__(self, heat_id: str) -> bool:
+        self._loadIndexes()
+        return heat_id in self._locations
+
+    # ----- Writes -----
+
+    def archiveHeats(self, heats: List[dict]):
+        """Write heats (oldest first) to new segments, one per day."""
+        self._loadIndexes()
+        by_day: Dict[str, List[dict]] = {}
+        for heat in heats:
+            by_day.setdefault(_dayOf(heat), []).append(heat)
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for day, day_heats in by_day.items():
+            self._writeSegment(day, day_heats)
+
+    def _writeSegment(self, day: str, heats: List[dict]):
+        """Write one immutable segment and its index."""
+        name = f"{day}-{self._next_seq:06d}"
+        segment_path = os.path.join(self.archive_dir, name + SEGMENT_SUFFIX)
+        index_path = os.path.join(self.archive_dir, name + INDEX_SUFFIX)
+
+        blocks = []
+        offset = 0
+        temp_path = f"{segment_path}.tmp"
+        with open(temp_path, "wb") as f:
+            for i in range(0, len(heats), BLOCK_SIZE):
+                chunk = heats[i:i + BLOCK_SIZE]
+                payload = "\n".join(json.dumps(h, default=str) for h in chunk).encode("utf-8")
+                data = zlib.compress(payload, COMPRESSION_LEVEL)
+                f.write(data)
+                blocks.append({
+                    "offset": offset,
+                    "length": len(data),
+                    "start": min(str(h.get("started_at")) for h in chunk),
+                    "end": max(str(h.get("started_at")) for h in chunk),
+                    "heat_ids": [h.get("heat_id") for h in chunk],
+                })
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, segment_path)
+
+        index = {
+            "seq": self._next_seq,
+            "file": name + SEGMENT_SUFFIX,
+            "day": day,
+            "start": min(b["start"] for b in blocks),
+            "end": max(b["end"] for b in blocks),
+            "count": len(heats),
+            "bytes": offset,
+            "blocks": blocks,
+        }
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, index_path)
+        _fsyncDir(self.archive_dir)
+
+        self._addSegment(index)
+        print(f"Archived {len(heats)} heats to {name + SEGMENT_SUFFIX} ({offset} bytes)")
+
+    # ----- Reads -----
+
+    def _readBlock(self, segment: dict, block: dict) -> List[dict]:
+        """Decompress and decode a single block."""
+        with open(os.path.join(self.archive_dir, segment["file"]), "rb") as f:
+            f.seek(block["offset"])
+            data = f.read(block["length"])
+        payload = zlib.decompress(data).decode("utf-8")
+        return [json.loads(line) for line in payload.split("\n") if line]
+
+    def getHeat(self, heat_id: str) -> Optional[dict]:
+        """Get an archived heat by ID, decompressing only its block."""
+        self._loadIndexes()
+        location = self._locations.get(heat_id)
+        if location is None:
+            return None
+        segment = self.segments[location[0]]
+        for heat in self._readBlock(segment, segment["blocks"][location[1]]):
+            if heat.get("heat_id") == heat_id:
+                return heat
+        return None
+
+    def iterRange(self, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield archived heats that started within [start, end], oldest first.
+
+        Segments and blocks outside the range are skipped without reading them.
+        """
+        self._loadIndexes()
+        start = start.replace(tzinfo=None) if start else None
+        end = end.replace(tzinfo=None) if end else None
+
+        for seg_idx, segment in sorted(enumerate(self.segments), key=lambda s: s[1]["start"]):
+            if not _overlaps(segment["start"], segment["end"], start, end):
+                continue
+            for block_idx, block in enumerate(segment["blocks"]):
+                if not _overlaps(block["start"], block["end"], start, end):
+                    continue
+                for heat in self._readBlock(segment, block):
+                    # Skip copies superseded by a later segment
+                    if self._locations.get(heat.get("heat_id")) != (seg_idx, block_idx):
+                        continue
+                    started_at = _parseTime(str(heat.get("started_at")))
+                    if start and started_at and started_at < start:
+                        continue
+                    if end and started_at and started_at > end:
+                        continue
+                    yield heat
+
+    def getSummary(self) -> List[dict]:
+        """Describe archive segments without their block lists."""
+        self._loadIndexes()
+        return [
+            {k: v for k, v in segment.items() if k != "blocks"}
+            for segment in self.segments
+        ]
@@ -6,49 +6,217 @@ Usage:
     python cli.py serve
     python cli.py serve --mock
     
+    # Split mode: hardware daemon + several API workers
+    python cli.py daemon --mock
+    python cli.py serve --workers 2 --daemon /tmp/track-hardware.sock
+    
     # In another terminal, run commands:
     python cli.py health
     python cli.py gate up|down
     python cli.py race <heat_id> <lanes>   # e.g., race heat-1 1,2,3,4
+    python cli.py race heat-2 1,2 --countdown 3000   # displays count down 3s to the drop
+    python cli.py race heat-3 1,2 --tie-ms 1  # finishes within 1ms share a place
+    python cli.py policy margin --margin 1500  # end heats 1.5s after the leader
+    python cli.py pipeline                  # post-race queue and heat turnaround
+    python cli.py pipeline --retry          # retry heats that failed to save
     python cli.py servo test <angle>
     python cli.py servo calibrate <up> <down>
+    python cli.py servo release             # measure gate release latency
+    python cli.py sensors health
+    python cli.py sensors filter --min-pulse 2000 --confirm 3 5
     python cli.py history
+    python cli.py export heats.csv.gz --start 2026-03-01   # .ndjson/.csv, optional .gz
+    
+    # Soak test a (mock) server: how many displays can one Pi feed?
+    python cli.py load --status 20 --results 20 --pollers 5 --races 1 --duration 600
+    
+    # The real timing code on simulated GPIO (see simhw.py): serve it, or benchmark its accuracy
+    python cli.py serve --sim
+    python cli.py simbench --heats 20 --load 2 --bounce-us 300 --min-pulse-us 1000
+    
+    # Several tracks from one controller (see tracks.py)
+    python cli.py serve --config tracks.json
+    python cli.py tracks
+    python cli.py --track blue race heat-1 1,2
+    
+    # Interactive session (one kept-alive connection) and live terminal view
+    python cli.py shell
+    python cli.py watch
+    
+    # One merged feed for every controller on the LAN (see aggregator.py)
+    python cli.py aggregate
+    python cli.py aggregate -c http://localhost:8000 -c http://localhost:8001 --no-discovery
 """
 
 import argparse
 import sys
 import os
 import json
-import httpx
+import time
+from contextlib import nullcontext
+
+# httpx, websockets and the server modules are imported by the commands that
+# need them, so one-shot commands and --help start quickly
 
 DEFAULT_HOST = "http://localhost:8000"
+WATCH_STATUS_HZ = 10    # Status line refresh rate requested by `watch`
+TIME_SYNC_SAMPLES = 8   # time_sync pings per connection; the lowest round trip wins
+TIME_SYNC_INTERVAL_SEC = 0.05
 
+# Pooled client kept open by `shell`; one-shot commands create their own
+_session_client = None
 
-def getClient():
-    """Get HTTP client with base URL from env or default."""
-    base_url = os.environ.get("PI_API_URL", DEFAULT_HOST)
+
+def getBaseUrl(is_track_scoped: bool = True) -> str:
+    """API base URL from env or default, scoped to PI_TRACK if set."""
+    base_url = os.environ.get("PI_API_URL", DEFAULT_HOST).rstrip("/")
+    track_name = os.environ.get("PI_TRACK")
+    if track_name and is_track_scoped:
+        base_url = f"{base_url}/tracks/{track_name}"
+    return base_url
+
+
+def getWsUrl(path: str) -> str:
+    """WebSocket URL for a track-scoped path."""
+    return getBaseUrl().replace("http", "ws", 1) + path
+
+
+def getClient(is_track_scoped: bool = True):
+    """Get HTTP client for a command (the shell's session client, left open, if in a session)."""
+    base_url = getBaseUrl(is_track_scoped)
+    if _session_client is not None:
+        # Same origin, so switching tracks keeps the pooled connection
+        _session_client.base_url = base_url
+        return nullcontext(_session_client)
+    import httpx
     return httpx.Client(base_url=base_url, timeout=60.0)
 
 
+def formatSpeed(speed_mps) -> str:
+    return f" @ {speed_mps:.2f}m/s" if speed_mps is not None else ""
+
+
+def formatLaneResults(result: dict) -> list:
+    """One line per lane: time and place, DNF or unoccupied; splits underneath, ties at the end."""
+    lines = []
+    for lane in result["lane_results"]:
+        if lane["finish_time_ms"] is not None:
+            tie = " TIE" if lane.get("is_tie") else ""
+            uncertainty_ms = lane.get("finish_uncertainty_ms")
+            uncertainty = f" [-{uncertainty_ms:.3f}]" if uncertainty_ms is not None else ""
+            lines.append(f"  Lane {lane['lane_number']}: {lane['finish_time_ms']:.2f}ms{uncertainty} (#{lane['place']}{tie})"
+                         f"{formatSpeed(lane.get('finish_speed_mps'))}")
+        elif lane["is_dnf"]:
+            lines.append(f"  Lane {lane['lane_number']}: DNF")
+        else:
+            lines.append(f"  Lane {lane['lane_number']}: --")
+        splits = lane.get("splits") or []
+        if splits:
+            lines.append("      " + "  ".join(
+                f"{split['name']} {split['time_ms']:.2f}ms{formatSpeed(split['speed_mps'])}"
+                if split["time_ms"] is not None else f"{split['name']} --"
+                for split in splits
+            ))
+    for tie in result.get("ties") or []:
+        evidence = ", ".join(
+            f"lane {finish['lane_number']} at {finish['edge_ns'] / 1_000_000:.3f}ms "
+            f"(clear {finish['window_ns'] / 1_000_000:.3f}ms before)"
+            for finish in tie["evidence"]
+        )
+        lines.append(f"  📸 Tie for #{tie['place']}, {tie['spread_ms']:.3f}ms apart - re-run? {evidence}")
+    return lines
+
+
+def formatSplitEvent(event: dict) -> str:
+    """A live split from /ws/results."""
+    return (f"  ⏱  Lane {event['lane']} {event['point']}: {event['time_ms']:.2f}ms"
+            f"{formatSpeed(event['speed_mps'])}")
+
+
 def cmdServe(args):
     """Start the API server."""
     if args.mock:
         os.environ["MOCK_HARDWARE"] = "1"
+    if args.sim:
+        os.environ["SIM_HARDWARE"] = "1"
     os.environ["NUM_TRACKS"] = str(args.tracks)
     os.environ["API_PORT"] = str(args.port)
+    if args.config:
+        os.environ["TRACKS_CONFIG"] = os.path.abspath(args.config)
+    if args.daemon:
+        os.environ["HARDWARE_DAEMON_SOCKET"] = args.daemon
     
+    import_start_ns = time.monotonic_ns()
     import uvicorn
-    from main import app
     
-    mode = "MOCK" if args.mock else "REAL HARDWARE"
+    if args.daemon:
+        mode = f"DAEMON {args.daemon}"
+    else:
+        mode = "MOCK" if args.mock else "SIMULATED GPIO" if args.sim else "REAL HARDWARE"
     print(f"\n🏎️  Starting Pi Track Controller ({mode})")
-    print(f"   Tracks: {args.tracks}")
+    print(f"   Tracks: {args.config or args.tracks}")
     print(f"   Port: {args.port}")
     print(f"   URL: http://localhost:{args.port}\n")
     
+    if args.workers > 1:
+        # Each worker process imports the app itself
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        uvicorn.run("main:app", host="0.0.0.0", port=args.port, workers=args.workers, app_dir=app_dir)
+        return
+    
+    from main import app, startup
+    startup.record("imports", (time.monotonic_ns() - import_start_ns) / 1_000_000)
+    startup.onComplete(printStartupTimings)
+    
     uvicorn.run(app, host="0.0.0.0", port=args.port)
 
 
+def cmdDaemon(args):
+    """Start the hardware daemon (owns GPIO, servo and race timing)."""
+    if args.mock:
+        os.environ["MOCK_HARDWARE"] = "1"
+    if args.sim:
+        os.environ["SIM_HARDWARE"] = "1"
+    os.environ["NUM_TRACKS"] = str(args.tracks)
+    os.environ["HARDWARE_DAEMON_SOCKET"] = args.socket
+    if args.config:
+        os.environ["TRACKS_CONFIG"] = os.path.abspath(args.config)
+    if args.cpu is not None:
+        os.environ["DAEMON_CPU"] = str(args.cpu)
+    
+    import daemon
+    print(f"\n🔧 Starting hardware daemon on {args.socket}\n")
+    daemon.run()
+
+
+def cmdAggregate(args):
+    """Start the aggregator (merged results from every track controller)."""
+    import uvicorn
+    from aggregator import Aggregator, MakeAggregatorApp
+    
+    if not args.controller and args.no_discovery:
+        print("❌ Nothing to aggregate: pass --controller URLs or allow discovery")
+        sys.exit(1)
+    
+    print(f"\n📡 Starting aggregator on port {args.port}")
+    print(f"   Discovery: {'off' if args.no_discovery else 'mDNS'}")
+    for url in args.controller or []:
+        print(f"   Controller: {url}")
+    print()
+    
+    aggregator = Aggregator(args.controller, is_discovery=not args.no_discovery)
+    uvicorn.run(MakeAggregatorApp(aggregator), host="0.0.0.0", port=args.port)
+
+
+def printStartupTimings(tracker):
+    """Print the startup timing breakdown once every subsystem has finished."""
+    print("\n⏱️  Startup timing:")
+    for name, duration_ms in tracker.timings_ms.items():
+        state = tracker.states.get(name, "")
+        print(f"   {name:<10} {duration_ms:>8.1f}ms  {state}")
+    print()
+
+
 def cmdHealth(args):
     """Check API health."""
     with getClient() as client:
@@ -58,6 +226,19 @@ def cmdHealth(args):
         print(json.dumps(data, indent=2))
 
 
+def cmdTracks(args):
+    """List tracks hosted by the controller."""
+    with getClient(is_track_scoped=False) as client:
+        r = client.get("/tracks")
+        r.raise_for_status()
+        data = r.json()
+        for track in data["tracks"]:
+            gate = "DOWN" if track["is_gate_down"] else "UP"
+            default = " (default)" if track["is_default"] else ""
+            print(f"  {track['name']}{default}: {track['num_lanes']} lanes, "
+                  f"servo ch {track['servo_channel']}, gate {gate}")
+
+
 def cmdGate(args):
     """Get or set gate position."""
     with getClient() as client:
@@ -80,24 +261,64 @@ def cmdRace(args):
         print(f"🏁 Starting race: heat={args.heat_id}, lanes={lanes}")
         r = client.post("/race/run", json={
             "heat_id": args.heat_id,
-            "occupied_lanes": lanes
+            "occupied_lanes": lanes,
+            "countdown_ms": args.countdown,
+            "tie_threshold_ms": args.tie_ms,
         })
         r.raise_for_status()
         result = r.json()
         
         print(f"\n📊 Results for {result['heat_id']}:")
         print("-" * 40)
-        
-        for lane in result["lane_results"]:
-            if lane["finish_time_ms"] is not None:
-                print(f"  Lane {lane['lane_number']}: {lane['finish_time_ms']:.2f}ms (#{lane['place']})")
-            elif lane["is_dnf"]:
-                print(f"  Lane {lane['lane_number']}: DNF")
-            else:
-                print(f"  Lane {lane['lane_number']}: --")
+        print("\n".join(formatLaneResults(result)))
         print()
 
 
+def cmdPolicy(args):
+    """Get or set the heat finish policy."""
+    with getClient() as client:
+        r = client.get("/race/policy")
+        r.raise_for_status()
+        data = r.json()
+        updates = {"mode": args.mode, "margin_ms": args.margin, "factor": args.factor, "quantile": args.quantile}
+        updates = {key: value for key, value in updates.items() if value is not None}
+        if updates:
+            settings = {key: data[key] for key in ("mode", "margin_ms", "factor", "quantile")}
+            r = client.post("/race/policy", json={**settings, **updates})
+            r.raise_for_status()
+            data = r.json()
+        
+        print(f"Finish policy: {data['mode']}  (margin {data['margin_ms']:.0f}ms, factor {data['factor']}, "
+              f"quantile {data['quantile']}, timeout {data['timeout_ms'] / 1000:.0f}s)")
+        learned = data["learned_deadline_ms"]
+        print(f"Learned deadline: {'-' if learned is None else f'{learned:.0f}ms'} "
+              f"from {data['learned_samples']} recent finishes")
+
+
+def cmdPipeline(args):
+    """Show the post-race pipeline and turnaround between heats."""
+    def ms(value) -> str:
+        return "-" if value is None else f"{value:.1f}ms"
+    
+    with getClient() as client:
+        if args.retry:
+            r = client.post("/race/pipeline/retry")
+        else:
+            r = client.get("/race/pipeline")
+        r.raise_for_status()
+        data = r.json()
+    
+    print(f"Ready for next heat: {'yes' if data['is_ready'] else 'no (timing)'}")
+    print(f"Post-race queue: {data['pending']} pending, {data['processed']} done, {data['failed']} failed"
+          f" (last: {data['last_heat_id'] or '-'})")
+    if data["persist_failed"]:
+        print(f"Not saved: {', '.join(data['persist_failed'])} ({data['last_error']})"
+              f" - retry with: python cli.py pipeline --retry")
+    print(f"Hand-off: {ms(data['ready_ms'])} last, {ms(data['avg_ready_ms'])} avg   "
+          f"persist {ms(data['avg_persist_ms'])}, broadcast {ms(data['avg_broadcast_ms'])} avg")
+    print(f"Turnaround: {ms(data['turnaround_ms'])} last, {ms(data['avg_turnaround_ms'])} avg")
+
+
 def cmdServo(args):
     """Servo test and calibration commands."""
     with getClient() as client:
@@ -115,11 +336,55 @@ def cmdServo(args):
             data = r.json()
             print(f"Calibration set: UP={data['up_angle']}°, DOWN={data['down_angle']}°")
         
+        elif args.servo_cmd == "release":
+            print(f"⏱️  Timing {args.cycles} gate drops...")
+            r = client.post("/servo/calibration/release", json={
+                "cycles": args.cycles,
+                "probe_lane": args.probe_lane,
+            })
+            r.raise_for_status()
+            data = r.json()
+            print(f"Release latency: {data['release_latency_ms']}ms (samples {data['samples_ms']})")
+        
         elif args.servo_cmd == "status":
             r = client.get("/servo/calibration")
             r.raise_for_status()
             data = r.json()
             print(f"Calibration: UP={data['up_angle']}°, DOWN={data['down_angle']}°")
+            latency = data.get("release_latency_ms")
+            start = "start sensor" if data.get("has_start_sensor") else "no start sensor"
+            print(f"Release latency: {'not calibrated' if latency is None else f'{latency}ms'} ({start})")
+
+
+def cmdSensors(args):
+    """Sensor filter commands."""
+    with getClient() as client:
+        if args.sensors_cmd == "health":
+            r = client.get("/health")
+            r.raise_for_status()
+            for lane in r.json()["sensors"]:
+                since = lane["sec_since_transition"]
+                print(f"  Lane {lane['lane']}: {lane['status']:<8} {'■' if lane['is_blocked'] else '·'}  "
+                      f"duty {lane['duty_cycle']:.0%}  {lane['transitions_per_min']:.0f} transitions/min  "
+                      f"{lane['glitches_per_min']:.0f} glitches/min  "
+                      f"last change {'never' if since is None else f'{since:.0f}s ago'}")
+        
+        elif args.sensors_cmd == "filter":
+            r = client.get("/sensors/filter")
+            r.raise_for_status()
+            data = r.json()
+            if args.min_pulse is not None or args.confirm:
+                settings = {key: data[key] for key in ("min_pulse_us", "confirm_k", "confirm_n")}
+                if args.min_pulse is not None:
+                    settings["min_pulse_us"] = args.min_pulse
+                if args.confirm:
+                    settings["confirm_k"], settings["confirm_n"] = args.confirm
+                r = client.post("/sensors/filter", json=settings)
+                r.raise_for_status()
+                data = r.json()
+            print(f"Filter: min pulse {data['min_pulse_us']}µs, confirm {data['confirm_k']} of {data['confirm_n']} samples")
+            glitches = ", ".join(f"{lane}: {count}" for lane, count in enumerate(data["glitches"], start=1))
+            print(f"Glitches rejected: {data['total_glitches']} ({glitches})")
 
 
 def cmdHistory(args):
@@ -138,12 +403,317 @@ def cmdHistory(args):
             print(f"  {heat['heat_id']} @ {heat['started_at']}")
 
 
-def main():
+def cmdExport(args):
+    """Stream history to a file (format and compression from the extension)."""
+    path = args.file
+    is_gzip = path.endswith(".gz")
+    export_format = "csv" if path.removesuffix(".gz").endswith(".csv") else "ndjson"
+    params = {"format": export_format, "is_gzip": is_gzip}
+    if args.start:
+        params["start"] = args.start
+    if args.end:
+        params["end"] = args.end
+    
+    with getClient() as client:
+        with client.stream("GET", "/history/export", params=params, timeout=None) as r:
+            r.raise_for_status()
+            num_bytes = 0
+            with open(path, "wb") as f:
+                for chunk in r.iter_raw():
+                    f.write(chunk)
+                    num_bytes += len(chunk)
+    print(f"Exported {num_bytes:,} bytes ({export_format}{', gzip' if is_gzip else ''}) to {path}")
+
+
+def cmdLoad(args):
+    """Run a load/soak test against the server."""
+    import asyncio
+    from loadtest import runLoad
+    
+    base_url = os.environ.get("PI_API_URL", DEFAULT_HOST)
+    print(f"🔥 Load test against {base_url}: {args.status} status, {args.results} results subscribers, "
+          f"{args.pollers} pollers, {args.races} race loops, "
+          f"{f'{args.duration:.0f}s' if args.duration else 'until Ctrl+C'}\n")
+    try:
+        stats = asyncio.run(runLoad(
+            base_url, args.status, args.results, args.pollers, args.races,
+            args.duration, args.report, args.poll_interval, args.limit, args.status_hz,
+        ))
+    except KeyboardInterrupt:
+        return
+    print("\n📊 Final:")
+    print(stats.report())
+
+
+def cmdSimBench(args):
+    """Benchmark RealHardware's timing accuracy on simulated GPIO."""
+    import asyncio
+    from simbench import runBench, formatReport
+    
+    finish_ms = tuple(float(x) for x in args.finish_ms.split("-"))
+    tie_lanes = [int(x.strip()) for x in args.tie_lanes.split(",")] if args.tie_lanes else None
+    print(f"⏱  Simulated timing benchmark: {args.heats} heats, {args.lanes} lanes, {args.load} load threads\n")
+    try:
+        stats = asyncio.run(runBench(
+            args.heats, args.lanes, args.load, not args.no_sampler, not args.no_start_sensor,
+            args.bounce_us, args.glitches, tie_lanes, finish_ms, args.seed, args.min_pulse_us,
+        ))
+    except KeyboardInterrupt:
+        return
+    print("\n📊 Accuracy:")
+    print(formatReport(stats))
+
+
+def reportApiError(e: Exception) -> bool:
+    """Print a friendly message for connection/API errors. Returns False for anything else."""
+    httpx = sys.modules.get("httpx")
+    if httpx is None:
+        return False
+    if isinstance(e, httpx.ConnectError):
+        print(f"❌ Cannot connect to API. Is the server running?")
+        print(f"   Start with: python cli.py serve")
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        print(f"❌ API error: {e.response.status_code}")
+        print(f"   {e.response.text}")
+        return True
+    return False
+
+
+# ----- Interactive Session -----
+
+# Commands that start servers or sessions of their own
+SHELL_EXCLUDED = ("serve", "daemon", "aggregate", "load", "shell", "watch")
+
+
+class ResultsFeed:
+    """Background thread printing results from /ws/results while the shell waits for input."""
+    
+    def __init__(self):
+        self.own_heat_ids = set()  # Heats run from this shell print their own full results
+        self._ws = None
+        self._is_running = True
+        self._thread = None
+    
+    def start(self):
+        import threading
+        self._thread = threading.Thread(target=self._run, name="results-feed", daemon=True)
+        self._thread.start()
+    
+    def reconnect(self):
+        """Drop the connection so the feed follows the current track."""
+        if self._ws:
+            self._ws.close()
+    
+    def stop(self):
+        self._is_running = False
+        self.reconnect()
+    
+    def _run(self):
+        from websockets.sync.client import connect
+        while self._is_running:
+            try:
+                with connect(getWsUrl("/ws/results")) as ws:
+                    self._ws = ws
+                    for message in ws:
+                        event = json.loads(message)
+                        if event.get("type") != "race_result":
+                            continue
+                        result = event["data"]
+                        if result["heat_id"] in self.own_heat_ids:
+                            continue
+                        print(f"\n📣 {result['heat_id']} finished:")
+                        print("\n".join(formatLaneResults(result)))
+            except Exception:
+                time.sleep(1.0)
+            finally:
+                self._ws = None
+
+
+def cmdShell(args):
+    """Interactive session: one kept-alive connection and a live results feed."""
+    global _session_client
+    import shlex
+    import httpx
+    
+    parser = makeParser()
+    _session_client = httpx.Client(timeout=60.0)
+    feed = ResultsFeed()
+    feed.start()
+    
+    print(f"🏎️  Track controller shell ({getBaseUrl(is_track_scoped=False)})")
+    print("   Commands as in the CLI without 'python cli.py', e.g. 'gate down', 'race h1 1,2'")
+    print("   'track <name>' switches track, 'track' resets, 'exit' quits\n")
+    try:
+        while True:
+            track_name = os.environ.get("PI_TRACK")
+            try:
+                line = input(f"track{'/' + track_name if track_name else ''}> ")
+            except (EOFError, KeyboardInterrupt):
+                print()
+                break
+            words = shlex.split(line)
+            if not words:
+                continue
+            if words[0] in ("exit", "quit"):
+                break
+            if words[0] == "track":
+                if len(words) > 1:
+                    os.environ["PI_TRACK"] = words[1]
+                else:
+                    os.environ.pop("PI_TRACK", None)
+                feed.reconnect()
+                continue
+            if words[0] in SHELL_EXCLUDED:
+                print(f"'{words[0]}' isn't available in the shell")
+                continue
+            
+            try:
+                cmd_args = parser.parse_args(words)
+            except SystemExit:
+                continue  # argparse already printed the usage error
+            if cmd_args.track:
+                os.environ["PI_TRACK"] = cmd_args.track
+                feed.reconnect()
+            if cmd_args.command == "race":
+                feed.own_heat_ids.add(cmd_args.heat_id)
+            
+            start_ns = time.monotonic_ns()
+            try:
+                cmd_args.func(cmd_args)
+            except Exception as e:
+                if not reportApiError(e):
+                    print(f"❌ {e}")
+            if args.timing:
+                print(f"   ({(time.monotonic_ns() - start_ns) / 1_000_000:.1f}ms)")
+    finally:
+        feed.stop()
+        _session_client.close()
+        _session_client = None
+
+
+# ----- Live View -----
+
+def formatStatusLine(status: dict) -> str:
+    """Gate, servo angle and one box per lane (filled = beam broken, hollow = broken since the last line)."""
+    gate = "DOWN" if status["is_gate_down"] else "UP  "
+    lanes = " ".join(
+        f"{sensor['lane']}:{'■' if sensor['is_blocked'] else '□' if sensor.get('has_changed') else '·'}"
+        for sensor in status["sensors"]
+    )
+    return f"Gate {gate}  servo {status['servo_angle']:>3}°  │ {lanes}"
+
+
+async def watchLive(lanes: str = None):
+    """Render /ws/status on one updating line, print /ws/results as they arrive and count down to gate drops."""
+    import asyncio
+    import websockets
+    
+    is_tty = sys.stdout.isatty()
+    last_line = ""
+    
+    def redraw(line: str):
+        nonlocal last_line
+        if is_tty:
+            sys.stdout.write("\r\033[K" + line)
+            sys.stdout.flush()
+        elif line != last_line:
+            print(line)
+        last_line = line
+    
+    async def followStatus():
+        # Summary mode flags passes that start and end between two lines
+        query = f"?rate_hz={WATCH_STATUS_HZ}&mode=summary" + (f"&lanes={lanes}" if lanes else "")
+        async with websockets.connect(getWsUrl("/ws/status") + query) as ws:
+            async for message in ws:
+                event = json.loads(message)
+                if event.get("type") == "hardware_status":
+                    redraw(formatStatusLine(event["data"]))
+    
+    def localMs() -> float:
+        return time.monotonic_ns() / 1_000_000
+    
+    clock = {"offset_ms": None, "rtt_ms": None}  # Server time = local + offset
+    
+    async def syncClock(ws):
+        for _ in range(TIME_SYNC_SAMPLES):
+            await ws.send(json.dumps({"type": "time_sync", "client_ms": localMs()}))
+            await asyncio.sleep(TIME_SYNC_INTERVAL_SEC)
+    
+    def onTimeSync(event: dict):
+        received_ms = localMs()
+        server_ms = event["server_tx_ms"] - event["server_rx_ms"]
+        rtt_ms = received_ms - event["client_ms"] - server_ms
+        if clock["rtt_ms"] is None or rtt_ms < clock["rtt_ms"]:
+            clock["rtt_ms"] = rtt_ms
+            clock["offset_ms"] = ((event["server_rx_ms"] - event["client_ms"])
+                                  + (event["server_tx_ms"] - received_ms)) / 2
+    
+    async def countdown(event: dict):
+        """Print the countdown and GO at the gate drop, on the local clock."""
+        offset_ms = clock["offset_ms"] or 0.0
+        drop_ms = event["gate_drop_ms"] - offset_ms
+        sync = f"rtt {clock['rtt_ms']:.1f}ms" if clock["rtt_ms"] is not None else "unsynced"
+        announce(f"🚦 {event['heat_id']}: gate drops in {(drop_ms - localMs()) / 1000:.1f}s ({sync})")
+        while (remaining_ms := drop_ms - localMs()) > 0:
+            whole_sec = int(remaining_ms // 1000)
+            await asyncio.sleep((remaining_ms - whole_sec * 1000) / 1000)
+            if whole_sec:
+                announce(f"   {whole_sec}...")
+        announce("🟢 GO")
+    
+    def announce(line: str):
+        if is_tty:
+            sys.stdout.write("\r\033[K")
+        print(line)
+        redraw(last_line)
+    
+    async def followResults():
+        tasks = set()  # Keep references so the tasks aren't collected mid-run
+        async with websockets.connect(getWsUrl("/ws/results")) as ws:
+            tasks.add(asyncio.create_task(syncClock(ws)))
+            async for message in ws:
+                event = json.loads(message)
+                if event.get("type") == "time_sync":
+                    onTimeSync(event)
+                elif event.get("type") == "race_start":
+                    task = asyncio.create_task(countdown(event))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif event.get("type") == "race_result":
+                    result = event["data"]
+                    announce("\n".join([f"🏁 {result['heat_id']}"] + formatLaneResults(result)))
+                elif event.get("type") == "split":
+                    announce(formatSplitEvent(event))
+    
+    await asyncio.gather(followStatus(), followResults())
+
+
+def cmdWatch(args):
+    """Live terminal view of sensors, gate and results."""
+    import asyncio
+    import websockets
+    
+    print(f"👀 Watching {getBaseUrl()} (Ctrl+C to stop)\n")
+    try:
+        asyncio.run(watchLive(args.lanes))
+    except KeyboardInterrupt:
+        print()
+    except websockets.ConnectionClosed:
+        print("\n❌ Connection to API lost")
+        sys.exit(1)
+    except (OSError, websockets.WebSocketException) as e:
+        print(f"❌ Cannot connect to API: {e}")
+        sys.exit(1)
+
+
+def makeParser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Pi Track Controller CLI",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=__doc__
     )
+    parser.add_argument("--track", help="Track name for multi-track controllers (default track if omitted)")
     subparsers = parser.add_subparsers(dest="command", required=True)
     
     # serve
@@ -151,12 +721,37 @@ def main():
     p_serve.add_argument("-p", "--port", type=int, default=8000, help="Port (default: 8000)")
     p_serve.add_argument("-t", "--tracks", type=int, default=4, help="Number of tracks (default: 4)")
     p_serve.add_argument("-m", "--mock", action="store_true", help="Use mock hardware (for local dev)")
+    p_serve.add_argument("--sim", action="store_true", help="Real hardware code on simulated GPIO/servo")
+    p_serve.add_argument("-w", "--workers", type=int, default=1, help="API worker processes (requires --daemon)")
+    p_serve.add_argument("-d", "--daemon", help="Hardware daemon socket (split mode)")
+    p_serve.add_argument("--config", help="Tracks config JSON (multi-track mode)")
     p_serve.set_defaults(func=cmdServe)
     
+    # daemon
+    p_daemon = subparsers.add_parser("daemon", help="Start hardware daemon")
+    p_daemon.add_argument("-s", "--socket", default="/tmp/track-hardware.sock", help="Unix socket path")
+    p_daemon.add_argument("-t", "--tracks", type=int, default=4, help="Number of tracks (default: 4)")
+    p_daemon.add_argument("-m", "--mock", action="store_true", help="Use mock hardware (for local dev)")
+    p_daemon.add_argument("--sim", action="store_true", help="Real hardware code on simulated GPIO/servo")
+    p_daemon.add_argument("-c", "--cpu", type=int, help="Pin daemon to this CPU core")
+    p_daemon.add_argument("--config", help="Tracks config JSON (multi-track mode)")
+    p_daemon.set_defaults(func=cmdDaemon)
+    
+    # aggregate
+    p_aggregate = subparsers.add_parser("aggregate", help="Start aggregator for several controllers")
+    p_aggregate.add_argument("-p", "--port", type=int, default=8100, help="Port (default: 8100)")
+    p_aggregate.add_argument("-c", "--controller", action="append", help="Controller URL (repeatable)")
+    p_aggregate.add_argument("--no-discovery", action="store_true", help="Don't browse mDNS for controllers")
+    p_aggregate.set_defaults(func=cmdAggregate)
+    
     # health
     p_health = subparsers.add_parser("health", help="Check API health")
     p_health.set_defaults(func=cmdHealth)
     
+    # tracks
+    p_tracks = subparsers.add_parser("tracks", help="List tracks")
+    p_tracks.set_defaults(func=cmdTracks)
+    
     # gate
     p_gate = subparsers.add_parser("gate", help="Get/set gate position")
     p_gate.add_argument("position", nargs="?", choices=["up", "down"], help="Set position")
@@ -166,8 +761,23 @@ def main():
     p_race = subparsers.add_parser("race", help="Run a race heat")
     p_race.add_argument("heat_id", help="Heat identifier")
     p_race.add_argument("lanes", help="Comma-separated lane numbers (e.g., 1,2,3,4)")
+    p_race.add_argument("--countdown", type=float, help="ms between the race_start broadcast and the gate drop")
+    p_race.add_argument("--tie-ms", type=float, help="Finishes this close (ms) are ties (default: TIE_THRESHOLD_MS)")
     p_race.set_defaults(func=cmdRace)
     
+    # pipeline
+    p_pipeline = subparsers.add_parser("pipeline", help="Post-race queue and heat turnaround")
+    p_pipeline.add_argument("--retry", action="store_true", help="Retry heats that failed to save")
+    p_pipeline.set_defaults(func=cmdPipeline)
+    
+    # policy
+    p_policy = subparsers.add_parser("policy", help="Get/set when heats end")
+    p_policy.add_argument("mode", nargs="?", choices=["fixed", "margin", "multiple", "learned"], help="Set policy")
+    p_policy.add_argument("--margin", type=float, help="ms after the leader (margin) / learned time (learned)")
+    p_policy.add_argument("--factor", type=float, help="End at factor x leader's time (multiple)")
+    p_policy.add_argument("--quantile", type=float, help="Quantile of recent finish times (learned)")
+    p_policy.set_defaults(func=cmdPolicy)
+    
     # servo
     p_servo = subparsers.add_parser("servo", help="Servo commands")
     servo_sub = p_servo.add_subparsers(dest="servo_cmd", required=True)
@@ -179,26 +789,93 @@ def main():
     p_servo_cal.add_argument("up_angle", type=int, help="UP angle (holding)")
     p_servo_cal.add_argument("down_angle", type=int, help="DOWN angle (released)")
     
+    p_servo_release = servo_sub.add_parser("release", help="Measure gate release latency")
+    p_servo_release.add_argument("--cycles", type=int, default=5, help="Gate drops to time (default: 5)")
+    p_servo_release.add_argument("--probe-lane", type=int, help="Lane sensor placed at the gate (no start sensor)")
+    
     servo_sub.add_parser("status", help="Get calibration")
     
     p_servo.set_defaults(func=cmdServo)
     
+    # sensors
+    p_sensors = subparsers.add_parser("sensors", help="Sensor commands")
+    sensors_sub = p_sensors.add_subparsers(dest="sensors_cmd", required=True)
+    
+    p_sensors_filter = sensors_sub.add_parser("filter", help="Get/set debounce filter and glitch counts")
+    p_sensors_filter.add_argument("--min-pulse", type=int, help="Minimum pulse width in µs")
+    p_sensors_filter.add_argument("--confirm", type=int, nargs=2, metavar=("K", "N"),
+                                  help="Require K of the last N samples")
+    
+    sensors_sub.add_parser("health", help="Per-lane sensor health")
+    
+    p_sensors.set_defaults(func=cmdSensors)
+    
     # history
     p_history = subparsers.add_parser("history", help="Get race history")
     p_history.add_argument("-l", "--limit", type=int, default=10, help="Max heats (default: 10)")
     p_history.set_defaults(func=cmdHistory)
     
+    # export
+    p_export = subparsers.add_parser("export", help="Export history to a file")
+    p_export.add_argument("file", help="Output file: .ndjson or .csv, add .gz to compress")
+    p_export.add_argument("--start", help="Only heats started at/after this ISO time")
+    p_export.add_argument("--end", help="Only heats started at/before this ISO time")
+    p_export.set_defaults(func=cmdExport)
+    
+    # load
+    p_load = subparsers.add_parser("load", help="Load/soak test a server")
+    p_load.add_argument("--status", type=int, default=10, help="/ws/status subscribers (default: 10)")
+    p_load.add_argument("--status-hz", type=float, default=20, help="Frame rate each status subscriber asks for (default: 20)")
+    p_load.add_argument("--results", type=int, default=10, help="/ws/results subscribers (default: 10)")
+    p_load.add_argument("--pollers", type=int, default=2, help="/history pollers (default: 2)")
+    p_load.add_argument("--races", type=int, default=1, help="Back-to-back race loops (default: 1)")
+    p_load.add_argument("-d", "--duration", type=float, default=60, help="Seconds, 0 = until Ctrl+C (default: 60)")
+    p_load.add_argument("--report", type=float, default=10, help="Report interval in seconds (default: 10)")
+    p_load.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls per poller")
+    p_load.add_argument("-l", "--limit", type=int, default=100, help="Heats per /history poll (default: 100)")
+    p_load.set_defaults(func=cmdLoad)
+    
+    # simbench
+    p_bench = subparsers.add_parser("simbench", help="Timing accuracy of the real capture path on simulated GPIO")
+    p_bench.add_argument("-n", "--heats", type=int, default=20, help="Heats to run (default: 20)")
+    p_bench.add_argument("-l", "--lanes", type=int, default=4, help="Lanes (default: 4)")
+    p_bench.add_argument("--load", type=int, default=0, help="CPU load threads (default: 0)")
+    p_bench.add_argument("--no-sampler", action="store_true", help="Capture by polling the pins directly")
+    p_bench.add_argument("--no-start-sensor", action="store_true", help="Time from the calibrated/fixed release")
+    p_bench.add_argument("--bounce-us", type=int, default=0, help="Sensor chatter after each car edge")
+    p_bench.add_argument("--glitches", type=int, default=0, help="Short false pulses per lane per heat")
+    p_bench.add_argument("--min-pulse-us", type=int, help="Debounce the sensors (default: SENSOR_MIN_PULSE_US)")
+    p_bench.add_argument("--tie-lanes", help="Lanes that finish at exactly the same time, e.g. 1,2")
+    p_bench.add_argument("--finish-ms", default="2500-4500", help="Random finish time range (default: 2500-4500)")
+    p_bench.add_argument("--seed", type=int, help="Random seed for repeatable heats")
+    p_bench.set_defaults(func=cmdSimBench)
+    
+    # shell
+    p_shell = subparsers.add_parser("shell", help="Interactive session with a kept-alive connection")
+    p_shell.add_argument("--timing", action="store_true", help="Print each command's round-trip time")
+    p_shell.set_defaults(func=cmdShell)
+    
+    # watch
+    p_watch = subparsers.add_parser("watch", help="Live view of sensors and results")
+    p_watch.add_argument("--lanes", help="Only show these lanes' sensors, e.g. 1,3")
+    p_watch.set_defaults(func=cmdWatch)
+    
+    return parser
+
+
+def main():
+    parser = makeParser()
     args = parser.parse_args()
+    if args.command == "serve" and args.workers > 1 and not args.daemon:
+        parser.error("--workers > 1 needs --daemon (hardware can only be owned by one process)")
+    if args.track:
+        os.environ["PI_TRACK"] = args.track
     
     try:
         args.func(args)
-    except httpx.ConnectError:
-        print(f"❌ Cannot connect to API. Is the server running?")
-        print(f"   Start with: python cli.py serve")
-        sys.exit(1)
-    except httpx.HTTPStatusError as e:
-        print(f"❌ API error: {e.response.status_code}")
-        print(f"   {e.response.text}")
+    except Exception as e:
+        if not reportApiError(e):
+            raise
         sys.exit(1)
 
 
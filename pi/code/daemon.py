@@ -0,0 +1,448 @@
+"""Hardware daemon: owns GPIO, the gate servo and race timing.
+
+Runs as its own process so any number of API workers can serve HTTP and
+WebSocket traffic without competing with the timing loop for one GIL.
+Workers talk to it over a Unix domain socket with newline-delimited JSON:
+
+    -> {"id": 1, "method": "setGate", "params": {"track": "main", "is_down": true}}
+    <- {"id": 1, "result": {"is_gate_down": true}}
+    <- {"id": 2, "error": {"type": "ValueError", "detail": "Heat cancelled ..."}}
+    <- {"event": "race_result", "track": "main", "data": {"seq": 7, ...}}   # once "subscribe" was called
+    <- {"event": "split", "track": "main", "data": {"type": "split", "lane": 2, ...}}   # also race_start
+
+The daemon hosts every configured track (see tracks.py); "track" may be
+omitted for the default one. It is the only writer of heat history.
+Workers keep read-only HistoryManagers and reload one when a race_result
+event arrives for its track.
+
+Usage:
+    python daemon.py                       # or: python cli.py daemon
+    HARDWARE_DAEMON_SOCKET=/tmp/track-hardware.sock uvicorn main:app --workers 2
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import itertools
+import threading
+from typing import Awaitable, Callable, Dict, Optional
+
+from models import HeatSetup, HeatResult
+from tracks import Track, MakeTracks
+from hardware import SensorCheckError
+from discovery import registerService, unregisterService
+from sensorstate import SensorStateReader, getSensorStatesFromSnapshot, getHardwareStatusFromSnapshot, SENSOR_STATE_PATH
+
+# Configuration from environment
+DEFAULT_SOCKET_PATH = "/tmp/track-hardware.sock"
+DAEMON_SOCKET = os.environ.get("HARDWARE_DAEMON_SOCKET", DEFAULT_SOCKET_PATH)
+DAEMON_CPU = os.environ.get("DAEMON_CPU")                  # Core to pin the daemon to
+DAEMON_RT_PRIORITY = os.environ.get("DAEMON_RT_PRIORITY")  # SCHED_FIFO priority (1-99)
+API_PORT = int(os.environ.get("API_PORT", 8000))
+
+# Client timing
+CALL_TIMEOUT_SEC = 5.0
+CONNECT_TIMEOUT_SEC = 30.0  # How long a worker waits for the daemon at startup
+RECONNECT_DELAY_SEC = 1.0
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, default=str) + "\n").encode("utf-8")
+
+
+def applySchedulingPolicy(cpu: Optional[str] = DAEMON_CPU, rt_priority: Optional[str] = DAEMON_RT_PRIORITY):
+    """Pin to a CPU core and raise scheduling priority, if configured.
+
+    Both are best effort: without CAP_SYS_NICE the priority falls back to
+    the highest nice level we're allowed.
+    """
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {int(cpu)})
+            print(f"Hardware daemon pinned to CPU {cpu}")
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"Warning: could not pin to CPU {cpu}: {e}")
+
+    if rt_priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(rt_priority)))
+            print(f"Hardware daemon running SCHED_FIFO priority {rt_priority}")
+        except (AttributeError, OSError, ValueError) as e:
+            try:
+                os.nice(-10)
+                print(f"Warning: SCHED_FIFO unavailable ({e}), using nice -10")
+            except OSError:
+                print(f"Warning: could not raise scheduling priority: {e}")
+
+
+class HardwareDaemon:
+    """Serves every track's hardware to API workers over a Unix socket."""
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET):
+        self.socket_path = socket_path
+        self.tracks: Dict[str, Track] = MakeTracks()
+        self.default_track = next(iter(self.tracks.values()))
+        self._write_locks: Dict[asyncio.StreamWriter, asyncio.Lock] = {}
+        self._subscribers: set = set()
+        # Track methods take the resolved Track as their first argument
+        self._methods: Dict[str, Callable] = {
+            "getStatus": lambda track: track.hardware.getStatus(),
+            "getHardwareStatus": lambda track, is_raw=False: track.hardware.getHardwareStatus(is_raw),
+            "getSensorStates": lambda track: track.hardware.getSensorStates(),
+            "getCalibration": lambda track: track.hardware.getCalibration(),
+            "setCalibration": lambda track, up_angle, down_angle: track.hardware.setCalibration(up_angle, down_angle),
+            "getSensorHealth": lambda track: track.hardware.getSensorHealth(),
+            "getFinishPolicy": lambda track: track.hardware.getFinishPolicy(),
+            "setFinishPolicy": lambda track, mode, margin_ms, factor, quantile: track.hardware.setFinishPolicy(
+                mode, margin_ms, factor, quantile),
+            "getSensorFilter": lambda track: track.hardware.getSensorFilter(),
+            "setSensorFilter": lambda track, min_pulse_us, confirm_k, confirm_n: track.hardware.setSensorFilter(
+                min_pulse_us, confirm_k, confirm_n),
+            "setGate": self._setGate,
+            "testServoAngle": lambda track, angle: track.hardware.testServoAngle(angle),
+            "calibrateRelease": lambda track, cycles, probe_lane: track.hardware.calibrateRelease(cycles, probe_lane),
+            "getPipelineStatus": lambda track: track.getPipelineStatus(),
+            "retryPipeline": lambda track: track.retryPipeline(),
+            "runRace": self._runRace,
+            "subscribe": self._subscribe,
+        }
+
+    def _getTrack(self, name: Optional[str]) -> Track:
+        if name is None:
+            return self.default_track
+        track = self.tracks.get(name)
+        if not track:
+            raise ValueError(f"Unknown track: {name}")
+        return track
+
+    # ----- Methods -----
+
+    def _setGate(self, track: Track, is_down: bool) -> dict:
+        track.hardware.setGate(is_down)
+        return {"is_gate_down": track.hardware.is_gate_down}
+
+    async def _runRace(self, track: Track, heat_id: str, occupied_lanes: list,
+                       countdown_ms: Optional[float] = None, tie_threshold_ms: Optional[float] = None) -> dict:
+        """Run a heat and hand it to the pipeline, which persists it and publishes it to every worker."""
+        track.hardware.prepareRace(HeatSetup(heat_id=heat_id, occupied_lanes=occupied_lanes,
+                                             countdown_ms=countdown_ms, tie_threshold_ms=tie_threshold_ms))
+        track.pipeline.markRaceStart()
+        result = await track.hardware.runRace()
+
+        result_dict = result.model_dump(mode="json")
+        await track.pipeline.submit(result_dict, track.hardware.timing_done_ns)
+        return result_dict
+
+    async def _publishResult(self, track: Track, result: dict):
+        """Pipeline broadcast stage: number the heat and send it to the workers."""
+        await self.publish("race_result", track.results.publish(result), track.name)
+
+    def _subscribe(self, writer: asyncio.StreamWriter) -> dict:
+        self._subscribers.add(writer)
+        return {"subscribed": True}
+
+    # ----- Transport -----
+
+    async def _send(self, writer: asyncio.StreamWriter, message: dict):
+        """Write one message; a lock per connection keeps lines from interleaving."""
+        async with self._write_locks[writer]:
+            writer.write(_encode(message))
+            await writer.drain()
+
+    async def publish(self, event: str, data: dict, track_name: Optional[str] = None):
+        """Send an event to every subscribed worker."""
+        for writer in list(self._subscribers):
+            try:
+                await self._send(writer, {"event": event, "track": track_name, "data": data})
+            except (ConnectionError, KeyError):
+                self._subscribers.discard(writer)
+
+    async def _handleRequest(self, request: dict, writer: asyncio.StreamWriter):
+        """Dispatch one request and send its response."""
+        request_id = request.get("id")
+        method = self._methods.get(request.get("method"))
+        try:
+            if method is None:
+                raise ValueError(f"Unknown method: {request.get('method')}")
+            params = dict(request.get("params") or {})
+            if method == self._subscribe:
+                result = method(writer)
+            else:
+                result = method(self._getTrack(params.pop("track", None)), **params)
+            if asyncio.iscoroutine(result):
+                result = await result
+            response = {"id": request_id, "result": result}
+        except Exception as e:
+            response = {"id": request_id, "error": {"type": type(e).__name__, "detail": str(e)}}
+
+        try:
+            await self._send(writer, response)
+        except (ConnectionError, KeyError):
+            pass
+
+    async def _handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one worker connection; requests run concurrently."""
+        self._write_locks[writer] = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                task = asyncio.create_task(self._handleRequest(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            self._write_locks.pop(writer, None)
+            writer.close()
+
+    # ----- Lifecycle -----
+
+    async def serve(self):
+        """Initialize hardware and serve workers until cancelled."""
+        applySchedulingPolicy()
+
+        await asyncio.gather(*(
+            asyncio.to_thread(step)
+            for track in self.tracks.values()
+            for step in (track.loadHistory, track.initHardware)
+        ))
+
+        # Live heat events go to the workers, which forward them to their WebSocket clients
+        for track in self.tracks.values():
+            track.hardware.setEventCallback(
+                lambda event, name=track.name: self.publish(event["type"], event, name)
+            )
+            await track.startPipeline(lambda result, track=track: self._publishResult(track, result))
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handleClient, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        print(f"Hardware daemon listening on {self.socket_path} (tracks: {', '.join(self.tracks)})")
+
+        # Workers are interchangeable, so the daemon registers the one mDNS service
+        discovery_task = asyncio.create_task(registerService(self.default_track.config.num_lanes, API_PORT, list(self.tracks)))
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            discovery_task.cancel()
+            await unregisterService()
+            for track in self.tracks.values():
+                if track.pipeline:
+                    await track.pipeline.stop()
+                track.cleanup()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            print("Hardware daemon shut down")
+
+
+class RemoteHardware:
+    """HardwareInterface stand-in used by API workers when a daemon owns the hardware.
+
+    Short calls share one blocking connection (they're sub-millisecond);
+    races and the event subscription get their own asyncio connections.
+    """
+
+    is_remote = True
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET, track: Optional[str] = None,
+                 sensor_state_path: str = SENSOR_STATE_PATH):
+        self.socket_path = socket_path
+        self.track = track
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self.current_heat: Optional[HeatSetup] = None
+        self._sensor_reader: Optional[SensorStateReader] = None
+
+        # Wait for the daemon (it may still be initializing hardware)
+        deadline = time.monotonic() + CONNECT_TIMEOUT_SEC
+        while True:
+            try:
+                self.num_tracks = self.getStatus()["num_tracks"]
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Hardware daemon not reachable at {socket_path}")
+                time.sleep(RECONNECT_DELAY_SEC)
+        print(f"Connected to hardware daemon at {socket_path}")
+        
+        # Live sensor state comes straight from the daemon's shared memory
+        try:
+            self._sensor_reader = SensorStateReader(sensor_state_path)
+        except OSError as e:
+            print(f"Shared sensor state unavailable ({e}), using RPC for status")
+
+    @staticmethod
+    def _unwrap(response: dict):
+        """Return a response's result or raise its error."""
+        error = response.get("error")
+        if error:
+            if error.get("type") == "SensorCheckError":
+                raise SensorCheckError(error.get("detail"))
+            if error.get("type") == "ValueError":
+                raise ValueError(error.get("detail"))
+            raise RuntimeError(error.get("detail"))
+        return response.get("result")
+
+    def _call(self, method: str, **params):
+        """Blocking request/response on the shared connection (reconnects once)."""
+        request = {"id": next(self._ids), "method": method, "params": {"track": self.track, **params}}
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        self._sock.settimeout(CALL_TIMEOUT_SEC)
+                        self._sock.connect(self.socket_path)
+                        self._file = self._sock.makefile("rb")
+                    self._sock.sendall(_encode(request))
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("Hardware daemon closed the connection")
+                    break
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+        return self._unwrap(json.loads(line))
+
+    def _close(self):
+        if self._sock:
+            self._sock.close()
+        self._sock = None
+        self._file = None
+
+    # ----- HardwareInterface -----
+
+    @property
+    def is_gate_down(self) -> bool:
+        return self.getStatus()["is_gate_down"]
+
+    def setGate(self, is_down: bool):
+        self._call("setGate", is_down=is_down)
+
+    def testServoAngle(self, angle: int):
+        self._call("testServoAngle", angle=angle)
+
+    def getCalibration(self) -> dict:
+        return self._call("getCalibration")
+
+    def setCalibration(self, up_angle: int, down_angle: int) -> dict:
+        return self._call("setCalibration", up_angle=up_angle, down_angle=down_angle)
+
+    def getSensorHealth(self) -> list:
+        return self._call("getSensorHealth")
+
+    def getFinishPolicy(self) -> dict:
+        return self._call("getFinishPolicy")
+
+    def setFinishPolicy(self, mode: str, margin_ms: float, factor: float, quantile: float) -> dict:
+        return self._call("setFinishPolicy", mode=mode, margin_ms=margin_ms, factor=factor, quantile=quantile)
+
+    def getSensorFilter(self) -> dict:
+        return self._call("getSensorFilter")
+
+    def setSensorFilter(self, min_pulse_us: int, confirm_k: int, confirm_n: int) -> dict:
+        return self._call("setSensorFilter", min_pulse_us=min_pulse_us, confirm_k=confirm_k, confirm_n=confirm_n)
+
+    def getStatus(self) -> dict:
+        return self._call("getStatus")
+
+    def getSensorStates(self) -> list:
+        if self._sensor_reader:
+            return getSensorStatesFromSnapshot(self._sensor_reader.read())
+        return self._call("getSensorStates")
+
+    @property
+    def is_status_rpc(self) -> bool:
+        """Status reads are blocking socket calls (no shared sensor state)."""
+        return self._sensor_reader is None
+
+    def getHardwareStatus(self, is_raw: bool = False) -> dict:
+        if self._sensor_reader:
+            return getHardwareStatusFromSnapshot(self._sensor_reader.read(), is_raw)
+        return self._call("getHardwareStatus", is_raw=is_raw)
+
+    def prepareRace(self, setup: HeatSetup):
+        """Remember the heat; the daemon checks sensors, prepares (and cancels any running heat) on runRace."""
+        self.current_heat = setup
+
+    def getPipelineStatus(self) -> dict:
+        return self._call("getPipelineStatus")
+
+    def retryPipeline(self) -> dict:
+        return self._call("retryPipeline")
+
+    async def runRace(self) -> HeatResult:
+        """Run the prepared heat on the daemon. The daemon persists and publishes it."""
+        if not self.current_heat:
+            raise ValueError("No heat configured - call prepareRace first")
+        return HeatResult(**await self._callAsync("runRace", **self.current_heat.model_dump()))
+
+    async def calibrateRelease(self, cycles: int = 5, probe_lane: Optional[int] = None) -> dict:
+        return await self._callAsync("calibrateRelease", cycles=cycles, probe_lane=probe_lane)
+
+    async def _callAsync(self, method: str, **params):
+        """Long-running call (races, calibration) on its own connection, without a timeout."""
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            writer.write(_encode({"id": 0, "method": method, "params": {"track": self.track, **params}}))
+            await writer.drain()
+            line = await reader.readline()
+        finally:
+            writer.close()
+        if not line:
+            raise RuntimeError(f"Hardware daemon closed the connection during {method}")
+        return self._unwrap(json.loads(line))
+
+    async def subscribe(self, callback: Callable[[str, dict], Awaitable[None]]):
+        """Forward daemon events to `callback(event, data)` forever, reconnecting as needed."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                writer.write(_encode({"id": 0, "method": "subscribe"}))
+                await writer.drain()
+                await callback("connected", {})
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    message = json.loads(line)
+                    # One subscription per track; ignore other tracks' events
+                    if "event" in message and message.get("track") in (None, self.track):
+                        await callback(message["event"], message.get("data"))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Hardware daemon subscription lost: {e}")
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    def cleanup(self):
+        with self._lock:
+            self._close()
+        if self._sensor_reader:
+            self._sensor_reader.close()
+
+
+def run():
+    """Run the daemon until interrupted."""
+    try:
+        asyncio.run(HardwareDaemon().serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    run()
@@ -1,12 +1,16 @@
 """Zeroconf/mDNS service discovery for automatic network detection."""
 
+import os
 import socket
+import asyncio
+from typing import List, Optional
 from zeroconf import ServiceInfo
 from zeroconf.asyncio import AsyncZeroconf
 
 # Constants
 SERVICE_TYPE = "_track-api._tcp.local."
 SERVICE_NAME = "Pinewood Derby Track Controller._track-api._tcp.local."
+CONTROLLER_NAME = os.environ.get("CONTROLLER_NAME")  # Unique per controller; default: hostname-port
 
 _zeroconf: AsyncZeroconf = None
 _service_info: ServiceInfo = None
@@ -25,19 +29,28 @@ def getLocalIp() -> str:
         return "127.0.0.1"
 
 
-async def registerService(num_tracks: int, port: int = 8000):
-    """Register the track controller service for network discovery."""
+async def registerService(num_tracks: int, port: int = 8000, track_names: Optional[List[str]] = None) -> bool:
+    """Register the track controller service for network discovery.
+    
+    Several controllers may share a LAN (see aggregator.py), so each one
+    registers under its own instance name.
+    Returns False if registration failed (non-fatal).
+    """
     global _zeroconf, _service_info
     
-    local_ip = getLocalIp()
+    # Blocking UDP connect - keep it off the event loop
+    local_ip = await asyncio.to_thread(getLocalIp)
+    controller_name = CONTROLLER_NAME or f"{socket.gethostname()}-{port}"
     
     _service_info = ServiceInfo(
         SERVICE_TYPE,
-        SERVICE_NAME,
+        SERVICE_NAME.replace(".", f" ({controller_name}).", 1),
         addresses=[socket.inet_aton(local_ip)],
         port=port,
         properties={
             "num_tracks": str(num_tracks),
+            "tracks": ",".join(track_names or []),
+            "controller": controller_name,
             "version": "1.0.0",
         },
         server="track-controller.local.",
@@ -45,11 +58,13 @@ async def registerService(num_tracks: int, port: int = 8000):
     
     try:
         _zeroconf = AsyncZeroconf()
-        await _zeroconf.async_register_service(_service_info)
-        print(f"Registered mDNS service: {SERVICE_NAME} at {local_ip}:{port}")
+        await _zeroconf.async_register_service(_service_info, allow_name_change=True)
+        print(f"Registered mDNS service: {_service_info.name} at {local_ip}:{port}")
+        return True
     except Exception as e:
         print(f"Warning: mDNS registration failed (non-fatal): {e}")
         _zeroconf = None
+        return False
 
 
 async def unregisterService():
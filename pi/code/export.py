@@ -0,0 +1,76 @@
+"""Streaming history export.
+
+Heats are pulled one at a time from the storage generators, encoded as
+NDJSON (one heat per line) or CSV (one row per lane result), batched into
+chunks and optionally gzip-compressed on the fly, so memory stays constant
+however long the event ran.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator
+
+# Constants
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+EXPORT_FORMATS = ("ndjson", "csv")
+CSV_COLUMNS = ["heat_id", "started_at", "finished_at", "is_complete",
+               "lane_number", "finish_time_ms", "place", "is_dnf",
+               "is_tie", "finish_uncertainty_ms", "finish_speed_mps", "start_source", "release_ms"]
+CSV_HEAT_COLUMNS = {"heat_id", "started_at", "finished_at", "is_complete", "start_source", "release_ms"}
+
+
+def iterNdjson(heats: Iterable[dict]) -> Iterator[bytes]:
+    """One compact JSON heat per line."""
+    for heat in heats:
+        yield json.dumps(heat, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def iterCsv(heats: Iterable[dict]) -> Iterator[bytes]:
+    """Header, then one row per lane result (heat columns repeated)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for heat in heats:
+        for lane in heat.get("lane_results") or []:
+            writer.writerow([heat.get(column) if column in CSV_HEAT_COLUMNS else lane.get(column)
+                             for column in CSV_COLUMNS])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iterChunks(pieces: Iterable[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Batch small pieces into chunks of about `chunk_size` bytes."""
+    pending = []
+    pending_size = 0
+    for piece in pieces:
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= chunk_size:
+            yield b"".join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield b"".join(pending)
+
+
+def iterGzip(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress a chunk stream into one gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def iterExport(heats: Iterable[dict], export_format: str = "ndjson", is_gzip: bool = False) -> Iterator[bytes]:
+    """Encode heats for export as a stream of byte chunks."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}' (use {' or '.join(EXPORT_FORMATS)})")
+    encode = iterCsv if export_format == "csv" else iterNdjson
+    chunks = iterChunks(encode(heats))
+    return iterGzip(chunks) if is_gzip else chunks
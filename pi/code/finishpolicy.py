@@ -0,0 +1,112 @@
+"""Heat termination policies.
+
+Without a policy a heat with a stalled or derailed car runs until the
+sensor timeout, and the whole event waits. A finish policy ends the heat
+early and marks the stragglers DNF:
+
+- "fixed":    wait for every car, up to the timeout (original behaviour)
+- "margin":   end `margin_ms` after the leader finishes
+- "multiple": end at `factor` x the leader's time
+- "learned":  once the leader finishes, end at the `quantile` of recent
+              finish times on this track plus `margin_ms` (never before the
+              "margin" deadline); same as "margin" until MIN_LEARNED_SAMPLES
+              finishes are known. Before anyone finishes only the timeout
+              applies, so a slow heat isn't cut short with no finishers.
+
+The timeout always applies as an upper bound.
+"""
+
+import os
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+# Configuration from environment (defaults; the API can change them per track)
+FINISH_POLICY = os.environ.get("FINISH_POLICY", "fixed")
+FINISH_MARGIN_MS = float(os.environ.get("FINISH_MARGIN_MS", 2000))
+FINISH_FACTOR = float(os.environ.get("FINISH_FACTOR", 1.5))
+FINISH_QUANTILE = float(os.environ.get("FINISH_QUANTILE", 0.99))
+
+# Constants
+FINISH_POLICIES = ("fixed", "margin", "multiple", "learned")
+LEARNED_SAMPLES = 200       # Recent lane finish times kept for the "learned" policy
+MIN_LEARNED_SAMPLES = 20
+
+
+class FinishPolicy:
+    """Decides when a heat is over, given the leader's time."""
+
+    def __init__(self, timeout_ms: float, mode: str = FINISH_POLICY, margin_ms: float = FINISH_MARGIN_MS,
+                 factor: float = FINISH_FACTOR, quantile: float = FINISH_QUANTILE):
+        self.timeout_ms = timeout_ms
+        self._finish_times_ms: Deque[float] = deque(maxlen=LEARNED_SAMPLES)
+        self.configure(mode, margin_ms, factor, quantile)
+
+    def configure(self, mode: str, margin_ms: float, factor: float, quantile: float):
+        """Change policy settings (ValueError if invalid)."""
+        if mode not in FINISH_POLICIES:
+            raise ValueError(f"Unknown finish policy '{mode}' (use {', '.join(FINISH_POLICIES)})")
+        if margin_ms < 0:
+            raise ValueError("margin_ms must be >= 0")
+        if factor < 1:
+            raise ValueError("factor must be >= 1")
+        if not 0 < quantile <= 1:
+            raise ValueError("quantile must be in (0, 1]")
+        self.mode = mode
+        self.margin_ms = margin_ms
+        self.factor = factor
+        self.quantile = quantile
+
+    def getSettings(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "margin_ms": self.margin_ms,
+            "factor": self.factor,
+            "quantile": self.quantile,
+        }
+
+    def getStatus(self) -> Dict:
+        """Settings plus what the learned policy currently knows."""
+        return {
+            **self.getSettings(),
+            "timeout_ms": self.timeout_ms,
+            "learned_samples": len(self._finish_times_ms),
+            "learned_deadline_ms": self.getLearnedDeadlineMs(),
+        }
+
+    def observe(self, finish_times_ms: Iterable[float]):
+        """Record the finish times of a completed heat."""
+        self._finish_times_ms.extend(finish_times_ms)
+
+    def seed(self, heats: List[dict]):
+        """Load recent finish times from history (newest first, as getHeats returns them)."""
+        finish_times_ms = []
+        for heat in reversed(heats):
+            finish_times_ms.extend(
+                lane["finish_time_ms"] for lane in heat.get("lane_results") or []
+                if lane.get("finish_time_ms") is not None
+            )
+        self._finish_times_ms.clear()
+        self._finish_times_ms.extend(finish_times_ms)
+
+    def getLearnedDeadlineMs(self) -> Optional[float]:
+        """Quantile of recent finish times plus the margin, or None until enough are known."""
+        samples = list(self._finish_times_ms)
+        if len(samples) < MIN_LEARNED_SAMPLES:
+            return None
+        samples.sort()
+        index = min(len(samples) - 1, int(self.quantile * len(samples)))
+        return samples[index] + self.margin_ms
+
+    def getDeadlineMs(self, leader_ms: Optional[float] = None) -> float:
+        """Time from the start at which the heat ends (leader_ms = None until someone finishes)."""
+        deadline_ms = self.timeout_ms
+        if leader_ms is not None:
+            if self.mode in ("margin", "learned"):
+                deadline_ms = leader_ms + self.margin_ms
+            elif self.mode == "multiple":
+                deadline_ms = leader_ms * self.factor
+            if self.mode == "learned":
+                learned_ms = self.getLearnedDeadlineMs()
+                if learned_ms is not None:
+                    deadline_ms = max(deadline_ms, learned_ms)
+        return min(deadline_ms, self.timeout_ms)
@@ -9,10 +9,18 @@ Hardware:
 
 Race sequence:
 1. Gate starts UP (servo at ~90°) - cars held at start
-2. On "GO", gate moves DOWN (servo at ~0°) - cars released
-3. START_TIME recorded when gate drops
-4. Sensors detect cars crossing finish line
-5. FINISH_TIME = time since gate drop
+2. A race_start event tells displays when the gate will drop (server
+   monotonic time, after the heat's countdown); at that time the gate
+   moves DOWN (servo at ~0°) - cars released
+3. START_TIME = measured release: the start sensor's first edge if one is
+   fitted, else the gate command plus the calibrated release latency for
+   the current servo angles, else plus GATE_SETTLE_MS
+4. Optional split sensors down the track record split times and trap speeds
+5. Sensors detect cars crossing finish line
+6. FINISH_TIME = time since START_TIME
+
+Sensor channels (bits of the sampled mask): lanes first, then the start
+sensor if fitted, then each split point's lanes in order.
 """
 
 import os
@@ -20,9 +28,15 @@ import json
 import time
 import asyncio
 import random
-from typing import List, Optional, Callable, Dict
+import threading
+from typing import List, Optional, Callable, Dict, Tuple
 from datetime import datetime
-from models import HeatSetup, LaneResult, HeatResult
+from models import HeatSetup, LaneResult, HeatResult, SplitPointConfig, SplitTime
+from sampler import SensorSampler, SENSOR_SAMPLE_HZ
+from sensorfilter import SensorFilter
+from finishpolicy import FinishPolicy
+from photofinish import resolvePlaces, formatTie, TIE_THRESHOLD_MS
+from sensorstate import getSensorStatesFromSnapshot, getHardwareStatusFromSnapshot, SENSOR_STATE_PATH
 
 # Config file for persistent calibration
 CONFIG_FILE = "servo_config.json"
@@ -33,8 +47,14 @@ DEFAULT_SERVO_DOWN_ANGLE = int(os.environ.get("SERVO_DOWN_ANGLE", 0))
 SERVO_CHANNEL = int(os.environ.get("SERVO_CHANNEL", 0))
 
 # Timing
-SENSOR_TIMEOUT_SEC = 30.0  # Max time to wait for all cars to finish
-GATE_SETTLE_MS = 50        # Time to wait after gate drop before timing starts
+SENSOR_TIMEOUT_SEC = 30.0  # Max time to wait for all cars to finish (finish policies may end sooner)
+GATE_SETTLE_MS = 50        # Assumed gate release latency when neither measured nor calibrated
+START_SENSOR_TIMEOUT_MS = 500  # Fall back to the calibrated latency if the start sensor stays quiet
+RELEASE_RESET_SEC = 1.0    # Time for the gate to travel back up between calibration drops
+RACE_COUNTDOWN_MS = float(os.environ.get("RACE_COUNTDOWN_MS", 0))  # Default gate drop delay after race_start
+MAX_COUNTDOWN_MS = 10000
+COUNTDOWN_SPIN_MS = 2      # Busy-wait the last stretch before a scheduled drop (sleep is too coarse)
+COUNTDOWN_POLL_SEC = 0.05  # Cancel check interval while counting down
 
 # PCA9685 servo pulse widths (microseconds) - configurable for different servos
 # HS-5625MG spec: 900-2100µs, neutral at 1500µs
@@ -43,33 +63,83 @@ SERVO_MAX_PULSE = int(os.environ.get("SERVO_MAX_PULSE", 2100))  # max degrees
 SERVO_ACTUATION_RANGE = int(os.environ.get("SERVO_ACTUATION_RANGE", 120))  # actual travel
 SERVO_FREQ = 50         # 50Hz for standard servos
 
+# Default sensor pins, lanes 1-4 (overridable per lane via SENSOR_PIN_n)
+DEFAULT_SENSOR_PINS = [17, 27, 22, 23]
+# Optional start-gate sensor or gate-position switch (active low, any edge marks the release)
+START_SENSOR_PIN = int(os.environ["START_SENSOR_PIN"]) if os.environ.get("START_SENSOR_PIN") else None
+CAPTURE_POLL_SEC = 0.001  # 1ms polling interval for ~1ms precision
+
+# Mock: simulated gate release latency when a start sensor is configured
+MOCK_RELEASE_MS = float(os.environ.get("MOCK_RELEASE_MS", 80))
+# Mock: lanes whose beam is stuck blocked (e.g. "2,3"), to exercise the pre-race check
+MOCK_BLOCKED_LANES = [int(lane) for lane in os.environ.get("MOCK_BLOCKED_LANES", "").split(",") if lane.strip()]
+# Mock: lanes that always cross the finish together (e.g. "1,2"), to exercise tie detection
+MOCK_TIE_LANES = [int(lane) for lane in os.environ.get("MOCK_TIE_LANES", "").split(",") if lane.strip()]
+
+# One PCA9685 board is shared by every track's servo channel
+_shared_pca = None
+_pca_users = 0
+_pca_lock = threading.Lock()  # Tracks initialize concurrently
+
+
+class SensorCheckError(ValueError):
+    """Pre-race sensor check failed (an occupied lane's beam is already blocked)."""
+
+
+def _trapSpeed(distance_m: float, time_ns: Optional[int], prev_time_ns: Optional[int]) -> Optional[float]:
+    """Average speed over a segment, or None if either end wasn't seen."""
+    if time_ns is None or prev_time_ns is None or time_ns <= prev_time_ns:
+        return None
+    return round(distance_m / ((time_ns - prev_time_ns) / 1e9), 3)
+
 
 class HardwareInterface:
     """Base hardware interface - subclassed for real/mock implementations."""
     
-    def __init__(self, num_tracks: int = 4):
+    def __init__(self, num_tracks: int = 4, config_file: str = CONFIG_FILE, start_pin: Optional[int] = None,
+                 split_points: Optional[List[SplitPointConfig]] = None, finish_distance_m: Optional[float] = None):
         self.num_tracks = num_tracks
+        self.config_file = config_file
+        self.start_pin = start_pin if start_pin is not None else START_SENSOR_PIN
+        self.has_start_sensor = self.start_pin is not None
+        self.start_channel = num_tracks  # Start sensor is sampled as the bit after the lanes
+        self.split_points: List[SplitPointConfig] = list(split_points or [])
+        self.finish_distance_m = finish_distance_m
+        self.split_channel = self.start_channel + self.has_start_sensor  # First split point's lane 1
         self.is_gate_down = False
         self.current_heat: Optional[HeatSetup] = None
         self._result_callback: Optional[Callable] = None
+        self._event_callback: Optional[Callable] = None
         self.current_servo_angle: int = 0  # Track current angle for status
         self._heat_cancelled = False  # Flag to cancel in-progress heat
+        self.is_racing = False        # Gate drop until timing completes
+        self.timing_done_ns = 0       # When the last heat's timing completed
+        self.sampler: Optional[SensorSampler] = None
+        num_channels = self.split_channel + len(self.split_points) * num_tracks
+        self.sensor_filter = SensorFilter(num_channels)  # Shared by sampler and capture
+        self.finish_policy = FinishPolicy(SENSOR_TIMEOUT_SEC * 1000)  # When to stop waiting for stragglers
         
         # Load calibration from config file or use defaults
         self.servo_up_angle = DEFAULT_SERVO_UP_ANGLE
         self.servo_down_angle = DEFAULT_SERVO_DOWN_ANGLE
+        self.release_latency_ms: Dict[str, float] = {}  # Measured per "up-down" angle pair
         self._loadCalibration()
     
     def _loadCalibration(self):
         """Load servo calibration from config file."""
-        if os.path.exists(CONFIG_FILE):
+        if os.path.exists(self.config_file):
             try:
-                with open(CONFIG_FILE, "r") as f:
+                with open(self.config_file, "r") as f:
                     config = json.load(f)
                     self.servo_up_angle = config.get("up_angle", DEFAULT_SERVO_UP_ANGLE)
                     self.servo_down_angle = config.get("down_angle", DEFAULT_SERVO_DOWN_ANGLE)
                     print(f"Loaded calibration: UP={self.servo_up_angle}°, DOWN={self.servo_down_angle}°")
-            except (json.JSONDecodeError, IOError) as e:
+                    if "sensor_filter" in config:
+                        self.sensor_filter.configure(**config["sensor_filter"])
+                    if "finish_policy" in config:
+                        self.finish_policy.configure(**config["finish_policy"])
+                    self.release_latency_ms = config.get("release_latency_ms", {})
+            except (json.JSONDecodeError, IOError, TypeError, ValueError) as e:
                 print(f"Failed to load calibration: {e}, using defaults")
     
     def _saveCalibration(self):
@@ -77,8 +147,11 @@ class HardwareInterface:
         config = {
             "up_angle": self.servo_up_angle,
             "down_angle": self.servo_down_angle,
+            "sensor_filter": self.sensor_filter.getSettings(),
+            "finish_policy": self.finish_policy.getSettings(),
+            "release_latency_ms": self.release_latency_ms,
         }
-        with open(CONFIG_FILE, "w") as f:
+        with open(self.config_file, "w") as f:
             json.dump(config, f, indent=2)
         print(f"Saved calibration: UP={self.servo_up_angle}°, DOWN={self.servo_down_angle}°")
     
@@ -86,6 +159,109 @@ class HardwareInterface:
         """Set callback function to be called when race results are ready."""
         self._result_callback = callback
     
+    def setEventCallback(self, callback: Callable):
+        """Set an async callback for live heat events (race_start, split) for displays."""
+        self._event_callback = callback
+    
+    async def _countdown(self, heat_id: str):
+        """Announce when the gate will drop, then wait for that moment.
+        
+        The race_start event carries the drop time on the server's monotonic
+        clock; displays convert it with the offset from their time_sync
+        pings. Raises ValueError if the heat is cancelled meanwhile.
+        """
+        countdown_ms = self.current_heat.countdown_ms
+        if countdown_ms is None:
+            countdown_ms = RACE_COUNTDOWN_MS
+        now_ns = time.monotonic_ns()
+        drop_at_ns = now_ns + int(countdown_ms * 1_000_000)
+        if self._event_callback:
+            await self._event_callback({
+                "type": "race_start",
+                "heat_id": heat_id,
+                "occupied_lanes": self.current_heat.occupied_lanes,
+                "countdown_ms": countdown_ms,
+                "server_ms": now_ns / 1_000_000,
+                "gate_drop_ms": drop_at_ns / 1_000_000,
+            })
+        if countdown_ms > 0:
+            await asyncio.to_thread(self._waitUntil, drop_at_ns)
+        if self._heat_cancelled:
+            print(f"Heat {heat_id} cancelled during countdown")
+            raise ValueError(f"Heat cancelled - false start for {heat_id}")
+    
+    def _waitUntil(self, deadline_ns: int):
+        """Sleep until a monotonic time, spinning the last COUNTDOWN_SPIN_MS (blocking, stops on cancel)."""
+        spin_ns = COUNTDOWN_SPIN_MS * 1_000_000
+        while not self._heat_cancelled:
+            remaining_ns = deadline_ns - time.monotonic_ns()
+            if remaining_ns <= 0:
+                return
+            if remaining_ns > spin_ns:
+                time.sleep(min((remaining_ns - spin_ns) / 1e9, COUNTDOWN_POLL_SEC))
+    
+    def _getSplitChannel(self, point_index: int, lane: int) -> int:
+        """Sensor channel of a split point on a lane (1-indexed)."""
+        return self.split_channel + point_index * self.num_tracks + lane - 1
+    
+    def _emitSplit(self, loop: Optional[asyncio.AbstractEventLoop], heat_id: str, lane: int,
+                   point_index: int, time_ns: int, prev_time_ns: Optional[int]):
+        """Hand a split event to the callback on the event loop (safe from the capture thread)."""
+        if self._event_callback and loop:
+            event = self._makeSplitEvent(heat_id, lane, point_index, time_ns, prev_time_ns)
+            asyncio.run_coroutine_threadsafe(self._event_callback(event), loop)
+    
+    def _makeSplitEvent(self, heat_id: str, lane: int, point_index: int,
+                        time_ns: int, prev_time_ns: Optional[int]) -> dict:
+        """Live split message for /ws/results (times in ns from the start)."""
+        point = self.split_points[point_index]
+        prev_distance_m = self.split_points[point_index - 1].distance_m if point_index else 0.0
+        return {
+            "type": "split",
+            "heat_id": heat_id,
+            "lane": lane,
+            "point": point.name,
+            "point_index": point_index,
+            "time_ms": round(time_ns / 1_000_000, 2),
+            "speed_mps": _trapSpeed(point.distance_m - prev_distance_m, time_ns, prev_time_ns),
+        }
+    
+    def _buildSplits(self, split_times_ns: List[Optional[int]],
+                     finish_ns: Optional[int]) -> Tuple[Optional[List[SplitTime]], Optional[float]]:
+        """Split times and trap speeds for one lane (times in ns from the start).
+        
+        Returns (splits, finish_speed_mps); splits is None without split points.
+        """
+        splits = None
+        prev_distance_m, prev_time_ns = 0.0, 0
+        if self.split_points:
+            splits = []
+            for point, time_ns in zip(self.split_points, split_times_ns):
+                splits.append(SplitTime(
+                    name=point.name,
+                    time_ms=round(time_ns / 1_000_000, 2) if time_ns is not None else None,
+                    speed_mps=_trapSpeed(point.distance_m - prev_distance_m, time_ns, prev_time_ns),
+                ))
+                prev_distance_m, prev_time_ns = point.distance_m, time_ns
+        finish_speed_mps = None
+        if self.finish_distance_m is not None:
+            finish_speed_mps = _trapSpeed(self.finish_distance_m - prev_distance_m, finish_ns, prev_time_ns)
+        return splits, finish_speed_mps
+    
+    def _resolvePlaces(self, heat_id: str, finish_times_ns: Dict[int, int],
+                       finish_windows_ns: Dict[int, int]) -> Tuple[Dict[int, int], Optional[List[Dict]]]:
+        """Places from the raw edges, and tie groups (None if there are none) - see photofinish.py."""
+        tie_threshold_ms = self.current_heat.tie_threshold_ms
+        if tie_threshold_ms is None:
+            tie_threshold_ms = TIE_THRESHOLD_MS
+        places, ties = resolvePlaces(
+            {lane: (finish_ns, finish_windows_ns[lane]) for lane, finish_ns in finish_times_ns.items()},
+            tie_threshold_ms,
+        )
+        for tie in ties:
+            print(f"Heat {heat_id} photo finish: {formatTie(tie)}")
+        return places, ties or None
+    
     def setGate(self, is_down: bool):
         """Set gate position (up=holding, down=released)."""
         raise NotImplementedError
@@ -107,8 +283,14 @@ class HardwareInterface:
         return {
             "up_angle": self.servo_up_angle,
             "down_angle": self.servo_down_angle,
+            "release_latency_ms": self.release_latency_ms.get(self._getReleaseKey()),
+            "has_start_sensor": self.has_start_sensor,
         }
     
+    def _getReleaseKey(self) -> str:
+        """Release latency depends on how far the servo travels."""
+        return f"{self.servo_up_angle}-{self.servo_down_angle}"
+    
     def setCalibration(self, up_angle: int, down_angle: int):
         """Set and persist servo calibration."""
         max_angle = int(os.environ.get("SERVO_ACTUATION_RANGE", 120))
@@ -117,8 +299,21 @@ class HardwareInterface:
         self._saveCalibration()
         return self.getCalibration()
     
+    def getSensorFilter(self) -> dict:
+        """Get sensor debounce settings and rejected-glitch counts."""
+        return self.sensor_filter.getStatus()
+    
+    def setSensorFilter(self, min_pulse_us: int, confirm_k: int, confirm_n: int) -> dict:
+        """Set and persist sensor debounce settings (ValueError if invalid)."""
+        self.sensor_filter.configure(min_pulse_us, confirm_k, confirm_n)
+        self._saveCalibration()
+        print(f"Sensor filter: min pulse {min_pulse_us}µs, confirm {confirm_k} of {confirm_n} samples")
+        return self.getSensorFilter()
+    
     def prepareRace(self, setup: HeatSetup):
         """Prepare for a race with given configuration."""
+        # Refuse before touching the running heat or the gate
+        self.checkSensors(setup.occupied_lanes)
         # Cancel any in-progress heat (false start handling)
         self._heat_cancelled = True
         self.current_heat = setup
@@ -127,40 +322,189 @@ class HardwareInterface:
     
     async def runRace(self) -> HeatResult:
         """Execute the race and return results."""
+        self.is_racing = True
+        try:
+            return await self._runRace()
+        finally:
+            self.is_racing = False
+    
+    async def _runRace(self) -> HeatResult:
+        """Race implementation; calls _markTimingDone() once the last car is timed. Override in subclass."""
         raise NotImplementedError
     
+    def _markTimingDone(self):
+        """Timing is complete - the track is ready for the next heat while results are built and saved."""
+        self.timing_done_ns = time.monotonic_ns()
+        self.is_racing = False
+    
+    def getFinishPolicy(self) -> dict:
+        """Get heat termination policy settings and learned state."""
+        return self.finish_policy.getStatus()
+    
+    def setFinishPolicy(self, mode: str, margin_ms: float, factor: float, quantile: float) -> dict:
+        """Set and persist the heat termination policy (ValueError if invalid)."""
+        self.finish_policy.configure(mode, margin_ms, factor, quantile)
+        self._saveCalibration()
+        print(f"Finish policy: {mode}")
+        return self.getFinishPolicy()
+    
+    def _waitForEdge(self, channel: int, after_ns: int, timeout_ms: float) -> Optional[int]:
+        """Time of the first debounced edge (either way) on a sensor channel after `after_ns` (blocking).
+        
+        Uses the sampler's edge times when it's running, else polls the pins.
+        Returns None on timeout.
+        """
+        deadline_ns = after_ns + int(timeout_ms * 1_000_000)
+        initial = self.readSensorMask() >> channel & 1
+        while time.monotonic_ns() < deadline_ns:
+            if self.sampler:
+                edge_ns = self.sensor_filter.last_edge_ns[channel]
+                if edge_ns >= after_ns:
+                    return edge_ns
+            elif self.readSensorMask() >> channel & 1 != initial:
+                return time.monotonic_ns()
+            time.sleep(CAPTURE_POLL_SEC)
+        return None
+    
+    def _getStartTime(self, drop_ns: int) -> tuple:
+        """When the cars were released, given when the gate was commanded down (blocking).
+        
+        Returns (start_time_ns, start_source) with source "sensor", "calibrated" or "fixed".
+        """
+        if self.has_start_sensor:
+            edge_ns = self._waitForEdge(self.start_channel, drop_ns, START_SENSOR_TIMEOUT_MS)
+            if edge_ns is not None:
+                return edge_ns, "sensor"
+            print(f"Start sensor saw no release within {START_SENSOR_TIMEOUT_MS}ms, using calibrated latency")
+        latency_ms = self.release_latency_ms.get(self._getReleaseKey())
+        if latency_ms is not None:
+            return drop_ns + int(latency_ms * 1_000_000), "calibrated"
+        return drop_ns + GATE_SETTLE_MS * 1_000_000, "fixed"
+    
+    async def calibrateRelease(self, cycles: int = 5, probe_lane: Optional[int] = None) -> dict:
+        """Measure gate release latency for the current servo angles and store it.
+        
+        Drops the gate `cycles` times and times each drop command to the
+        first edge on the start sensor - or, without one, on `probe_lane`'s
+        sensor temporarily placed so the gate flap breaks or clears its beam.
+        Don't run it during a heat: it moves the gate.
+        """
+        if probe_lane is not None:
+            if not 1 <= probe_lane <= self.num_tracks:
+                raise ValueError(f"Invalid probe lane {probe_lane}. Must be 1-{self.num_tracks}")
+            channel = probe_lane - 1
+        elif self.has_start_sensor:
+            channel = self.start_channel
+        else:
+            raise ValueError("No start sensor - pass probe_lane to time the gate with a lane sensor")
+        if not 1 <= cycles <= 20:
+            raise ValueError("cycles must be 1-20")
+        return await asyncio.to_thread(self._measureRelease, channel, cycles)
+    
+    def _measureRelease(self, channel: int, cycles: int) -> dict:
+        """Blocking part of calibrateRelease."""
+        samples_ms = []
+        for _ in range(cycles):
+            self.raiseGate()
+            time.sleep(RELEASE_RESET_SEC)
+            drop_ns = time.monotonic_ns()
+            self.dropGate()
+            edge_ns = self._waitForEdge(channel, drop_ns, RELEASE_RESET_SEC * 1000)
+            if edge_ns is not None:
+                samples_ms.append(round((edge_ns - drop_ns) / 1_000_000, 2))
+        self.raiseGate()
+        if not samples_ms:
+            raise ValueError("Sensor saw no gate movement - check its position and wiring")
+        
+        samples_ms.sort()
+        self.release_latency_ms[self._getReleaseKey()] = samples_ms[len(samples_ms) // 2]
+        self._saveCalibration()
+        print(f"Gate release latency: {samples_ms[len(samples_ms) // 2]}ms (samples {samples_ms})")
+        return {**self.getCalibration(), "samples_ms": samples_ms}
+    
+    def getBlockedMask(self) -> int:
+        """Debounced lane states (raw when no sampler is feeding the filter)."""
+        return self.sensor_filter.mask if self.sampler else self.readSensorMask()
+    
+    def checkSensors(self, occupied_lanes: List[int]):
+        """Pre-race check: every occupied lane's beam must be clear (raises SensorCheckError)."""
+        mask = self.getBlockedMask()
+        blocked = [lane for lane in occupied_lanes if mask >> (lane - 1) & 1]
+        if blocked:
+            lanes = ", ".join(str(lane) for lane in blocked)
+            raise SensorCheckError(
+                f"Sensor blocked on lane {lanes} - clear the finish line or check beam alignment"
+            )
+    
+    def getSensorHealth(self) -> List[Dict]:
+        """Per-lane sensor health from the sampler's monitor (empty without a sampler)."""
+        if not self.sampler:
+            return []
+        return self.sampler.health.getLanes()[:self.num_tracks]
+    
     def getStatus(self) -> dict:
         """Get current hardware status."""
         return {
             "num_tracks": self.num_tracks,
             "is_gate_down": self.is_gate_down,
             "current_heat_id": self.current_heat.heat_id if self.current_heat else None,
+            "is_racing": self.is_racing,
             "calibration": self.getCalibration(),
         }
     
-    def getSensorStates(self) -> List[Dict]:
-        """Get current state of all lane sensors. Override in subclass."""
+    def readSensorMask(self) -> int:
+        """Read all lane sensors at once: bit i set = lane i+1 blocked. Override in subclass."""
         raise NotImplementedError
     
-    def getHardwareStatus(self) -> Dict:
-        """Get real-time hardware status for WebSocket streaming."""
+    def startSampler(self, path: str = SENSOR_STATE_PATH):
+        """Start the background sensor sampler that publishes to shared memory."""
+        if not self.sampler:
+            self.sampler = SensorSampler(self, path)
+            self.sampler.start()
+    
+    def getSensorStates(self) -> List[Dict]:
+        """Get current state of all lane sensors (from the sampler when running)."""
+        if self.sampler:
+            return getSensorStatesFromSnapshot(self.sampler.read())
+        mask = self.readSensorMask()
+        return [
+            {"lane": i + 1, "is_blocked": bool(mask >> i & 1)}
+            for i in range(self.num_tracks)
+        ]
+    
+    def getHardwareStatus(self, is_raw: bool = False) -> Dict:
+        """Get real-time hardware status for WebSocket streaming (is_raw adds edge times)."""
+        if self.sampler:
+            return getHardwareStatusFromSnapshot(self.sampler.read(), is_raw)
         return {
             "is_gate_down": self.is_gate_down,
             "servo_angle": self.current_servo_angle,
             "sensors": self.getSensorStates(),
             "timestamp_ms": int(time.time() * 1000),
         }
+    
+    def cleanup(self):
+        """Stop background sampling."""
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler = None
 
 
 class MockHardware(HardwareInterface):
     """Mock hardware for local development and testing."""
     
-    def __init__(self, num_tracks: int = 4):
-        super().__init__(num_tracks)
+    def __init__(self, num_tracks: int = 4, config_file: str = CONFIG_FILE, start_pin: Optional[int] = None,
+                 split_points: Optional[List[SplitPointConfig]] = None, finish_distance_m: Optional[float] = None):
+        super().__init__(num_tracks, config_file, start_pin, split_points, finish_distance_m)
         # Mock sensor states (randomly fluctuate for demo)
-        self._mock_sensor_states = [False] * num_tracks
+        self._mock_sensor_mask = 0
+        self._next_toggle_ns = 0
+        self._gate_dropped_ns = 0  # Drives the simulated start sensor
+        self._stuck_mask = sum(1 << (lane - 1) for lane in MOCK_BLOCKED_LANES if 1 <= lane <= num_tracks)
     
     def setGate(self, is_down: bool):
+        if is_down and not self.is_gate_down:
+            self._gate_dropped_ns = time.monotonic_ns()
         self.is_gate_down = is_down
         self.current_servo_angle = self.servo_down_angle if is_down else self.servo_up_angle
         position = "DOWN (released)" if is_down else "UP (holding)"
@@ -172,19 +516,25 @@ class MockHardware(HardwareInterface):
         self.current_servo_angle = angle
         print(f"[MOCK] Servo moved to {angle}°")
     
-    def getSensorStates(self) -> List[Dict]:
+    def readSensorMask(self) -> int:
         """Get mock sensor states."""
-        # Add some randomness for testing
-        if random.random() < 0.05:  # 5% chance to toggle a random sensor
-            idx = random.randint(0, self.num_tracks - 1)
-            self._mock_sensor_states[idx] = not self._mock_sensor_states[idx]
-        
-        return [
-            {"lane": i + 1, "is_blocked": self._mock_sensor_states[i]}
-            for i in range(self.num_tracks)
-        ]
+        # Add some randomness for testing: toggle a random sensor about once a second
+        now_ns = time.monotonic_ns()
+        if now_ns >= self._next_toggle_ns:
+            if self._next_toggle_ns:
+                self._mock_sensor_mask ^= 1 << random.randint(0, self.num_tracks - 1)
+            self._next_toggle_ns = now_ns + int(random.uniform(0.2, 2.0) * 1_000_000_000)
+        mask = self._mock_sensor_mask | self._stuck_mask
+        if (self.has_start_sensor and self.is_gate_down
+                and now_ns - self._gate_dropped_ns >= MOCK_RELEASE_MS * 1_000_000):
+            mask |= 1 << self.start_channel  # Gate has swung clear
+        return mask
     
-    async def runRace(self) -> HeatResult:
+    def getBlockedMask(self) -> int:
+        """Only simulated stuck beams count; the demo noise stands for cars passing by."""
+        return self._stuck_mask
+    
+    async def _runRace(self) -> HeatResult:
         """Simulate a race with random finish times."""
         if not self.current_heat:
             raise ValueError("No heat configured - call prepareRace first")
@@ -193,12 +543,13 @@ class MockHardware(HardwareInterface):
         self._heat_cancelled = False
         heat_id = self.current_heat.heat_id
         
+        # Count down, then drop the gate to release cars - START timing
+        await self._countdown(heat_id)
         started_at = datetime.now()
-        
-        # Drop the gate to release cars - START timing
+        drop_ns = time.monotonic_ns()
         self.dropGate()
-        start_time_ns = time.monotonic_ns()
-        print(f"[MOCK] Heat {self.current_heat.heat_id} started")
+        start_time_ns, start_source = await asyncio.to_thread(self._getStartTime, drop_ns)
+        print(f"[MOCK] Heat {self.current_heat.heat_id} started ({start_source} start)")
         
         # Simulate heat duration (2-5 seconds typical for pinewood derby)
         # Check cancel flag during simulation
@@ -207,26 +558,51 @@ class MockHardware(HardwareInterface):
                 print(f"[MOCK] Heat {heat_id} cancelled (false start)")
                 raise ValueError(f"Heat cancelled - false start for {heat_id}")
             await asyncio.sleep(0.1)
+        self._markTimingDone()
         
         # Generate mock results for occupied lanes only
         lane_results: List[LaneResult] = []
         finish_times: List[tuple] = []
+        tie_ms = random.uniform(2500, 4500)
         
         for lane in self.current_heat.occupied_lanes:
             # Random finish time between 2.5 and 4.5 seconds (typical derby times)
-            finish_time_ms = random.uniform(2500, 4500)
+            finish_time_ms = tie_ms if lane in MOCK_TIE_LANES else random.uniform(2500, 4500)
             finish_times.append((lane, finish_time_ms))
         
-        # Sort by finish time to assign places
+        # Sort by finish time; the finish policy decides who's too late
         finish_times.sort(key=lambda x: x[1])
+        deadline_ms = self.finish_policy.getDeadlineMs(finish_times[0][1] if finish_times else None)
         
-        for place, (lane, finish_time_ms) in enumerate(finish_times, start=1):
+        # Seen by a sampler: each edge lands on the next sample, up to one interval late
+        sample_ns = int(1_000_000_000 / SENSOR_SAMPLE_HZ)
+        finish_times_ns = {
+            lane: -(-int(finish_time_ms * 1_000_000) // sample_ns) * sample_ns
+            for lane, finish_time_ms in finish_times if finish_time_ms <= deadline_ms
+        }
+        place_map, ties = self._resolvePlaces(heat_id, finish_times_ns, dict.fromkeys(finish_times_ns, sample_ns))
+        tied_lanes = {lane for tie in ties or [] for lane in tie["lanes"]}
+        
+        lane_splits_ns = {lane: self._mockSplits(finish_time_ms) for lane, finish_time_ms in finish_times}
+        await self._emitMockSplits(heat_id, lane_splits_ns)
+        for lane, _ in finish_times:
+            split_times_ns = lane_splits_ns[lane]
+            if lane not in finish_times_ns:
+                splits, _ = self._buildSplits(split_times_ns, None)
+                lane_results.append(LaneResult(lane_number=lane, is_dnf=True, splits=splits))
+                continue
+            splits, finish_speed_mps = self._buildSplits(split_times_ns, finish_times_ns[lane])
             lane_results.append(LaneResult(
                 lane_number=lane,
-                finish_time_ms=round(finish_time_ms, 2),
-                place=place,
+                finish_time_ms=round(finish_times_ns[lane] / 1_000_000, 2),
+                place=place_map[lane],
                 is_dnf=False,
+                splits=splits,
+                finish_speed_mps=finish_speed_mps,
+                finish_uncertainty_ms=round(sample_ns / 1_000_000, 3),
+                is_tie=lane in tied_lanes,
             ))
+        self.finish_policy.observe(result.finish_time_ms for result in lane_results if result.finish_time_ms)
         
         # Add empty results for unoccupied lanes
         occupied_set = set(self.current_heat.occupied_lanes)
@@ -248,6 +624,9 @@ class MockHardware(HardwareInterface):
             finished_at=datetime.now(),
             lane_results=lane_results,
             is_complete=True,
+            start_source=start_source,
+            release_ms=round((start_time_ns - drop_ns) / 1_000_000, 2),
+            ties=ties,
         )
         
         # Raise gate back up for next heat
@@ -255,41 +634,74 @@ class MockHardware(HardwareInterface):
         print(f"[MOCK] Race complete: {result}")
         
         return result
+    
+    async def _emitMockSplits(self, heat_id: str, lane_splits_ns: Dict[int, List[int]]):
+        """Announce simulated splits in the order the cars would have passed them."""
+        if not self._event_callback:
+            return
+        events = [
+            (time_ns, lane, point_index, split_times_ns[point_index - 1] if point_index else 0)
+            for lane, split_times_ns in lane_splits_ns.items()
+            for point_index, time_ns in enumerate(split_times_ns)
+        ]
+        for time_ns, lane, point_index, prev_ns in sorted(events):
+            await self._event_callback(self._makeSplitEvent(heat_id, lane, point_index, time_ns, prev_ns))
+    
+    def _mockSplits(self, finish_time_ms: float) -> List[int]:
+        """Split times (ns) for a car accelerating down the slope to finish at finish_time_ms."""
+        if not self.split_points:
+            return []
+        finish_distance_m = self.finish_distance_m or self.split_points[-1].distance_m * 1.25
+        return [
+            int(finish_time_ms * 1_000_000 * min(1.0, point.distance_m / finish_distance_m) ** 0.7)
+            for point in self.split_points
+        ]
 
 
 class RealHardware(HardwareInterface):
     """Real Raspberry Pi hardware interface using PCA9685 + GPIO."""
     
-    def __init__(self, num_tracks: int = 4):
-        super().__init__(num_tracks)
+    def __init__(self, num_tracks: int = 4, servo_channel: int = SERVO_CHANNEL,
+                 sensor_pins: Optional[List[int]] = None, config_file: str = CONFIG_FILE,
+                 start_pin: Optional[int] = None, split_points: Optional[List[SplitPointConfig]] = None,
+                 finish_distance_m: Optional[float] = None):
+        super().__init__(num_tracks, config_file, start_pin, split_points, finish_distance_m)
         self.pca = None
         self.servo = None
         self.GPIO = None
-        self.sensor_pins: List[int] = []
+        self.servo_channel = servo_channel
+        self.sensor_pins: List[int] = list(sensor_pins or [])
+        self._input_pins: List[int] = []  # Every sensor pin, in channel order
         self._initHardware()
     
     def _initHardware(self):
         """Initialize PCA9685 servo driver and GPIO sensors."""
-        # Initialize I2C and PCA9685
+        global _shared_pca, _pca_users
+        
+        # Initialize I2C and PCA9685 (once, shared by every track)
         try:
             import board
             import busio
             from adafruit_pca9685 import PCA9685
             from adafruit_motor import servo as adafruit_servo
             
-            i2c = busio.I2C(board.SCL, board.SDA)
-            self.pca = PCA9685(i2c)
-            self.pca.frequency = SERVO_FREQ
+            with _pca_lock:
+                if _shared_pca is None:
+                    i2c = busio.I2C(board.SCL, board.SDA)
+                    _shared_pca = PCA9685(i2c)
+                    _shared_pca.frequency = SERVO_FREQ
+                self.pca = _shared_pca
+                _pca_users += 1
             
             # Create servo on configured channel
             self.servo = adafruit_servo.Servo(
-                self.pca.channels[SERVO_CHANNEL],
+                self.pca.channels[self.servo_channel],
                 min_pulse=SERVO_MIN_PULSE,
                 max_pulse=SERVO_MAX_PULSE,
                 actuation_range=SERVO_ACTUATION_RANGE,
             )
             
-            print(f"PCA9685 initialized: channel={SERVO_CHANNEL}, freq={SERVO_FREQ}Hz")
+            print(f"PCA9685 initialized: channel={self.servo_channel}, freq={SERVO_FREQ}Hz")
             
         except ImportError as e:
             raise RuntimeError(f"PCA9685 libraries not available: {e}")
@@ -303,19 +715,30 @@ class RealHardware(HardwareInterface):
             GPIO.setmode(GPIO.BCM)
             GPIO.setwarnings(False)
             
-            # Sensor pins (one per lane, configurable via env)
+            # Sensor pins (one per lane, from track config or env)
             # Default: GPIO 17, 27, 22, 23 for lanes 1-4
-            default_sensor_pins = [17, 27, 22, 23]
-            self.sensor_pins = []
+            if not self.sensor_pins:
+                self.sensor_pins = [
+                    int(os.environ.get(f"SENSOR_PIN_{i+1}", DEFAULT_SENSOR_PINS[i]))
+                    for i in range(self.num_tracks)
+                ]
             
-            for i in range(self.num_tracks):
-                pin = int(os.environ.get(f"SENSOR_PIN_{i+1}", default_sensor_pins[i]))
-                self.sensor_pins.append(pin)
+            for pin in self.sensor_pins:
                 # SEN0503 is open-collector, needs pull-up
                 # Output goes LOW when beam is broken
                 GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
             
-            print(f"GPIO sensors initialized: pins={self.sensor_pins}")
+            if self.has_start_sensor:
+                # Start beam or gate switch, wired like the finish sensors
+                GPIO.setup(self.start_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            
+            # Split sensors: same beams and wiring, one per lane at each point
+            split_pins = [pin for point in self.split_points for pin in point.pins]
+            for pin in split_pins:
+                GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            
+            self._input_pins = self.sensor_pins + ([self.start_pin] if self.has_start_sensor else []) + split_pins
+            print(f"GPIO sensors initialized: pins={self.sensor_pins}, start={self.start_pin}, splits={split_pins}")
             
         except ImportError:
             raise RuntimeError("RPi.GPIO not available - are you running on a Raspberry Pi?")
@@ -345,20 +768,18 @@ class RealHardware(HardwareInterface):
         self.current_servo_angle = angle
         print(f"Servo test: moved to {angle}°")
     
-    def getSensorStates(self) -> List[Dict]:
-        """Get current state of all lane sensors."""
-        states = []
-        for lane in range(1, self.num_tracks + 1):
-            pin_index = lane - 1
-            if pin_index < len(self.sensor_pins):
-                # SEN0503: LOW = beam broken = car present
-                is_blocked = self.GPIO.input(self.sensor_pins[pin_index]) == self.GPIO.LOW
-            else:
-                is_blocked = False
-            states.append({"lane": lane, "is_blocked": is_blocked})
-        return states
+    def readSensorMask(self) -> int:
+        """Read every sensor (lanes, start, split points) into a bitmask of channels."""
+        mask = 0
+        gpio_input = self.GPIO.input
+        low = self.GPIO.LOW
+        for channel, pin in enumerate(self._input_pins):
+            # SEN0503: LOW = beam broken = car present
+            if gpio_input(pin) == low:
+                mask |= 1 << channel
+        return mask
     
-    async def runRace(self) -> HeatResult:
+    async def _runRace(self) -> HeatResult:
         """Run a race, monitoring sensors for finish times.
         
         Timing starts when gate drops (cars released).
@@ -371,63 +792,35 @@ class RealHardware(HardwareInterface):
         self._heat_cancelled = False
         heat_id = self.current_heat.heat_id  # Capture for logging if cancelled
         
-        started_at = datetime.now()
         occupied_lanes = set(self.current_heat.occupied_lanes)
         
-        # Track finish times (nanoseconds from start)
-        finish_times_ns: Dict[int, int] = {}
-        lanes_finished: set = set()
-        
-        # DROP THE GATE - this is when timing starts!
+        # Count down, then DROP THE GATE - timing starts at the measured (or calibrated) release
+        await self._countdown(heat_id)
+        started_at = datetime.now()
+        drop_ns = time.monotonic_ns()
         self.dropGate()
-        
-        # Small delay for gate mechanism to fully open
-        await asyncio.sleep(GATE_SETTLE_MS / 1000.0)
-        
-        # Record start time with high precision
-        start_time_ns = time.monotonic_ns()
-        print(f"Heat {self.current_heat.heat_id} started - timing started")
-        
-        # Monitor sensors until all occupied lanes finish or timeout
-        timeout_ns = int(SENSOR_TIMEOUT_SEC * 1_000_000_000)
-        
-        while len(lanes_finished) < len(occupied_lanes):
-            # Check if heat was cancelled (false start / re-run)
-            if self._heat_cancelled:
-                print(f"Heat {heat_id} cancelled (false start)")
-                raise ValueError(f"Heat cancelled - false start for {heat_id}")
-            
-            current_ns = time.monotonic_ns()
-            elapsed_ns = current_ns - start_time_ns
-            
-            if elapsed_ns > timeout_ns:
-                print(f"Race timeout after {SENSOR_TIMEOUT_SEC}s")
-                break
-            
-            # Check each occupied lane's sensor
-            for lane in occupied_lanes:
-                if lane not in lanes_finished:
-                    pin_index = lane - 1  # Convert 1-indexed lane to 0-indexed
-                    if pin_index < len(self.sensor_pins):
-                        # SEN0503: LOW = beam broken = car crossed
-                        if self.GPIO.input(self.sensor_pins[pin_index]) == self.GPIO.LOW:
-                            finish_times_ns[lane] = elapsed_ns
-                            lanes_finished.add(lane)
-                            finish_ms = elapsed_ns / 1_000_000
-                            print(f"Lane {lane} finished at {finish_ms:.2f}ms")
-            
-            # 1ms polling interval for ~1ms precision
-            await asyncio.sleep(0.001)
+        start_time_ns, start_source = await asyncio.to_thread(self._getStartTime, drop_ns)
+        release_ms = (start_time_ns - drop_ns) / 1_000_000
+        print(f"Heat {self.current_heat.heat_id} started - timing from {start_source} release at {release_ms:.1f}ms")
+        
+        # Monitor sensors in a dedicated thread so concurrent heats on other
+        # tracks (and API traffic) don't delay this track's polling
+        finish_times_ns, finish_windows_ns, split_times_ns = await asyncio.to_thread(
+            self._captureFinishes, heat_id, occupied_lanes, start_time_ns, asyncio.get_running_loop()
+        )
+        self._markTimingDone()
+        self.finish_policy.observe(finish_ns / 1_000_000 for finish_ns in finish_times_ns.values())
         
         # Build results
         lane_results: List[LaneResult] = []
         
-        # Sort finished lanes by time for place assignment
-        sorted_finishes = sorted(finish_times_ns.items(), key=lambda x: x[1])
-        place_map = {lane: place for place, (lane, _) in enumerate(sorted_finishes, start=1)}
+        # Places from the raw edges; finishes too close to order are ties
+        place_map, ties = self._resolvePlaces(heat_id, finish_times_ns, finish_windows_ns)
+        tied_lanes = {lane for tie in ties or [] for lane in tie["lanes"]}
         
         for lane in range(1, self.num_tracks + 1):
             if lane in occupied_lanes:
+                splits, finish_speed_mps = self._buildSplits(split_times_ns[lane], finish_times_ns.get(lane))
                 if lane in finish_times_ns:
                     finish_ms = finish_times_ns[lane] / 1_000_000
                     lane_results.append(LaneResult(
@@ -435,14 +828,19 @@ class RealHardware(HardwareInterface):
                         finish_time_ms=round(finish_ms, 2),
                         place=place_map[lane],
                         is_dnf=False,
+                        splits=splits,
+                        finish_speed_mps=finish_speed_mps,
+                        finish_uncertainty_ms=round(finish_windows_ns[lane] / 1_000_000, 3),
+                        is_tie=lane in tied_lanes,
                     ))
                 else:
-                    # DNF - didn't finish in time
+                    # DNF - didn't finish in time (splits show how far it got)
                     lane_results.append(LaneResult(
                         lane_number=lane,
                         finish_time_ms=None,
                         place=None,
                         is_dnf=True,
+                        splits=splits,
                     ))
             else:
                 # Unoccupied lane
@@ -462,28 +860,143 @@ class RealHardware(HardwareInterface):
             finished_at=datetime.now(),
             lane_results=lane_results,
             is_complete=True,
+            start_source=start_source,
+            release_ms=round(release_ms, 2),
+            ties=ties,
         )
         
         print(f"Race complete: {result}")
         return result
     
+    def _captureFinishes(self, heat_id: str, occupied_lanes: set, start_time_ns: int,
+                         loop: Optional[asyncio.AbstractEventLoop] = None) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, List]]:
+        """Wait until all occupied lanes finish or the finish policy ends the heat (blocking).
+        
+        A finish (or split) is the first debounced blocked edge after the
+        start, timed at the edge's original sample. The background sampler
+        feeds the filter when it's running; otherwise this loop samples the
+        pins itself. Lanes without a finish by the policy's deadline are DNF.
+        Split events go to the split callback on `loop` as they happen.
+        
+        Returns (finish times keyed by lane, each finish's window - the gap
+        back to the previous sample, split times per lane in point order -
+        None where a sensor missed the car), in nanoseconds.
+        """
+        finish_times_ns: Dict[int, int] = {}
+        finish_windows_ns: Dict[int, int] = {}
+        split_times_ns: Dict[int, List[Optional[int]]] = {lane: [None] * len(self.split_points) for lane in occupied_lanes}
+        lanes_finished: set = set()
+        is_sampled = self.sampler is not None
+        sensor_filter = self.sensor_filter
+        if not is_sampled:
+            sensor_filter = SensorFilter(self.sensor_filter.num_lanes, **self.sensor_filter.getSettings())
+            sensor_filter.mask = self.readSensorMask()
+            sensor_filter.last_sample_ns = time.monotonic_ns()
+        
+        # Monitor sensors until all occupied lanes finish or the deadline passes.
+        # The deadline moves once the leader finishes; edges up to the deadline
+        # still count if the filter confirms them a little later.
+        deadline_ns = int(self.finish_policy.getDeadlineMs() * 1_000_000)
+        grace_ns = sensor_filter.min_pulse_us * 1000 + int((sensor_filter.confirm_n + 2) * CAPTURE_POLL_SEC * 1e9)
+        is_leader_in = False
+        
+        while len(lanes_finished) < len(occupied_lanes):
+            # Check if heat was cancelled (false start / re-run)
+            if self._heat_cancelled:
+                print(f"Heat {heat_id} cancelled (false start)")
+                raise ValueError(f"Heat cancelled - false start for {heat_id}")
+            
+            current_ns = time.monotonic_ns()
+            elapsed_ns = current_ns - start_time_ns
+            
+            if elapsed_ns > deadline_ns + grace_ns:
+                print(f"Heat {heat_id} ended at {deadline_ns / 1_000_000:.0f}ms ({self.finish_policy.mode} policy), "
+                      f"DNF: {sorted(occupied_lanes - lanes_finished)}")
+                break
+            
+            if not is_sampled:
+                sensor_filter.update(current_ns, self.readSensorMask())
+            
+            # Check each occupied lane for a blocked edge since the start
+            for lane in occupied_lanes:
+                if lane not in lanes_finished:
+                    self._checkSplits(sensor_filter, heat_id, lane, split_times_ns[lane], start_time_ns,
+                                      deadline_ns, loop)
+                    lane_index = lane - 1  # Convert 1-indexed lane to 0-indexed
+                    if lane_index < len(self.sensor_pins):
+                        block_ns = sensor_filter.last_block_ns[lane_index]
+                        if start_time_ns <= block_ns <= start_time_ns + deadline_ns:
+                            finish_times_ns[lane] = block_ns - start_time_ns
+                            finish_windows_ns[lane] = sensor_filter.last_block_window_ns[lane_index]
+                            lanes_finished.add(lane)
+                            finish_ms = finish_times_ns[lane] / 1_000_000
+                            print(f"Lane {lane} finished at {finish_ms:.2f}ms")
+            
+            if finish_times_ns and not is_leader_in:
+                # Leader is in - the policy can now set the real deadline
+                is_leader_in = True
+                leader_ms = min(finish_times_ns.values()) / 1_000_000
+                deadline_ns = int(self.finish_policy.getDeadlineMs(leader_ms) * 1_000_000)
+            
+            # 1ms polling interval for ~1ms precision
+            time.sleep(CAPTURE_POLL_SEC)
+        
+        if not is_sampled:
+            for lane_index, count in enumerate(sensor_filter.glitches):
+                self.sensor_filter.glitches[lane_index] += count
+        return finish_times_ns, finish_windows_ns, split_times_ns
+    
+    def _checkSplits(self, sensor_filter: SensorFilter, heat_id: str, lane: int, lane_splits_ns: List[Optional[int]],
+                     start_time_ns: int, deadline_ns: int, loop: Optional[asyncio.AbstractEventLoop]):
+        """Record (and announce) split points the lane's car has passed since the last poll."""
+        for point_index, split_ns in enumerate(lane_splits_ns):
+            if split_ns is not None:
+                continue
+            block_ns = sensor_filter.last_block_ns[self._getSplitChannel(point_index, lane)]
+            if start_time_ns <= block_ns <= start_time_ns + deadline_ns:
+                lane_splits_ns[point_index] = block_ns - start_time_ns
+                prev_ns = lane_splits_ns[point_index - 1] if point_index else 0
+                self._emitSplit(loop, heat_id, lane, point_index, lane_splits_ns[point_index], prev_ns)
+    
     def cleanup(self):
         """Clean up hardware on shutdown."""
+        global _shared_pca, _pca_users
+        
+        super().cleanup()
         if self.pca:
-            self.pca.deinit()
+            # Other tracks may still be driving servos on the same board
+            with _pca_lock:
+                _pca_users -= 1
+                if _pca_users <= 0:
+                    self.pca.deinit()
+                    _shared_pca = None
         if self.GPIO:
-            self.GPIO.cleanup()
+            self.GPIO.cleanup(self._input_pins or self.sensor_pins)
 
 
-def MakeHardware(num_tracks: int = 4) -> HardwareInterface:
+def MakeHardware(num_tracks: int = 4, servo_channel: int = SERVO_CHANNEL,
+                 sensor_pins: Optional[List[int]] = None, config_file: str = CONFIG_FILE,
+                 start_pin: Optional[int] = None, split_points: Optional[List[SplitPointConfig]] = None,
+                 finish_distance_m: Optional[float] = None) -> HardwareInterface:
     """Factory method to create appropriate hardware interface."""
     if os.environ.get("MOCK_HARDWARE") == "1":
         print("Using MOCK hardware interface")
-        return MockHardware(num_tracks)
+        return MockHardware(num_tracks, config_file, start_pin, split_points, finish_distance_m)
+    
+    if os.environ.get("SIM_HARDWARE") == "1":
+        # The real interface on simulated GPIO/PCA9685 modules - see simhw.py
+        import simhw
+        simhw.install()
+        print("Using REAL hardware interface on SIMULATED GPIO/PCA9685")
+        hardware = RealHardware(num_tracks, servo_channel, sensor_pins, config_file, start_pin,
+                                split_points, finish_distance_m)
+        simhw.attach(hardware)
+        return hardware
     
     try:
         print("Attempting to use REAL hardware interface")
-        return RealHardware(num_tracks)
+        return RealHardware(num_tracks, servo_channel, sensor_pins, config_file, start_pin,
+                            split_points, finish_distance_m)
     except RuntimeError as e:
         print(f"Failed to init real hardware: {e}, falling back to mock")
-        return MockHardware(num_tracks)
+        return MockHardware(num_tracks, config_file, start_pin, split_points, finish_distance_m)
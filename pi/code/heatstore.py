@@ -0,0 +1,642 @@
+"""Columnar in-memory store for heat results.
+
+Heats are kept in typed arrays instead of nested dicts so that a long event
+history fits comfortably in a 1GB Pi:
+
+- Per heat: interned heat_id, started_at/finished_at as int64 microseconds,
+  release_ms as float32, a flag bitmask (which also holds start_source as
+  a small code) and the offset of its first lane in the lane columns.
+- Per lane: lane_number and place as int8, finish_time_ms,
+  finish_speed_mps and finish_uncertainty_ms as float32 and a flag bitmask
+  (which also holds is_tie).
+
+Dict views (the same shape as `HeatResult.model_dump(mode="json")`) are only
+built when a heat is served. Keys the columns don't know about are kept
+verbatim in a sparse side table so nothing is lost; optional model fields
+left at their default aren't stored at all and come back as the default.
+"""
+
+import copy
+import json
+import mmap
+import re
+import sys
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+# Heat flags
+HEAT_IS_COMPLETE = 0x01
+HEAT_HAS_FINISHED_AT = 0x02
+HEAT_IS_DELETED = 0x04
+HEAT_START_SOURCE_MASK = 0x18  # Code of start_source (index in START_SOURCES + 1; 0 = None)
+HEAT_START_SOURCE_SHIFT = 3
+HEAT_HAS_RELEASE = 0x20
+
+# Lane flags
+LANE_IS_DNF = 0x01
+LANE_HAS_TIME = 0x02
+LANE_HAS_PLACE = 0x04
+LANE_HAS_SPEED = 0x08
+LANE_HAS_UNCERTAINTY = 0x10
+LANE_IS_TIE = 0x20
+
+HEAT_KEYS = ("heat_id", "started_at", "finished_at", "lane_results", "is_complete", "release_ms")
+START_SOURCES = ("sensor", "calibrated", "fixed")
+
+# Optional model fields: not stored when at their default, filled back in when built
+HEAT_DEFAULTS = {"start_source": None, "release_ms": None, "ties": None}
+LANE_KEYS = ("lane_number", "finish_time_ms", "place", "is_dnf", "finish_speed_mps",
+             "finish_uncertainty_ms", "is_tie")
+LANE_DEFAULTS = {"splits": None, "finish_speed_mps": None, "finish_uncertainty_ms": None, "is_tie": False}
+
+EPOCH = datetime(1970, 1, 1)
+TIME_DECIMALS = 2  # LaneResult rounds finish times to 0.01ms
+SPEED_DECIMALS = 3  # Trap speeds are rounded to 1mm/s
+UNCERTAINTY_DECIMALS = 3
+
+# Compact once this fraction of rows are tombstones
+COMPACT_RATIO = 0.25
+
+# Decoded heats kept by MappedHeatStore
+LAZY_CACHE_SIZE = 256
+
+# Prefix of an encoded heat line (see encodeHeat) - lets the lazy index pull
+# out heat_id and started_at without decoding the body
+LINE_PREFIX = re.compile(rb'\{"heat_id":("(?:[^"\\]|\\.)*"),"started_at":"([^"]*)"')
+
+
+def _toMicros(value) -> Optional[int]:
+    """Convert an ISO string or naive datetime to microseconds since epoch.
+
+    Returns None for values that can't be stored losslessly as a naive
+    timestamp (the caller keeps those verbatim instead).
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime) or value.tzinfo is not None:
+        return None
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _extras(item: dict, keys: Tuple[str, ...], defaults: Dict) -> dict:
+    """Keys the columns don't cover, minus optional fields left at their default."""
+    return {
+        k: v for k, v in item.items()
+        if k not in keys and not (k in defaults and v == defaults[k])
+    }
+
+
+def _fromMicros(micros: int) -> str:
+    """Convert microseconds since epoch back to the ISO string pydantic emits."""
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def encodeHeat(heat: dict) -> bytes:
+    """Encode a heat as one compact JSON line, heat_id and started_at first."""
+    ordered = {"heat_id": heat.get("heat_id"), "started_at": heat.get("started_at")}
+    ordered.update(heat)
+    return json.dumps(ordered, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _inRange(started_at, start: Optional[datetime], end: Optional[datetime]) -> bool:
+    """Check an ISO started_at string against an optional [start, end] range."""
+    if start is None and end is None:
+        return True
+    try:
+        value = datetime.fromisoformat(str(started_at)).replace(tzinfo=None)
+    except ValueError:
+        return True
+    if start and value < start.replace(tzinfo=None):
+        return False
+    if end and value > end.replace(tzinfo=None):
+        return False
+    return True
+
+
+class HeatStore:
+    """Append-mostly columnar store of heats, oldest first."""
+
+    def __init__(self, heats: Optional[List[dict]] = None):
+        # Heat columns
+        self._heat_ids: List[str] = []
+        self._started_at = array("q")
+        self._finished_at = array("q")
+        self._release_ms = array("f")
+        self._heat_flags = array("B")
+        self._lane_offsets = array("I")
+        self._lane_counts = array("B")
+
+        # Lane columns
+        self._lane_numbers = array("b")
+        self._finish_times = array("f")
+        self._finish_speeds = array("f")
+        self._finish_uncertainties = array("f")
+        self._places = array("b")
+        self._lane_flags = array("B")
+
+        # Sparse side tables for keys the columns don't cover
+        self._heat_extras: Dict[int, dict] = {}
+        self._lane_extras: Dict[int, dict] = {}
+
+        self._index: Dict[str, int] = {}
+        self._num_deleted = 0
+
+        for heat in heats or []:
+            self.put(heat)
+
+    def __len__(self) -> int:
+        return len(self._heat_ids) - self._num_deleted
+
+    def __contains__(self, heat_id: str) -> bool:
+        return heat_id in self._index
+
+    # ----- Writes -----
+
+    def put(self, heat: dict):
+        """Store a heat as the most recent entry, replacing any with the same heat_id."""
+        heat_id = sys.intern(str(heat.get("heat_id")))
+        if heat_id in self._index:
+            self._delete(self._index[heat_id])
+
+        row = len(self._heat_ids)
+        extras = _extras(heat, HEAT_KEYS, HEAT_DEFAULTS)
+
+        started_at = _toMicros(heat.get("started_at"))
+        if started_at is None:
+            extras["started_at"] = heat.get("started_at")
+            started_at = 0
+
+        flags = HEAT_IS_COMPLETE if heat.get("is_complete") else 0
+        finished_at = 0
+        if heat.get("finished_at") is not None:
+            finished_at = _toMicros(heat["finished_at"])
+            if finished_at is None:
+                extras["finished_at"] = heat["finished_at"]
+                finished_at = 0
+            else:
+                flags |= HEAT_HAS_FINISHED_AT
+        start_source = extras.get("start_source")
+        if start_source in START_SOURCES:
+            del extras["start_source"]
+            flags |= (START_SOURCES.index(start_source) + 1) << HEAT_START_SOURCE_SHIFT
+        release_ms = heat.get("release_ms")
+        if release_ms is not None:
+            flags |= HEAT_HAS_RELEASE
+
+        lanes = heat.get("lane_results") or []
+        self._heat_ids.append(heat_id)
+        self._started_at.append(started_at)
+        self._finished_at.append(finished_at)
+        self._release_ms.append(float(release_ms) if release_ms is not None else 0.0)
+        self._heat_flags.append(flags)
+        self._lane_offsets.append(len(self._lane_numbers))
+        self._lane_counts.append(len(lanes))
+        if extras:
+            self._heat_extras[row] = extras
+
+        for lane in lanes:
+            self._appendLane(lane)
+
+        self._index[heat_id] = row
+
+    def _appendLane(self, lane: dict):
+        """Append one lane result to the lane columns."""
+        flags = LANE_IS_DNF if lane.get("is_dnf") else 0
+        if lane.get("is_tie"):
+            flags |= LANE_IS_TIE
+        finish_time = lane.get("finish_time_ms")
+        if finish_time is not None:
+            flags |= LANE_HAS_TIME
+        place = lane.get("place")
+        if place is not None:
+            flags |= LANE_HAS_PLACE
+        speed = lane.get("finish_speed_mps")
+        if speed is not None:
+            flags |= LANE_HAS_SPEED
+        uncertainty = lane.get("finish_uncertainty_ms")
+        if uncertainty is not None:
+            flags |= LANE_HAS_UNCERTAINTY
+
+        extras = _extras(lane, LANE_KEYS, LANE_DEFAULTS)
+        self._lane_numbers.append(int(lane.get("lane_number", 0)))
+        self._finish_times.append(float(finish_time) if finish_time is not None else 0.0)
+        self._finish_speeds.append(float(speed) if speed is not None else 0.0)
+        self._finish_uncertainties.append(float(uncertainty) if uncertainty is not None else 0.0)
+        self._places.append(int(place) if place is not None else 0)
+        self._lane_flags.append(flags)
+        if extras:
+            self._lane_extras[len(self._lane_numbers) - 1] = extras
+
+    def _delete(self, row: int):
+        """Tombstone a row; storage is reclaimed by the next compaction."""
+        del self._index[self._heat_ids[row]]
+        self._heat_flags[row] |= HEAT_IS_DELETED
+        self._num_deleted += 1
+        if self._num_deleted > COMPACT_RATIO * len(self._heat_ids):
+            self._compact()
+
+    def delete(self, heat_id: str) -> bool:
+        """Remove a heat by ID. Returns False if it wasn't stored."""
+        row = self._index.get(heat_id)
+        if row is None:
+            return False
+        self._delete(row)
+        return True
+
+    def peekOldest(self, count: int) -> List[dict]:
+        """Return (without removing) the `count` oldest heats, oldest first."""
+        return [self._buildHeat(row) for row in islice(self._liveRows(), max(count, 0))]
+
+    def _compact(self):
+        """Rewrite the columns without tombstoned rows."""
+        live_rows = list(self._liveRows())
+        old = (self._heat_ids, self._started_at, self._finished_at, self._release_ms, self._heat_flags,
+               self._lane_offsets, self._lane_counts, self._lane_numbers,
+               self._finish_times, self._finish_speeds, self._finish_uncertainties, self._places,
+               self._lane_flags, self._heat_extras, self._lane_extras)
+        (heat_ids, started_at, finished_at, release_ms, heat_flags, lane_offsets, lane_counts,
+         lane_numbers, finish_times, finish_speeds, finish_uncertainties, places, lane_flags,
+         heat_extras, lane_extras) = old
+
+        self._heat_ids = [heat_ids[row] for row in live_rows]
+        self._started_at = array("q", (started_at[row] for row in live_rows))
+        self._finished_at = array("q", (finished_at[row] for row in live_rows))
+        self._release_ms = array("f", (release_ms[row] for row in live_rows))
+        self._heat_flags = array("B", (heat_flags[row] for row in live_rows))
+        self._lane_counts = array("B", (lane_counts[row] for row in live_rows))
+        self._lane_offsets = array("I")
+        self._lane_numbers = array("b")
+        self._finish_times = array("f")
+        self._finish_speeds = array("f")
+        self._finish_uncertainties = array("f")
+        self._places = array("b")
+        self._lane_flags = array("B")
+        self._heat_extras = {}
+        self._lane_extras = {}
+
+        for new_row, row in enumerate(live_rows):
+            if row in heat_extras:
+                self._heat_extras[new_row] = heat_extras[row]
+            start = lane_offsets[row]
+            end = start + lane_counts[row]
+            self._lane_offsets.append(len(self._lane_numbers))
+            for i in range(start, end):
+                if i in lane_extras:
+                    self._lane_extras[len(self._lane_numbers)] = lane_extras[i]
+                self._lane_numbers.append(lane_numbers[i])
+                self._finish_times.append(finish_times[i])
+                self._finish_speeds.append(finish_speeds[i])
+                self._finish_uncertainties.append(finish_uncertainties[i])
+                self._places.append(places[i])
+                self._lane_flags.append(lane_flags[i])
+
+        self._index = {heat_id: row for row, heat_id in enumerate(self._heat_ids)}
+        self._num_deleted = 0
+
+    # ----- Reads -----
+
+    def _liveRows(self, newest_first: bool = False) -> Iterator[int]:
+        """Iterate over row numbers that aren't tombstoned."""
+        rows = range(len(self._heat_ids))
+        if newest_first:
+            rows = reversed(rows)
+        for row in rows:
+            if not self._heat_flags[row] & HEAT_IS_DELETED:
+                yield row
+
+    def _buildHeat(self, row: int) -> dict:
+        """Build the dict view of a stored heat."""
+        flags = self._heat_flags[row]
+        start = self._lane_offsets[row]
+        lane_results = []
+        for i in range(start, start + self._lane_counts[row]):
+            lane_flags = self._lane_flags[i]
+            lane = {
+                "lane_number": self._lane_numbers[i],
+                "finish_time_ms": round(self._finish_times[i], TIME_DECIMALS) if lane_flags & LANE_HAS_TIME else None,
+                "place": self._places[i] if lane_flags & LANE_HAS_PLACE else None,
+                "is_dnf": bool(lane_flags & LANE_IS_DNF),
+                **LANE_DEFAULTS,
+                "is_tie": bool(lane_flags & LANE_IS_TIE),
+            }
+            if lane_flags & LANE_HAS_SPEED:
+                lane["finish_speed_mps"] = round(self._finish_speeds[i], SPEED_DECIMALS)
+            if lane_flags & LANE_HAS_UNCERTAINTY:
+                lane["finish_uncertainty_ms"] = round(self._finish_uncertainties[i], UNCERTAINTY_DECIMALS)
+            if i in self._lane_extras:
+                lane.update(self._lane_extras[i])
+            lane_results.append(lane)
+
+        heat = {
+            "heat_id": self._heat_ids[row],
+            "started_at": _fromMicros(self._started_at[row]),
+            "finished_at": _fromMicros(self._finished_at[row]) if flags & HEAT_HAS_FINISHED_AT else None,
+            "lane_results": lane_results,
+            "is_complete": bool(flags & HEAT_IS_COMPLETE),
+            **HEAT_DEFAULTS,
+        }
+        source_code = (flags & HEAT_START_SOURCE_MASK) >> HEAT_START_SOURCE_SHIFT
+        if source_code:
+            heat["start_source"] = START_SOURCES[source_code - 1]
+        if flags & HEAT_HAS_RELEASE:
+            heat["release_ms"] = round(self._release_ms[row], TIME_DECIMALS)
+        if row in self._heat_extras:
+            heat.update(self._heat_extras[row])
+        return heat
+
+    def get(self, heat_id: str) -> Optional[dict]:
+        """Get a heat by ID."""
+        row = self._index.get(heat_id)
+        return self._buildHeat(row) if row is not None else None
+
+    def recent(self, limit: int) -> List[dict]:
+        """Get up to `limit` heats, most recent first."""
+        heats = []
+        for row in self._liveRows(newest_first=True):
+            if len(heats) >= limit:
+                break
+            heats.append(self._buildHeat(row))
+        return heats
+
+    def last(self) -> Optional[dict]:
+        """Get the most recent heat."""
+        heats = self.recent(1)
+        return heats[0] if heats else None
+
+    def iterHeats(self, newest_first: bool = False) -> Iterator[dict]:
+        """Lazily yield dict views of every stored heat."""
+        for row in self._liveRows(newest_first):
+            yield self._buildHeat(row)
+
+    def iterRange(self, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield heats that started within [start, end], oldest first.
+
+        The range is checked against the timestamp column, so only matching
+        heats are built.
+        """
+        for row in self._rowsInRange(start, end):
+            yield self._buildHeat(row)
+
+    def heatIdsInRange(self, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> List[str]:
+        """IDs of heats that started within [start, end], oldest first.
+
+        A snapshot that stays valid while heats are saved, unlike row numbers.
+        """
+        return [self._heat_ids[row] for row in self._rowsInRange(start, end)]
+
+    def _rowsInRange(self, start: Optional[datetime], end: Optional[datetime]) -> Iterator[int]:
+        """Live rows whose started_at falls within [start, end]."""
+        start_us = _toMicros(start.replace(tzinfo=None)) if start else None
+        end_us = _toMicros(end.replace(tzinfo=None)) if end else None
+        for row in self._liveRows():
+            started_at = self._started_at[row]
+            if start_us is not None and started_at < start_us:
+                continue
+            if end_us is not None and started_at > end_us:
+                continue
+            yield row
+
+    def encodedLines(self) -> Iterator[bytes]:
+        """Yield every heat encoded for the history file, most recent first."""
+        for heat in self.iterHeats(newest_first=True):
+            yield encodeHeat(heat)
+
+    def snapshot(self) -> "HeatStore":
+        """A copy later writes don't touch, safe to read from another thread.
+
+        Copies the columns as they are (no heats are built), so it's cheap.
+        """
+        snapshot = HeatStore.__new__(HeatStore)
+        snapshot.__dict__ = {name: copy.copy(value) for name, value in vars(self).items()}
+        return snapshot
+
+    # ----- Analytics -----
+
+    @contextmanager
+    def columns(self):
+        """Zero-copy memoryviews over the raw columns for analytics.
+
+        Rows include tombstones; skip heats with HEAT_IS_DELETED set. The
+        views are released on exit - the store can't grow while they're held.
+
+            with store.columns() as cols:
+                times = cols["finish_time_ms"]
+        """
+        views = {
+            "started_at_us": memoryview(self._started_at),
+            "finished_at_us": memoryview(self._finished_at),
+            "release_ms": memoryview(self._release_ms),
+            "heat_flags": memoryview(self._heat_flags),
+            "lane_offsets": memoryview(self._lane_offsets),
+            "lane_counts": memoryview(self._lane_counts),
+            "lane_number": memoryview(self._lane_numbers),
+            "finish_time_ms": memoryview(self._finish_times),
+            "finish_speed_mps": memoryview(self._finish_speeds),
+            "finish_uncertainty_ms": memoryview(self._finish_uncertainties),
+            "place": memoryview(self._places),
+            "lane_flags": memoryview(self._lane_flags),
+        }
+        try:
+            yield views
+        finally:
+            for view in views.values():
+                view.release()
+
+    @property
+    def heat_ids(self) -> List[str]:
+        """Interned heat IDs, aligned with the heat columns."""
+        return self._heat_ids
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and side tables."""
+        arrays = (self._started_at, self._finished_at, self._release_ms, self._heat_flags, self._lane_offsets,
+                  self._lane_counts, self._lane_numbers, self._finish_times, self._finish_speeds,
+                  self._finish_uncertainties, self._places, self._lane_flags)
+        total = sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+        total += sys.getsizeof(self._heat_ids) + sys.getsizeof(self._index)
+        total += sum(sys.getsizeof(heat_id) for heat_id in self._heat_ids)
+        total += sum(sys.getsizeof(extras) for extras in self._heat_extras.values())
+        total += sum(sys.getsizeof(extras) for extras in self._lane_extras.values())
+        return total
+
+
+class MappedHeatStore:
+    """Lazily-decoded heat store over a memory-mapped history file.
+
+    Opening only scans line boundaries to build a heat_id -> byte range index;
+    heat bodies are decoded on demand and kept in a small LRU cache. Heats
+    saved after startup are held as encoded lines. Exposes the same interface
+    as HeatStore.
+    """
+
+    def __init__(self, file_path: str):
+        self._mmap: Optional[mmap.mmap] = None
+        self._order: List[str] = []  # oldest first
+        self._bodies: Dict[str, Union[Tuple[int, int], bytes]] = {}
+        self._started_at: Dict[str, str] = {}
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._buildIndex(file_path)
+
+    def _buildIndex(self, file_path: str):
+        """Index line offsets of a history file written by HistoryManager.
+
+        Raises ValueError if the file isn't in the one-heat-per-line format
+        (e.g. an older pretty-printed file); the caller falls back to a full load.
+        """
+        with open(file_path, "rb") as f:
+            if f.seek(0, 2) == 0:
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        mm = self._mmap
+        size = len(mm)
+        newest_first = []
+        pos = mm.find(b"\n") + 1
+        if mm[:pos].strip() != b"[":
+            raise ValueError("History file is not line-indexed")
+
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                end = size
+            # Trim the trailing comma between array elements
+            line_end = end - 1 if end > pos and mm[end - 1] == ord(",") else end
+            match = LINE_PREFIX.match(mm, pos, line_end)
+            if match:
+                raw_id = match.group(1)
+                heat_id = json.loads(raw_id) if b"\\" in raw_id else raw_id[1:-1].decode("utf-8")
+                started_at = match.group(2).decode("utf-8")
+            else:
+                line = mm[pos:line_end].strip()
+                if line == b"]":
+                    break
+                if not line:
+                    pos = end + 1
+                    continue
+                heat = json.loads(line)
+                heat_id = str(heat.get("heat_id"))
+                started_at = str(heat.get("started_at"))
+            if heat_id not in self._bodies:
+                heat_id = sys.intern(heat_id)
+                newest_first.append(heat_id)
+                self._bodies[heat_id] = (pos, line_end - pos)
+                self._started_at[heat_id] = started_at
+            pos = end + 1
+
+        self._order = newest_first[::-1]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, heat_id: str) -> bool:
+        return heat_id in self._bodies
+
+    def _body(self, heat_id: str) -> bytes:
+        """Get the encoded line for a heat."""
+        body = self._bodies[heat_id]
+        if isinstance(body, tuple):
+            offset, length = body
+            return self._mmap[offset:offset + length]
+        return body
+
+    def _decode(self, heat_id: str) -> dict:
+        """Decode a heat, going through the LRU cache."""
+        heat = self._cache.get(heat_id)
+        if heat is not None:
+            self._cache.move_to_end(heat_id)
+            return heat
+        heat = json.loads(self._body(heat_id))
+        self._cache[heat_id] = heat
+        if len(self._cache) > LAZY_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return heat
+
+    # ----- Writes -----
+
+    def put(self, heat: dict):
+        """Store a heat as the most recent entry, replacing any with the same heat_id."""
+        heat_id = sys.intern(str(heat.get("heat_id")))
+        if heat_id in self._bodies:
+            self.delete(heat_id)
+        self._order.append(heat_id)
+        self._bodies[heat_id] = encodeHeat(heat)
+        self._started_at[heat_id] = str(heat.get("started_at"))
+
+    def delete(self, heat_id: str) -> bool:
+        """Remove a heat by ID. Returns False if it wasn't stored."""
+        if heat_id not in self._bodies:
+            return False
+        self._order.remove(heat_id)
+        del self._bodies[heat_id]
+        del self._started_at[heat_id]
+        self._cache.pop(heat_id, None)
+        return True
+
+    def peekOldest(self, count: int) -> List[dict]:
+        """Return (without removing) the `count` oldest heats, oldest first."""
+        return [self._decode(heat_id) for heat_id in self._order[:max(count, 0)]]
+
+    # ----- Reads -----
+
+    def get(self, heat_id: str) -> Optional[dict]:
+        """Get a heat by ID, decoding it if needed."""
+        if heat_id not in self._bodies:
+            return None
+        return self._decode(heat_id)
+
+    def recent(self, limit: int) -> List[dict]:
+        """Get up to `limit` heats, most recent first."""
+        return [self._decode(heat_id) for heat_id in reversed(self._order[-limit:])] if limit > 0 else []
+
+    def last(self) -> Optional[dict]:
+        """Get the most recent heat."""
+        return self._decode(self._order[-1]) if self._order else None
+
+    def iterHeats(self, newest_first: bool = False) -> Iterator[dict]:
+        """Lazily yield every stored heat."""
+        order = reversed(self._order) if newest_first else list(self._order)
+        for heat_id in order:
+            yield self._decode(heat_id)
+
+    def iterRange(self, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield heats that started within [start, end], oldest first.
+
+        Uses the started_at captured by the index, so only matching heats are decoded.
+        """
+        for heat_id in self.heatIdsInRange(start, end):
+            yield self._decode(heat_id)
+
+    def heatIdsInRange(self, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> List[str]:
+        """IDs of heats that started within [start, end], oldest first."""
+        return [heat_id for heat_id in self._order if _inRange(self._started_at[heat_id], start, end)]
+
+    def encodedLines(self) -> Iterator[bytes]:
+        """Yield every heat encoded for the history file, most recent first.
+
+        Heats that were never decoded are copied straight from the map.
+        """
+        for heat_id in reversed(self._order):
+            yield self._body(heat_id)
+
+    def snapshot(self) -> "MappedHeatStore":
+        """A copy later writes don't touch, safe to read from another thread (shares the map)."""
+        snapshot = MappedHeatStore.__new__(MappedHeatStore)
+        snapshot._mmap = self._mmap
+        snapshot._order = list(self._order)
+        snapshot._bodies = dict(self._bodies)
+        snapshot._started_at = dict(self._started_at)
+        snapshot._cache = OrderedDict()
+        return snapshot
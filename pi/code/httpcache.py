@@ -0,0 +1,114 @@
+"""Compressed, cacheable JSON responses.
+
+Scoreboards poll /history and /health over busy event Wi-Fi. Bodies above
+HTTP_COMPRESS_MIN_BYTES are gzip-compressed when the client sends
+Accept-Encoding: gzip, and every body carries an ETag so an unchanged poll
+gets a bodiless 304.
+
+History responses are cached already encoded (and compressed on first use),
+so a repeated request skips both serialization and compression. The cache
+is keyed on the history version, which HistoryManager bumps whenever its
+heats change (addHeat, and reloadIfChanged picking up another writer's save).
+"""
+
+import os
+import json
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+
+# Configuration from environment
+COMPRESS_MIN_BYTES = int(os.environ.get("HTTP_COMPRESS_MIN_BYTES", 1024))  # Smaller bodies aren't worth it
+COMPRESS_LEVEL = 6
+RESPONSE_CACHE_SIZE = 128  # Encoded bodies kept per track
+
+
+class EncodedBody:
+    """A serialized JSON body with its ETag and (lazily) its gzip encoding."""
+
+    __slots__ = ("body", "etag", "_gzip_body")
+
+    def __init__(self, payload: Any):
+        # Same encoding as FastAPI's JSONResponse
+        self.body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'W/"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+        self._gzip_body: Optional[bytes] = None
+
+    @property
+    def gzip_body(self) -> bytes:
+        if self._gzip_body is None:
+            self._gzip_body = gzip.compress(self.body, COMPRESS_LEVEL, mtime=0)
+        return self._gzip_body
+
+
+def acceptsGzip(request: Request) -> bool:
+    """Check Accept-Encoding for gzip (ignoring an explicit q=0)."""
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def makeJsonResponse(request: Request, encoded: EncodedBody, max_age: int = 0) -> Response:
+    """Serve an encoded body: 304 if the client has it, gzip if negotiated and worth it."""
+    headers = {
+        "ETag": encoded.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"max-age={max_age}, must-revalidate" if max_age else "no-cache",
+    }
+    if request.headers.get("if-none-match") == encoded.etag:
+        return Response(status_code=304, headers=headers)
+    if len(encoded.body) >= COMPRESS_MIN_BYTES and acceptsGzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(encoded.gzip_body, media_type="application/json", headers=headers)
+    return Response(encoded.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """LRU of encoded response bodies, emptied whenever the source version changes.
+
+    Safe to share between threadpool handlers: the entries are guarded by a
+    lock (not held while building), and a body is only kept if the version
+    it was built for is still current.
+    """
+
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE):
+        self.size = size
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, EncodedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int, build: Callable[[], Any]) -> Optional[EncodedBody]:
+        """Get the encoded body for `key`, calling `build()` on a miss.
+
+        A None payload (e.g. heat not found) is returned as None and not cached.
+        """
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+            self.misses += 1
+
+        payload = build()
+        if payload is None:
+            return None
+        encoded = EncodedBody(payload)
+        with self._lock:
+            # A save may have moved the version on while this was built from older data
+            if version == self.version:
+                self._entries[key] = encoded
+                if len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return encoded
@@ -0,0 +1,255 @@
+"""Load generator and soak test for a track controller.
+
+Runs concurrent /ws/status subscribers, /ws/results subscribers, /history
+pollers and back-to-back /race/run loops against a server (normally
+`cli.py serve --mock`), all over one pooled HTTP client, and reports
+throughput, dropped status frames, frame inter-arrival jitter and p50/p99
+latencies. Memory stays bounded on long soaks: latency samples are kept in
+a fixed-size reservoir.
+
+Usage:
+    python cli.py load --status 20 --results 20 --pollers 5 --races 1 --duration 600
+"""
+
+import json
+import math
+import time
+import random
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+# Constants
+RESERVOIR_SIZE = 50_000        # Latency samples kept per metric
+STATUS_RATE_HZ = 20            # /ws/status rate requested on connect (drops are measured against it)
+DROP_FACTOR = 1.5              # A gap this many intervals long counts as dropped frames
+POLL_INTERVAL_SEC = 1.0        # Default delay between /history polls per poller
+RACE_BUSY_BACKOFF_SEC = 0.1    # Wait before retrying a heat the track rejected as busy (409)
+
+
+class Samples:
+    """Running count/mean/stddev plus a reservoir for percentiles (bounded memory)."""
+
+    def __init__(self, size: int = RESERVOIR_SIZE):
+        self.size = size
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = 0.0
+        self._reservoir: List[float] = []
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.max = max(self.max, value)
+        if len(self._reservoir) < self.size:
+            self._reservoir.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.size:
+                self._reservoir[slot] = value
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        if not self._reservoir:
+            return 0.0
+        ordered = sorted(self._reservoir)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def describe(self) -> str:
+        if not self.count:
+            return "-"
+        return (f"p50 {self.percentile(0.5):.1f}ms  p99 {self.percentile(0.99):.1f}ms  "
+                f"max {self.max:.1f}ms")
+
+
+class LoadStats:
+    """Counters and latency samples shared by every worker."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.status_frames = 0
+        self.status_dropped = 0
+        self.status_latency = Samples()     # Server sample timestamp -> received
+        self.status_interval = Samples()    # Frame inter-arrival time
+        self.results_received = 0
+        self.results_missed = 0             # Sequence gaps on /ws/results
+        self.result_latency = Samples()     # Heat finished_at -> received
+        self.polls = 0
+        self.poll_latency = Samples()
+        self.races = 0
+        self.races_cancelled = 0
+        self.race_latency = Samples()
+        self.errors: Dict[str, int] = {}
+        self.connections = 0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self) -> str:
+        elapsed = time.monotonic() - self.started
+        jitter = self.status_interval.stddev
+        lines = [
+            f"--- {elapsed:.0f}s, {self.connections} WebSockets open ---",
+            f"status   {self.status_frames / elapsed:8.1f} frames/s  dropped {self.status_dropped}  "
+            f"jitter {jitter:.1f}ms  latency {self.status_latency.describe()}",
+            f"results  {self.results_received:8d} received  missed {self.results_missed}  "
+            f"latency {self.result_latency.describe()}",
+            f"history  {self.polls / elapsed:8.1f} req/s  latency {self.poll_latency.describe()}",
+            f"races    {self.races:8d} run  cancelled {self.races_cancelled}  latency {self.race_latency.describe()}",
+        ]
+        if self.errors:
+            lines.append("errors   " + ", ".join(f"{kind}: {count}" for kind, count in sorted(self.errors.items())))
+        return "\n".join(lines)
+
+
+def _wsUrl(base_url: str, path: str) -> str:
+    return base_url.replace("http", "ws", 1).rstrip("/") + path
+
+
+async def statusSubscriber(base_url: str, stats: LoadStats, rate_hz: float = STATUS_RATE_HZ):
+    """Follow /ws/status at `rate_hz`, counting frames, gaps and inter-arrival jitter."""
+    interval_ms = 1000 / rate_hz
+    while True:
+        try:
+            async with websockets.connect(_wsUrl(base_url, f"/ws/status?rate_hz={rate_hz:g}")) as ws:
+                stats.connections += 1
+                try:
+                    last_ns = None
+                    async for message in ws:
+                        now_ns = time.monotonic_ns()
+                        frame = json.loads(message)
+                        if frame.get("type") != "hardware_status":
+                            continue
+                        stats.status_frames += 1
+                        stats.status_latency.add(max(0.0, time.time() * 1000 - frame["data"]["timestamp_ms"]))
+                        if last_ns is not None:
+                            gap_ms = (now_ns - last_ns) / 1_000_000
+                            stats.status_interval.add(gap_ms)
+                            if gap_ms > DROP_FACTOR * interval_ms:
+                                stats.status_dropped += round(gap_ms / interval_ms) - 1
+                        last_ns = now_ns
+                finally:
+                    stats.connections -= 1
+        except (OSError, websockets.WebSocketException) as e:
+            stats.error(f"status {type(e).__name__}")
+            await asyncio.sleep(1.0)
+
+
+async def resultsSubscriber(base_url: str, stats: LoadStats):
+    """Follow /ws/results, resuming by sequence number and counting gaps."""
+    last_seq: Optional[int] = None
+    stream_id: Optional[str] = None
+    while True:
+        path = "/ws/results"
+        if last_seq is not None:
+            path += f"?last_seq={last_seq}&stream_id={stream_id}"
+        try:
+            async with websockets.connect(_wsUrl(base_url, path)) as ws:
+                stats.connections += 1
+                try:
+                    async for message in ws:
+                        event = json.loads(message)
+                        if event.get("type") == "resync_needed":
+                            stats.error("results resync")
+                            last_seq, stream_id = event["seq"], event["stream_id"]
+                        elif event.get("type") == "race_result":
+                            stats.results_received += 1
+                            if last_seq is not None and event["stream_id"] == stream_id:
+                                stats.results_missed += max(0, event["seq"] - last_seq - 1)
+                            last_seq, stream_id = event["seq"], event["stream_id"]
+                            finished_at = event["data"].get("finished_at")
+                            if finished_at:
+                                age = datetime.now() - datetime.fromisoformat(finished_at)
+                                stats.result_latency.add(max(0.0, age.total_seconds() * 1000))
+                finally:
+                    stats.connections -= 1
+        except (OSError, websockets.WebSocketException) as e:
+            stats.error(f"results {type(e).__name__}")
+            await asyncio.sleep(1.0)
+
+
+async def historyPoller(client: httpx.AsyncClient, stats: LoadStats, interval_sec: float, limit: int):
+    """Poll /history like a scoreboard tablet."""
+    # Spread pollers out instead of firing in lockstep
+    await asyncio.sleep(random.uniform(0, interval_sec))
+    while True:
+        start_ns = time.monotonic_ns()
+        try:
+            r = await client.get("/history", params={"limit": limit})
+            r.raise_for_status()
+            stats.polls += 1
+            stats.poll_latency.add((time.monotonic_ns() - start_ns) / 1_000_000)
+        except httpx.HTTPError as e:
+            stats.error(f"history {type(e).__name__}")
+        await asyncio.sleep(interval_sec)
+
+
+async def raceLoop(client: httpx.AsyncClient, stats: LoadStats, track_path: str, lanes: List[int], loop_id: int):
+    """Run heats back to back on one track."""
+    heat_num = 0
+    while True:
+        heat_num += 1
+        start_ns = time.monotonic_ns()
+        try:
+            r = await client.post(f"{track_path}/race/run", json={
+                "heat_id": f"load-{loop_id}-{heat_num}",
+                "occupied_lanes": lanes,
+            })
+            if r.status_code == 409:
+                stats.races_cancelled += 1
+                await asyncio.sleep(RACE_BUSY_BACKOFF_SEC)
+                continue
+            r.raise_for_status()
+            stats.races += 1
+            stats.race_latency.add((time.monotonic_ns() - start_ns) / 1_000_000)
+        except httpx.HTTPError as e:
+            stats.error(f"race {type(e).__name__}")
+            await asyncio.sleep(1.0)
+
+
+async def runLoad(base_url: str, num_status: int = 10, num_results: int = 10, num_pollers: int = 2,
+                  num_races: int = 1, duration_sec: float = 60.0, report_sec: float = 10.0,
+                  poll_interval_sec: float = POLL_INTERVAL_SEC, history_limit: int = 100,
+                  status_hz: float = STATUS_RATE_HZ) -> LoadStats:
+    """Run the load mix for `duration_sec` (0 = until cancelled), printing a report every `report_sec`."""
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=num_pollers + num_races + 4,
+                          max_keepalive_connections=num_pollers + num_races + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        # Race loops go to different tracks where the controller has several
+        track_paths = [""]
+        try:
+            r = await client.get("/tracks")
+            r.raise_for_status()
+            track_paths = [f"/tracks/{track['name']}" for track in r.json()["tracks"]]
+        except (httpx.HTTPError, KeyError, ValueError):
+            pass
+        health = (await client.get(f"{track_paths[0]}/health")).json()
+        lanes = list(range(1, health["num_tracks"] + 1))
+
+        tasks = [asyncio.create_task(statusSubscriber(base_url, stats, status_hz)) for _ in range(num_status)]
+        tasks += [asyncio.create_task(resultsSubscriber(base_url, stats)) for _ in range(num_results)]
+        tasks += [asyncio.create_task(historyPoller(client, stats, poll_interval_sec, history_limit))
+                  for _ in range(num_pollers)]
+        tasks += [asyncio.create_task(raceLoop(client, stats, track_paths[i % len(track_paths)], lanes, i))
+                  for i in range(num_races)]
+        try:
+            deadline = time.monotonic() + duration_sec if duration_sec else None
+            while deadline is None or time.monotonic() < deadline:
+                remaining = report_sec if deadline is None else min(report_sec, deadline - time.monotonic())
+                await asyncio.sleep(max(0.0, remaining))
+                print(stats.report())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
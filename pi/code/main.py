@@ -5,43 +5,124 @@ FastAPI server for controlling the race gate, reading sensors, and reporting res
 
 import os
 import json
+import time
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from datetime import datetime
+from fastapi import FastAPI, APIRouter, Depends, Header, Request, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import Response, StreamingResponse
+from typing import Dict, Optional
 
-from models import HeatSetup, HeatResult, GatePosition, HealthResponse, ServoCalibration, ServoTestRequest
-from storage import HistoryManager
-from hardware import MakeHardware
+from models import (HeatSetup, HeatResult, GatePosition, HealthResponse, ServoCalibration, ServoTestRequest, TrackInfo,
+                    ReleaseCalibrationRequest,
+                    SensorFilterSettings, SensorFilterStatus, FinishPolicySettings, FinishPolicyStatus,
+                    PipelineStatus)
 from discovery import registerService, unregisterService
+from daemon import RemoteHardware
+from startup import StartupTracker
+from tracks import Track, MakeTracks
+from export import iterExport, EXPORT_FORMATS
+from httpcache import EncodedBody, makeJsonResponse
+from hardware import SensorCheckError, MAX_COUNTDOWN_MS
+from statusstream import StatusSubscriber, STATUS_STREAM_HZ
+from photofinish import MAX_TIE_THRESHOLD_MS
 
 # Configuration from environment
-NUM_TRACKS = int(os.environ.get("NUM_TRACKS", 4))
 API_PORT = int(os.environ.get("API_PORT", 8000))
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 5000))  # Target for accepting requests
+IMPORT_TIME_NS = time.monotonic_ns()
+DAEMON_SOCKET = os.environ.get("HARDWARE_DAEMON_SOCKET")  # Set to use a separate hardware daemon
+
+
+def getProcessAgeMs() -> float:
+    """Milliseconds since this process started (Linux), or since import elsewhere."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # starttime is field 22, counted after the ")" that ends the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        uptime_sec = time.clock_gettime(time.CLOCK_BOOTTIME)
+        return (uptime_sec - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError, AttributeError):
+        return (time.monotonic_ns() - IMPORT_TIME_NS) / 1_000_000
 
 # Global state
-history_manager = HistoryManager()
-hardware = None
-active_websockets: List[WebSocket] = []
+startup = StartupTracker()
+tracks: Dict[str, Track] = {}
+default_track: Optional[Track] = None
+serving_ms: Optional[float] = None
+first_health_ms: Optional[float] = None
+
+
+async def loadHistory():
+    """Load every track's heat history in worker threads."""
+    with startup.step("history"):
+        await asyncio.gather(*(asyncio.to_thread(track.loadHistory) for track in tracks.values()))
+
+
+def initTrackHardware(track: Track):
+    """Initialize one track's I2C/GPIO (or fall back to mock).
+    
+    With HARDWARE_DAEMON_SOCKET set, connect to the hardware daemon instead.
+    """
+    if DAEMON_SOCKET:
+        track.hardware = RemoteHardware(DAEMON_SOCKET, track.name, track.sensor_state_path)
+    else:
+        track.initHardware()
+
+
+async def initHardware():
+    """Initialize every track's hardware in worker threads."""
+    with startup.step("hardware"):
+        await asyncio.gather(*(asyncio.to_thread(initTrackHardware, track) for track in tracks.values()))
+
+
+async def registerDiscovery():
+    """Register the mDNS service in the background - the API doesn't wait for it."""
+    with startup.step("discovery"):
+        if not await registerService(default_track.config.num_lanes, API_PORT, list(tracks)):
+            startup.fail("discovery")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown lifecycle management."""
-    global hardware
+    global default_track, serving_ms
     
-    # Startup
-    hardware = MakeHardware(NUM_TRACKS)
-    await registerService(NUM_TRACKS, API_PORT)
-    print(f"Track Controller API started with {NUM_TRACKS} tracks")
+    tracks.update(MakeTracks())
+    default_track = next(iter(tracks.values()))
+    
+    # Startup - independent steps run concurrently, mDNS doesn't block serving
+    startup.expect("history", "hardware")
+    await asyncio.gather(loadHistory(), initHardware())
+    if DAEMON_SOCKET:
+        # Daemon registers mDNS once for all workers, runs the pipeline and publishes results
+        background_tasks = [
+            asyncio.create_task(track.hardware.subscribe(track.onDaemonEvent))
+            for track in tracks.values()
+        ]
+    else:
+        startup.expect("discovery")
+        background_tasks = [asyncio.create_task(registerDiscovery())]
+        await asyncio.gather(*(track.startPipeline() for track in tracks.values()))
+    startup.markServing()
+    serving_ms = round(getProcessAgeMs(), 1)
+    print(f"Serving {serving_ms:.0f}ms after process start")
+    if serving_ms > STARTUP_BUDGET_MS:
+        print(f"Warning: startup exceeded budget of {STARTUP_BUDGET_MS:.0f}ms")
+    print(f"Track Controller API started with {len(tracks)} track(s): {', '.join(tracks)}")
     
     yield
     
     # Shutdown
+    for task in background_tasks:
+        if not task.done():
+            task.cancel()
     await unregisterService()
-    if hasattr(hardware, "cleanup"):
-        hardware.cleanup()
+    for track in tracks.values():
+        if track.pipeline:
+            await track.pipeline.stop()
+        track.cleanup()
     print("Track Controller API shut down")
 
 
@@ -61,45 +142,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Track-scoped routes: mounted at the root for the default track (or
+# ?track_name=...) and again under /tracks/{track_name}
+router = APIRouter()
+
+
+def getTrack(track_name: Optional[str] = None) -> Track:
+    """Resolve the track a request refers to (default track if not named)."""
+    if track_name is None:
+        return default_track
+    track = tracks.get(track_name)
+    if not track:
+        raise HTTPException(status_code=404, detail=f"Track {track_name} not found")
+    return track
+
+
+# ----- Tracks -----
+
+@app.get("/tracks")
+def getTracks():
+    """List the tracks hosted by this controller."""
+    infos = [TrackInfo(**track.getInfo()) for track in tracks.values()]
+    return {"tracks": infos, "count": len(infos)}
+
 
 # ----- Health & Discovery -----
 
-@app.get("/health", response_model=HealthResponse)
-def healthCheck():
+@router.get("/health", response_model=HealthResponse)
+def healthCheck(request: Request, track: Track = Depends(getTrack)):
     """Health check endpoint for service discovery."""
-    return HealthResponse(
-        status="healthy",
-        num_tracks=hardware.num_tracks,
-        is_gate_down=hardware.is_gate_down,
-        current_heat_id=hardware.current_heat.heat_id if hardware.current_heat else None,
+    global first_health_ms
+    
+    if first_health_ms is None:
+        first_health_ms = round(getProcessAgeMs(), 1)
+        print(f"First /health response {first_health_ms:.0f}ms after process start")
+    
+    status = track.hardware.getStatus()
+    health = HealthResponse(
+        status="healthy" if startup.isReady("history", "hardware") else "starting",
+        num_tracks=status["num_tracks"],
+        is_gate_down=status["is_gate_down"],
+        current_heat_id=status["current_heat_id"],
+        history_load_ms=round(track.history_manager.load_ms, 1),
+        time_to_serving_ms=serving_ms,
+        time_to_first_health_ms=first_health_ms,
+        track_name=track.name,
+        tracks=list(tracks),
+        sensors=track.hardware.getSensorHealth(),
+        **startup.getSummary(),
     )
+    # Changes with gate/heat state, so compressed and ETagged but not cached
+    return makeJsonResponse(request, EncodedBody(health.model_dump(mode="json")))
 
 
 # ----- Gate Control -----
 
-@app.get("/gate")
-def getGatePosition():
+@router.get("/gate")
+def getGatePosition(track: Track = Depends(getTrack)):
     """Get current gate position."""
-    return {"is_gate_down": hardware.is_gate_down}
+    return {"is_gate_down": track.hardware.is_gate_down}
 
 
-@app.post("/gate")
-def setGatePosition(position: GatePosition):
+@router.post("/gate")
+def setGatePosition(position: GatePosition, track: Track = Depends(getTrack)):
     """Set gate position (up or down)."""
-    hardware.setGate(position.is_down)
-    return {"is_gate_down": hardware.is_gate_down}
+    track.hardware.setGate(position.is_down)
+    return {"is_gate_down": track.hardware.is_gate_down}
 
 
 # ----- Servo Calibration -----
 
-@app.get("/servo/calibration")
-def getServoCalibration():
+@router.get("/servo/calibration")
+def getServoCalibration(track: Track = Depends(getTrack)):
     """Get current servo angle calibration."""
-    return hardware.getCalibration()
+    return track.hardware.getCalibration()
 
 
-@app.post("/servo/calibration")
-def setServoCalibration(calibration: ServoCalibration):
+@router.post("/servo/calibration")
+def setServoCalibration(calibration: ServoCalibration, track: Track = Depends(getTrack)):
     """
     Set servo angle calibration.
     
@@ -107,124 +227,293 @@ def setServoCalibration(calibration: ServoCalibration):
     - up_angle: Angle when gate holds cars (before race)
     - down_angle: Angle when gate releases cars (race start)
     """
-    return hardware.setCalibration(calibration.up_angle, calibration.down_angle)
+    return track.hardware.setCalibration(calibration.up_angle, calibration.down_angle)
+
+
+@router.post("/servo/calibration/release")
+async def calibrateRelease(request: ReleaseCalibrationRequest, track: Track = Depends(getTrack)):
+    """
+    Measure and store the gate release latency for the current servo angles.
+    
+    Drops the gate `cycles` times, timing each drop to the first edge on the
+    start sensor (or on `probe_lane`'s sensor placed at the gate). Heats then
+    start timing at gate command + this latency when no start sensor is fitted.
+    Takes about a second per cycle; don't run it during a heat.
+    """
+    try:
+        return await track.hardware.calibrateRelease(request.cycles, request.probe_lane)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/servo/test")
-def testServoAngle(request: ServoTestRequest):
+@router.post("/servo/test")
+def testServoAngle(request: ServoTestRequest, track: Track = Depends(getTrack)):
     """
     Move servo to a specific angle for testing/calibration.
     
     Use this to find the correct up_angle and down_angle for your track.
     Angle range: 0-180 degrees.
     """
-    hardware.testServoAngle(request.angle)
+    track.hardware.testServoAngle(request.angle)
     return {"angle": request.angle, "message": f"Servo moved to {request.angle}°"}
 
 
+# ----- Sensor Filtering -----
+
+@router.get("/sensors/filter", response_model=SensorFilterStatus)
+def getSensorFilter(track: Track = Depends(getTrack)):
+    """Get sensor debounce settings and how many glitches each lane has rejected."""
+    return track.hardware.getSensorFilter()
+
+
+@router.post("/sensors/filter", response_model=SensorFilterStatus)
+def setSensorFilter(settings: SensorFilterSettings, track: Track = Depends(getTrack)):
+    """
+    Set sensor debounce settings (persisted with the servo calibration).
+    
+    - min_pulse_us: how long a new beam state must last before it counts
+    - confirm_k / confirm_n: the new state must show in k of the last n samples
+    
+    Finish times keep the timestamp of the original edge either way.
+    """
+    try:
+        return track.hardware.setSensorFilter(settings.min_pulse_us, settings.confirm_k, settings.confirm_n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ----- Race Execution -----
 
-@app.post("/race/run")
-async def runRace(setup: HeatSetup):
+@router.post("/race/run")
+async def runRace(setup: HeatSetup, track: Track = Depends(getTrack)):
     """
     Start a race heat.
     
     Accepts heat_id and occupied_lanes, drops the gate, monitors sensors,
-    and returns results. Results are also broadcast via WebSocket and persisted.
+    and returns results as soon as they're journaled. Persisting to history
+    and the WebSocket broadcast follow in the background (see postrace.py).
+    A race_start message on /ws/results announces the gate drop time first;
+    countdown_ms delays the drop so displays can count down to it.
+    Finishes too close to order share a place and are listed in `ties`;
+    tie_threshold_ms widens that to a margin (see photofinish.py).
     
     If a heat is already in progress and a new heat is started (false start),
     the previous heat is cancelled and only the new heat's results are returned.
+    
+    Refused with 409 (gate stays up) if an occupied lane's beam is already blocked.
     """
     # Validate lanes
     for lane in setup.occupied_lanes:
-        if lane < 1 or lane > hardware.num_tracks:
+        if lane < 1 or lane > track.hardware.num_tracks:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid lane {lane}. Must be 1-{hardware.num_tracks}"
+                detail=f"Invalid lane {lane}. Must be 1-{track.hardware.num_tracks}"
             )
+    if setup.countdown_ms is not None and not 0 <= setup.countdown_ms <= MAX_COUNTDOWN_MS:
+        raise HTTPException(status_code=400, detail=f"countdown_ms must be 0-{MAX_COUNTDOWN_MS}")
+    if setup.tie_threshold_ms is not None and not 0 <= setup.tie_threshold_ms <= MAX_TIE_THRESHOLD_MS:
+        raise HTTPException(status_code=400, detail=f"tie_threshold_ms must be 0-{MAX_TIE_THRESHOLD_MS}")
     
     # Prepare and run the race
-    hardware.prepareRace(setup)
-    
     try:
-        result = await hardware.runRace()
+        track.hardware.prepareRace(setup)
+        if track.pipeline:
+            track.pipeline.markRaceStart()
+        result = await track.hardware.runRace()
+    except SensorCheckError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         # Heat was cancelled (false start) - return 409 Conflict
         if "cancelled" in str(e).lower():
             raise HTTPException(status_code=409, detail=str(e))
         raise
     
-    # Persist result
     result_dict = result.model_dump(mode="json")
-    history_manager.saveHeat(result_dict)
-    
-    # Broadcast to WebSocket clients
-    await broadcastResult(result_dict)
+    if getattr(track.hardware, "is_remote", False):
+        # Daemon's pipeline persists it and publishes it to every worker
+        return result_dict
     
+    # Durable hand-off; persisting and broadcasting follow in the background, in order
+    await track.pipeline.submit(result_dict, track.hardware.timing_done_ns)
     return result_dict
 
 
-async def broadcastResult(result: dict):
-    """Broadcast race result to all connected WebSocket clients."""
-    message = json.dumps({"type": "race_result", "data": result})
-    disconnected = []
+@router.get("/race/pipeline", response_model=PipelineStatus)
+def getPipelineStatus(track: Track = Depends(getTrack)):
+    """Post-race queue depth, stage timings and the turnaround between heats."""
+    if track.pipeline:
+        return track.getPipelineStatus()
+    return track.hardware.getPipelineStatus()  # The daemon runs the pipeline
+
+
+@router.post("/race/pipeline/retry", response_model=PipelineStatus)
+def retryPipeline(track: Track = Depends(getTrack)):
+    """Queue heats whose persist failed (listed in persist_failed) again."""
+    if track.pipeline:
+        return track.retryPipeline()
+    return track.hardware.retryPipeline()
+
+
+@router.get("/race/policy", response_model=FinishPolicyStatus)
+def getFinishPolicy(track: Track = Depends(getTrack)):
+    """Get the heat termination policy and what the learned policy currently expects."""
+    return track.hardware.getFinishPolicy()
+
+
+@router.post("/race/policy", response_model=FinishPolicyStatus)
+def setFinishPolicy(settings: FinishPolicySettings, track: Track = Depends(getTrack)):
+    """
+    Set when heats end (persisted with the servo calibration).
     
-    for ws in active_websockets:
-        try:
-            await ws.send_text(message)
-        except Exception:
-            disconnected.append(ws)
+    - fixed: wait for every car up to the sensor timeout
+    - margin: end margin_ms after the leader
+    - multiple: end at factor x the leader's time
+    - learned: end at the quantile of recent finish times plus margin_ms
     
-    # Clean up disconnected clients
-    for ws in disconnected:
-        active_websockets.remove(ws)
+    Lanes that haven't finished by then are DNF.
+    """
+    try:
+        return track.hardware.setFinishPolicy(settings.mode, settings.margin_ms, settings.factor, settings.quantile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # ----- History / State Recovery -----
 
-@app.get("/history")
-def getHistory(limit: int = 100):
+def getCachedHistory(request: Request, track: Track, key: tuple, build) -> Optional[Response]:
+    """Serve a history response from the track's encoded-body cache (None if `build` found nothing)."""
+    encoded = track.response_cache.get(key, track.history_manager.version, build)
+    return makeJsonResponse(request, encoded) if encoded else None
+
+
+@router.get("/history")
+def getHistory(request: Request, limit: int = 100, track: Track = Depends(getTrack)):
     """Get recent heat results for state recovery."""
-    heats = history_manager.getHeats(limit)
+    def build():
+        heats = track.history_manager.getHeats(limit)
+        return {"heats": heats, "count": len(heats)}
+    return getCachedHistory(request, track, ("history", limit), build)
+
+
+@router.get("/history/range")
+def getHistoryRange(start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 1000,
+                    track: Track = Depends(getTrack)):
+    """Get heats that started within a date range, including archived heats (oldest first)."""
+    heats = track.history_manager.getHeatsInRange(start, end, limit)
     return {"heats": heats, "count": len(heats)}
 
 
-@app.get("/history/{heat_id}")
-def getHeatById(heat_id: str):
+@router.get("/history/archive")
+def getArchiveSummary(track: Track = Depends(getTrack)):
+    """List archive segments (day, time range, heat count) without their contents."""
+    segments = track.history_manager.archive.getSummary()
+    return {"segments": segments, "archived_heats": len(track.history_manager.archive)}
+
+
+@router.get("/history/export")
+async def exportHistory(format: str = "ndjson", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        is_gzip: bool = False, track: Track = Depends(getTrack)):
+    """
+    Stream every heat in a date range (incl. archived), oldest first.
+    
+    format=ndjson gives one heat per line, format=csv one row per lane result.
+    is_gzip=true compresses the stream (a .gz file, not Content-Encoding).
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    
+    # Snapshot of the hot store taken here; Starlette iterates the (sync)
+    # generator in its threadpool so encoding doesn't stall the event loop
+    chunks = iterExport(track.history_manager.iterHeatsInRange(start, end), format, is_gzip)
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    filename = f"heats-{track.name}.{format}"
+    if is_gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.get("/history/{heat_id}")
+def getHeatById(request: Request, heat_id: str, track: Track = Depends(getTrack)):
     """Get a specific heat result by ID."""
-    heat = history_manager.getHeatById(heat_id)
-    if not heat:
+    response = getCachedHistory(request, track, ("heat", heat_id),
+                                lambda: track.history_manager.getHeatById(heat_id))
+    if not response:
         raise HTTPException(status_code=404, detail=f"Heat {heat_id} not found")
-    return heat
+    return response
 
 
-@app.get("/history/last")
-def getLastHeat():
+@router.get("/history/last")
+def getLastHeat(request: Request, track: Track = Depends(getTrack)):
     """Get the most recent heat result."""
-    heat = history_manager.getLastHeat()
-    if not heat:
+    response = getCachedHistory(request, track, ("last",), track.history_manager.getLastHeat)
+    if not response:
         raise HTTPException(status_code=404, detail="No heats recorded yet")
-    return heat
+    return response
 
 
 # ----- WebSocket for Real-time Results -----
 
-@app.websocket("/ws/results")
-async def resultsWebsocket(websocket: WebSocket):
+async def replayResults(websocket: WebSocket, track: Track, last_seq: int, stream_id: Optional[str]):
+    """Send the results a reconnecting client missed, or a resync notice.
+    
+    The client is taken off the broadcast list while catching up, so results
+    published meanwhile are replayed in order instead of interleaved.
+    """
+    is_listening = websocket in track.active_websockets
+    if is_listening:
+        track.active_websockets.remove(websocket)
+    try:
+        while True:
+            missed = track.results.getSince(last_seq, stream_id)
+            if missed is None:
+                await websocket.send_text(json.dumps(track.results.getResyncNotice()))
+                break
+            if not missed:
+                break
+            for message in missed:
+                await websocket.send_text(json.dumps(message))
+            last_seq = missed[-1]["seq"]
+            stream_id = track.results.stream_id
+    finally:
+        if is_listening:
+            track.active_websockets.append(websocket)
+
+
+@router.websocket("/ws/results")
+async def resultsWebsocket(websocket: WebSocket, last_seq: Optional[int] = None, stream_id: Optional[str] = None,
+                           track: Track = Depends(getTrack)):
     """
     WebSocket endpoint for real-time race results.
     
-    Clients connect here to receive race results as they complete.
+    Clients connect here to receive race results as they complete. Each
+    result carries `seq` and `stream_id`; to catch up after a reconnect pass
+    them as query params or send {"type": "resume", "last_seq": N, "stream_id": "..."}.
+    Live, unnumbered events: {"type": "race_start", "gate_drop_ms": ...}
+    before each gate drop, and {"type": "split", ...} while a heat runs on
+    tracks with split points.
+    
+    Clock sync: send {"type": "time_sync", "client_ms": t0} and note the
+    local receive time t3 of the reply, which adds server_rx_ms / server_tx_ms
+    (server monotonic clock). Then rtt = (t3 - t0) - (server_tx_ms - server_rx_ms)
+    and offset = ((server_rx_ms - t0) + (server_tx_ms - t3)) / 2, so
+    server time = local time + offset. Keep the sample with the lowest rtt.
     Also supports ping/pong for connection health.
     """
     await websocket.accept()
-    active_websockets.append(websocket)
-    print(f"WebSocket client connected. Total clients: {len(active_websockets)}")
+    track.active_websockets.append(websocket)
+    print(f"WebSocket client connected. Total clients: {len(track.active_websockets)}")
     
     try:
+        if last_seq is not None:
+            await replayResults(websocket, track, last_seq, stream_id)
+        
         while True:
             # Handle incoming messages (ping/pong, etc.)
             data = await websocket.receive_text()
+            received_ns = time.monotonic_ns()
             
             try:
                 message = json.loads(data)
@@ -232,55 +521,126 @@ async def resultsWebsocket(websocket: WebSocket):
                 
                 if msg_type == "ping":
                     await websocket.send_text(json.dumps({"type": "pong"}))
+                elif msg_type == "time_sync":
+                    await websocket.send_text(json.dumps({
+                        "type": "time_sync",
+                        "client_ms": message.get("client_ms"),
+                        "server_rx_ms": received_ns / 1_000_000,
+                        "server_tx_ms": time.monotonic_ns() / 1_000_000,
+                    }))
                 elif msg_type == "get_status":
-                    status = hardware.getStatus()
+                    # May be a blocking call to the hardware daemon
+                    status = await asyncio.to_thread(track.hardware.getStatus)
                     await websocket.send_text(json.dumps({"type": "status", "data": status}))
+                elif msg_type == "resume":
+                    await replayResults(websocket, track, int(message.get("last_seq", 0)), message.get("stream_id"))
                     
-            except json.JSONDecodeError:
+            except (json.JSONDecodeError, TypeError, ValueError):
                 await websocket.send_text(json.dumps({"type": "error", "message": "Invalid JSON"}))
                 
     except WebSocketDisconnect:
         pass
     finally:
-        if websocket in active_websockets:
-            active_websockets.remove(websocket)
-        print(f"WebSocket client disconnected. Total clients: {len(active_websockets)}")
+        if websocket in track.active_websockets:
+            track.active_websockets.remove(websocket)
+        print(f"WebSocket client disconnected. Total clients: {len(track.active_websockets)}")
 
 
-# ----- WebSocket for Real-time Hardware Status -----
+# ----- Server-Sent Events for Simple Displays -----
+
+SSE_KEEPALIVE_SEC = 15
+
+
+def formatEvent(message: dict) -> str:
+    """Format a stream message as an SSE event; the id is "<stream_id>:<seq>"."""
+    if message["type"] == "race_result":
+        return f"id: {message['stream_id']}:{message['seq']}\nevent: race_result\ndata: {json.dumps(message)}\n\n"
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+
+@router.get("/results/stream")
+async def resultsEventStream(last_event_id: Optional[str] = Header(None),
+                             track: Track = Depends(getTrack)):
+    """
+    Server-Sent Events variant of /ws/results for displays that only need EventSource.
+    
+    Browsers reconnect automatically and send Last-Event-ID, which replays
+    missed results (or sends a `resync_needed` event).
+    """
+    stream = track.results
+    # Subscribe before replaying so nothing published in between is lost
+    queue = stream.subscribe()
+    replay = []
+    last_seq = None
+    if last_event_id:
+        stream_id, _, seq = last_event_id.rpartition(":")
+        last_seq = int(seq) if seq.isdigit() else -1
+        replay = stream.getSince(last_seq, stream_id) if last_seq >= 0 else None
+        if replay is None:
+            replay = [stream.getResyncNotice()]
+    
+    async def events():
+        seen_seq = last_seq or 0
+        seen_stream_id = stream.stream_id
+        try:
+            for message in replay:
+                seen_seq = message["seq"]
+                yield formatEvent(message)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    # Fell behind - the client reconnects with Last-Event-ID
+                    yield formatEvent(stream.getResyncNotice())
+                    return
+                # Skip anything the replay already covered
+                if message["seq"] > seen_seq or message["stream_id"] != seen_stream_id:
+                    seen_seq = message["seq"]
+                    seen_stream_id = message["stream_id"]
+                    yield formatEvent(message)
+        finally:
+            stream.unsubscribe(queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-STATUS_STREAM_INTERVAL_MS = 50  # 20Hz updates
 
-@app.websocket("/ws/status")
-async def statusWebsocket(websocket: WebSocket):
+# ----- WebSocket for Real-time Hardware Status -----
+
+@router.websocket("/ws/status")
+async def statusWebsocket(websocket: WebSocket, rate_hz: float = STATUS_STREAM_HZ, lanes: Optional[str] = None,
+                          mode: str = "status", track: Track = Depends(getTrack)):
     """
     WebSocket endpoint for real-time hardware status streaming.
     
-    Streams sensor states and servo angle at 20Hz for live monitoring.
+    Streams sensor states and servo angle, by default for every lane at
+    STATUS_STREAM_HZ (20Hz). Each client picks its own rate_hz, lanes
+    (e.g. "1,3") and mode (status / raw / summary, see statusstream.py) as
+    query params, or later with {"type": "configure", ...}; all clients
+    share one sample stream per track.
     Send {"type": "stop"} to pause streaming, {"type": "start"} to resume.
     """
     await websocket.accept()
-    print("Hardware status WebSocket connected")
-    
-    is_streaming = True
+    try:
+        subscriber = StatusSubscriber(rate_hz, _parseLanes(lanes), mode)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    track.status_stream.subscribe(subscriber)
+    print(f"Hardware status WebSocket connected ({subscriber.rate_hz:g}Hz {subscriber.mode})")
     
-    async def streamStatus():
-        """Background task to stream hardware status."""
-        nonlocal is_streaming
+    async def sendFrames():
+        """Send this client's frames; a slow client only delays (and coalesces) its own."""
         while True:
-            if is_streaming:
-                try:
-                    status = hardware.getHardwareStatus()
-                    await websocket.send_text(json.dumps({
-                        "type": "hardware_status",
-                        "data": status
-                    }))
-                except Exception:
-                    break
-            await asyncio.sleep(STATUS_STREAM_INTERVAL_MS / 1000.0)
+            frame = await subscriber.next()
+            try:
+                await websocket.send_text(frame)
+            except Exception:
+                break
     
-    # Start streaming in background
-    stream_task = asyncio.create_task(streamStatus())
+    send_task = asyncio.create_task(sendFrames())
     
     try:
         while True:
@@ -290,22 +650,44 @@ async def statusWebsocket(websocket: WebSocket):
                 msg_type = message.get("type")
                 
                 if msg_type == "stop":
-                    is_streaming = False
+                    subscriber.is_paused = True
                     await websocket.send_text(json.dumps({"type": "stopped"}))
                 elif msg_type == "start":
-                    is_streaming = True
+                    subscriber.is_paused = False
                     await websocket.send_text(json.dumps({"type": "started"}))
+                elif msg_type == "configure":
+                    settings = {**subscriber.getSettings(), **message}
+                    lanes_setting = settings["lanes"]
+                    if isinstance(lanes_setting, str):
+                        lanes_setting = _parseLanes(lanes_setting)
+                    subscriber.configure(float(settings["rate_hz"]), lanes_setting, settings["mode"])
+                    await websocket.send_text(json.dumps({"type": "configured", **subscriber.getSettings()}))
                 elif msg_type == "ping":
                     await websocket.send_text(json.dumps({"type": "pong"}))
                     
             except json.JSONDecodeError:
                 pass
+            except (TypeError, ValueError) as e:
+                await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
                 
     except WebSocketDisconnect:
         pass
     finally:
-        stream_task.cancel()
-        print("Hardware status WebSocket disconnected")
+        send_task.cancel()
+        track.status_stream.unsubscribe(subscriber)
+        print(f"Hardware status WebSocket disconnected ({subscriber.frames_sent} frames, "
+              f"{subscriber.frames_dropped} coalesced)")
+
+
+def _parseLanes(lanes: Optional[str]) -> Optional[list]:
+    """"1,3" -> [1, 3]; None or "" = all lanes."""
+    if not lanes:
+        return None
+    return [int(lane) for lane in lanes.split(",") if lane.strip()]
+
+
+app.include_router(router)
+app.include_router(router, prefix="/tracks/{track_name}")
 
 
 # ----- Manual Entry Point (for direct python execution) -----
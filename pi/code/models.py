@@ -1,7 +1,7 @@
 """Pydantic models for the Track Controller API."""
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -9,6 +9,15 @@ class HeatSetup(BaseModel):
     """Configuration for starting a race heat."""
     heat_id: str
     occupied_lanes: List[int]
+    countdown_ms: Optional[float] = None  # Gate drop delay after race_start; None = RACE_COUNTDOWN_MS
+    tie_threshold_ms: Optional[float] = None  # Finishes this close are ties; None = TIE_THRESHOLD_MS
+
+
+class SplitTime(BaseModel):
+    """A car passing one intermediate sensor point."""
+    name: str
+    time_ms: Optional[float] = None    # From the start; None if the sensor missed the car
+    speed_mps: Optional[float] = None  # Trap speed: average since the previous point (or the start)
 
 
 class LaneResult(BaseModel):
@@ -17,6 +26,25 @@ class LaneResult(BaseModel):
     finish_time_ms: Optional[float] = None  # None if lane was unoccupied or DNF
     place: Optional[int] = None
     is_dnf: bool = False
+    splits: Optional[List[SplitTime]] = None  # Only on tracks with split points
+    finish_speed_mps: Optional[float] = None  # Trap speed over the last segment (needs finish_distance_m)
+    finish_uncertainty_ms: Optional[float] = None  # The car crossed up to this long before finish_time_ms
+    is_tie: bool = False  # Shares its place with another lane (see HeatResult.ties)
+
+
+class FinishEvidence(BaseModel):
+    """Raw finish edge behind a tie."""
+    lane_number: int
+    edge_ns: int    # Sample that first saw the beam blocked, from the start
+    window_ns: int  # Time since the previous sample (beam still clear)
+
+
+class TieGroup(BaseModel):
+    """Lanes whose finishes can't be (or, under the threshold, shouldn't be) ordered."""
+    place: int
+    lanes: List[int]
+    spread_ms: float  # First to last edge in the group
+    evidence: List[FinishEvidence]
 
 
 class HeatResult(BaseModel):
@@ -26,6 +54,9 @@ class HeatResult(BaseModel):
     finished_at: Optional[datetime] = None
     lane_results: List[LaneResult]
     is_complete: bool = False
+    start_source: Optional[str] = None   # How timing started: sensor / calibrated / fixed
+    release_ms: Optional[float] = None   # Gate command to timing start
+    ties: Optional[List[TieGroup]] = None  # Photo finishes officials may want to re-run
 
 
 class GatePosition(BaseModel):
@@ -33,12 +64,59 @@ class GatePosition(BaseModel):
     is_down: bool
 
 
+class SensorHealth(BaseModel):
+    """Health of one lane sensor over the monitor window (see sensorhealth.py)."""
+    lane: int
+    status: str                    # ok / blocked / flapping
+    is_blocked: bool
+    duty_cycle: float              # Fraction of the window the beam was blocked
+    transitions_per_min: float     # Accepted (debounced) transitions
+    glitches_per_min: float        # Pulses rejected by the filter
+    sec_since_transition: Optional[float] = None  # None = no transition seen yet
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
     num_tracks: int
     is_gate_down: bool
     current_heat_id: Optional[str] = None
+    history_load_ms: Optional[float] = None          # Time to load/index history at startup
+    time_to_serving_ms: Optional[float] = None       # Process start to accepting requests (vs STARTUP_BUDGET_MS)
+    time_to_first_health_ms: Optional[float] = None  # Process start to first /health response
+    subsystems: Dict[str, str] = {}                  # Readiness: pending / ready / failed
+    startup_ms: Dict[str, float] = {}                # Duration of each startup step
+    track_name: Optional[str] = None                 # Track this status is for
+    tracks: List[str] = []                           # All tracks hosted by this controller
+    sensors: List[SensorHealth] = []                 # Per-lane sensor health
+
+
+class SplitPointConfig(BaseModel):
+    """An intermediate sensor point across every lane of a track."""
+    name: str
+    distance_m: float              # From the start line
+    pins: List[int]                # BCM pin per lane
+
+
+class TrackConfig(BaseModel):
+    """Hardware assignment for one physical track."""
+    name: str
+    num_lanes: int = 4
+    servo_channel: int = 0         # PCA9685 channel driving this track's gate
+    sensor_pins: List[int] = []    # BCM pin per lane; empty = SENSOR_PIN_n env / defaults
+    start_pin: Optional[int] = None  # Start sensor / gate switch; None = START_SENSOR_PIN env or none
+    split_points: List[SplitPointConfig] = []  # Ordered down the track, before the finish
+    finish_distance_m: Optional[float] = None  # Start to finish line, for the final trap speed
+
+
+class TrackInfo(BaseModel):
+    """Summary of a hosted track."""
+    name: str
+    num_lanes: int
+    servo_channel: int
+    is_gate_down: bool
+    current_heat_id: Optional[str] = None
+    is_default: bool = False
 
 
 class ServoCalibration(BaseModel):
@@ -47,11 +125,62 @@ class ServoCalibration(BaseModel):
     down_angle: int    # Angle when gate is DOWN (released)
 
 
+class ReleaseCalibrationRequest(BaseModel):
+    """Request to measure gate release latency for the current servo angles."""
+    cycles: int = 5
+    probe_lane: Optional[int] = None  # Lane sensor placed at the gate (if there's no start sensor)
+
+
 class ServoTestRequest(BaseModel):
     """Request to test servo at a specific angle."""
     angle: int  # 0-180
 
 
+class SensorFilterSettings(BaseModel):
+    """Debounce settings for a track's lane sensors (see sensorfilter.py)."""
+    min_pulse_us: int = 0      # A new level must last this long...
+    confirm_k: int = 1         # ...and be seen in k of the last n samples
+    confirm_n: int = 1
+
+
+class SensorFilterStatus(SensorFilterSettings):
+    """Debounce settings plus rejected-glitch counters."""
+    glitches: List[int] = []   # Rejected pulses per sensor channel (lanes, start, split points) since startup
+    total_glitches: int = 0
+
+
+class FinishPolicySettings(BaseModel):
+    """When a heat ends (see finishpolicy.py)."""
+    mode: str = "fixed"        # fixed / margin / multiple / learned
+    margin_ms: float = 2000    # margin, learned: slack after the leader / learned time
+    factor: float = 1.5        # multiple: end at factor x leader's time
+    quantile: float = 0.99     # learned: quantile of recent finish times
+
+
+class FinishPolicyStatus(FinishPolicySettings):
+    """Finish policy settings plus the learned state."""
+    timeout_ms: float                              # Upper bound for every policy
+    learned_samples: int = 0
+    learned_deadline_ms: Optional[float] = None    # None until enough finishes are known
+
+
+class PipelineStatus(BaseModel):
+    """Post-race pipeline and heat turnaround (see postrace.py)."""
+    is_ready: bool                              # No heat timing - the next one can start
+    pending: int = 0                            # Heats handed off, not yet persisted and broadcast
+    processed: int = 0
+    failed: int = 0                             # Persist or broadcast errors so far
+    persist_failed: List[str] = []              # Heat IDs not in history, journaled until retried
+    last_error: Optional[str] = None            # Why the latest of those failed
+    last_heat_id: Optional[str] = None
+    ready_ms: Optional[float] = None            # Last heat: timing complete to hand-off done
+    avg_ready_ms: Optional[float] = None
+    avg_persist_ms: Optional[float] = None
+    avg_broadcast_ms: Optional[float] = None
+    turnaround_ms: Optional[float] = None       # Last heat's timing complete to the next heat's start
+    avg_turnaround_ms: Optional[float] = None
+
+
 class SensorState(BaseModel):
     """State of a single lane sensor."""
     lane: int
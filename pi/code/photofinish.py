@@ -0,0 +1,73 @@
+"""Place assignment and tie detection from raw finish edges.
+
+A finish is only known to within a window: the beam was still clear at the
+previous sample and blocked at the edge's sample, so the car crossed
+somewhere in between. Two cars seen in the same sample have identical
+timestamps and no real order. Places are therefore resolved from the raw
+nanosecond edge times (not the 0.01ms-rounded results), and lanes are tied
+when:
+
+- their windows overlap, so the sensors can't tell which car was first, or
+- their edges are no more than the tie threshold apart.
+
+Ties chain (A ties B, B ties C -> one group) and share the group's best
+place, like 1, 1, 3. Each group carries the raw edge evidence so officials
+can decide to re-run it instead of accepting an arbitrary order.
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+# Configuration from environment (default; a heat can set its own)
+TIE_THRESHOLD_MS = float(os.environ.get("TIE_THRESHOLD_MS", 0))
+
+# Constants
+MAX_TIE_THRESHOLD_MS = 100
+
+
+def _isTied(prev: Tuple[int, int], edge: Tuple[int, int], threshold_ns: int) -> bool:
+    """prev and edge are (edge_ns, window_ns), prev the earlier edge."""
+    edge_ns, window_ns = edge
+    return edge_ns - window_ns < prev[0] or edge_ns - prev[0] <= threshold_ns
+
+
+def resolvePlaces(finishes: Dict[int, Tuple[int, int]],
+                  tie_threshold_ms: float = TIE_THRESHOLD_MS) -> Tuple[Dict[int, int], List[Dict]]:
+    """Places and tie groups for finished lanes.
+
+    finishes maps lane -> (edge time from the start, window) in nanoseconds.
+    Returns (place by lane, tie groups shaped like models.TieGroup).
+    """
+    threshold_ns = int(tie_threshold_ms * 1_000_000)
+    ordered = sorted(finishes.items(), key=lambda item: (item[1][0], item[0]))
+    groups: List[List[Tuple[int, Tuple[int, int]]]] = []
+    for lane, edge in ordered:
+        if groups and _isTied(groups[-1][-1][1], edge, threshold_ns):
+            groups[-1].append((lane, edge))
+        else:
+            groups.append([(lane, edge)])
+
+    places: Dict[int, int] = {}
+    ties: List[Dict] = []
+    place = 1
+    for group in groups:
+        for lane, _ in group:
+            places[lane] = place
+        if len(group) > 1:
+            ties.append({
+                "place": place,
+                "lanes": [lane for lane, _ in group],
+                "spread_ms": round((group[-1][1][0] - group[0][1][0]) / 1_000_000, 3),
+                "evidence": [
+                    {"lane_number": lane, "edge_ns": edge_ns, "window_ns": window_ns}
+                    for lane, (edge_ns, window_ns) in group
+                ],
+            })
+        place += len(group)
+    return places, ties
+
+
+def formatTie(tie: Dict) -> str:
+    """One-line description for logs, e.g. "lanes 1, 3 tied for place 1 (0.000ms apart)"."""
+    lanes = ", ".join(str(lane) for lane in tie["lanes"])
+    return f"lanes {lanes} tied for place {tie['place']} ({tie['spread_ms']:.3f}ms apart)"
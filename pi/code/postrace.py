@@ -0,0 +1,206 @@
+"""Post-race pipeline: persist and broadcast finished heats off the race path.
+
+Rewriting the history file and fanning a result out to every display used
+to sit between the last finish and the controller accepting the next heat.
+Now a finished heat is handed off durably - appended to a small journal
+file and fsynced, which is far cheaper than the history rewrite - and a
+background worker persists and then broadcasts heats strictly in order.
+Once the history file holds a heat its journal entry is no longer needed;
+whenever the worker catches up the journal is rewritten with just the heats
+that still aren't persisted (usually none, so it's removed). Heats still in
+the journal at startup (crash, power cut) are persisted before the worker
+starts.
+
+A heat whose persist fails is not broadcast: it stays journaled and is held
+as failed (shown in the status) until retryFailed() queues it again.
+
+Turnaround is measured per heat: timing complete -> handed off ("ready"),
+and timing complete -> the next heat's start ("turnaround").
+"""
+
+import os
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+# Constants
+PIPELINE_JOURNAL = "pending_heats.jsonl"
+TURNAROUND_SAMPLES = 20     # Recent heats averaged in the status
+STOP_TIMEOUT_SEC = 5.0      # How long shutdown waits for the queue to drain
+
+
+def _average(samples: Deque[float]) -> Optional[float]:
+    return round(sum(samples) / len(samples), 2) if samples else None
+
+
+class PostRacePipeline:
+    """Ordered, journaled persist-then-broadcast stage for one track."""
+
+    def __init__(self, journal_path: str, persist: Callable[[dict], Awaitable[None]],
+                 broadcast: Callable[[dict], Awaitable[None]]):
+        self.journal_path = journal_path
+        self._persist = persist
+        self._broadcast = broadcast
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Journal writes run on one thread, in submission order
+        self._journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heat-journal")
+        # Journaled heats not yet in the history file, by heat ID, in hand-off order
+        self._unpersisted: Dict[str, dict] = OrderedDict()
+        self._persist_failed: Dict[str, str] = OrderedDict()  # heat ID -> error, held for retryFailed()
+        self._pending = 0  # Handed off, not yet broadcast
+        self.processed = 0
+        self.failed = 0
+        self.last_heat_id: Optional[str] = None
+        self._last_timing_done_ns = 0
+        self._ready_ms: Deque[float] = deque(maxlen=TURNAROUND_SAMPLES)
+        self._turnaround_ms: Deque[float] = deque(maxlen=TURNAROUND_SAMPLES)
+        self._persist_ms: Deque[float] = deque(maxlen=TURNAROUND_SAMPLES)
+        self._broadcast_ms: Deque[float] = deque(maxlen=TURNAROUND_SAMPLES)
+
+    # ----- Journal -----
+
+    def _appendJournal(self, result: dict):
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(result, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _readJournal(self) -> List[dict]:
+        if not os.path.exists(self.journal_path):
+            return []
+        results = []
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass  # Torn last line: its heat never got an API response either
+        return results
+
+    def _rewriteJournal(self, results: List[dict]):
+        """Replace the journal with just these heats (removed when there are none)."""
+        if not results:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            return
+        temp_path = f"{self.journal_path}.tmp"
+        with open(temp_path, "w") as f:
+            for result in results:
+                f.write(json.dumps(result, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    async def _runJournal(self, func, *args):
+        await asyncio.get_running_loop().run_in_executor(self._journal_executor, func, *args)
+
+    # ----- Lifecycle -----
+
+    async def start(self):
+        """Persist heats left in the journal by a crash, then start the worker."""
+        recovered = self._readJournal()
+        for result in recovered:
+            heat_id = result.get("heat_id")
+            try:
+                await self._persist(result)
+            except Exception as e:
+                self._unpersisted[heat_id] = result
+                self._persist_failed[heat_id] = str(e)
+                self.failed += 1
+                print(f"Recovering journaled heat {heat_id} failed: {e}")
+        if recovered:
+            print(f"Recovered {len(recovered) - len(self._persist_failed)} journaled heat(s) into history")
+            self._rewriteJournal(list(self._unpersisted.values()))
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Let queued heats finish (briefly), then stop the worker."""
+        if self._task:
+            try:
+                await asyncio.wait_for(self._queue.join(), STOP_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                print(f"Post-race queue not drained, {self._pending} heat(s) stay journaled")
+            self._task.cancel()
+            self._task = None
+        self._journal_executor.shutdown(wait=True)
+
+    # ----- Stages -----
+
+    async def submit(self, result: dict, timing_done_ns: int):
+        """Hand off a finished heat. Returns once it's journaled; persist and broadcast follow in order."""
+        self._unpersisted[result.get("heat_id")] = result
+        self._pending += 1
+        await self._runJournal(self._appendJournal, result)
+        self._last_timing_done_ns = timing_done_ns
+        self._ready_ms.append((time.monotonic_ns() - timing_done_ns) / 1_000_000)
+        self._queue.put_nowait(result)
+
+    def markRaceStart(self):
+        """Record the turnaround from the previous heat's timing to this heat's start."""
+        if self._last_timing_done_ns:
+            self._turnaround_ms.append((time.monotonic_ns() - self._last_timing_done_ns) / 1_000_000)
+            self._last_timing_done_ns = 0
+
+    def retryFailed(self) -> int:
+        """Queue heats whose persist failed again. Returns how many were queued."""
+        heat_ids = list(self._persist_failed)
+        self._persist_failed.clear()
+        for heat_id in heat_ids:
+            result = self._unpersisted.get(heat_id)
+            if result is not None:
+                self._pending += 1
+                self._queue.put_nowait(result)
+        return len(heat_ids)
+
+    async def _run(self):
+        while True:
+            result = await self._queue.get()
+            heat_id = result.get("heat_id")
+            try:
+                start_ns = time.monotonic_ns()
+                try:
+                    await self._persist(result)
+                except Exception as e:
+                    # Not broadcast; stays journaled until retryFailed() (or a restart)
+                    self._persist_failed[heat_id] = str(e)
+                    self.failed += 1
+                    print(f"Persisting {heat_id} failed, held for retry: {e}")
+                    continue
+                self._unpersisted.pop(heat_id, None)
+                persisted_ns = time.monotonic_ns()
+                await self._broadcast(result)
+                self._persist_ms.append((persisted_ns - start_ns) / 1_000_000)
+                self._broadcast_ms.append((time.monotonic_ns() - persisted_ns) / 1_000_000)
+                self.processed += 1
+                self.last_heat_id = heat_id
+            except Exception as e:
+                # Already in history; only the broadcast was lost
+                self.failed += 1
+                print(f"Broadcasting {heat_id} failed: {e}")
+            finally:
+                self._pending -= 1
+                self._queue.task_done()
+                if self._queue.empty():
+                    await self._runJournal(self._rewriteJournal, list(self._unpersisted.values()))
+
+    def getStatus(self) -> Dict:
+        """Queue depth, counters and timings (see PipelineStatus in models.py)."""
+        return {
+            "pending": self._pending,
+            "processed": self.processed,
+            "failed": self.failed,
+            "persist_failed": list(self._persist_failed),
+            "last_error": next(reversed(self._persist_failed.values()), None),
+            "last_heat_id": self.last_heat_id,
+            "ready_ms": round(self._ready_ms[-1], 2) if self._ready_ms else None,
+            "avg_ready_ms": _average(self._ready_ms),
+            "avg_persist_ms": _average(self._persist_ms),
+            "avg_broadcast_ms": _average(self._broadcast_ms),
+            "turnaround_ms": round(self._turnaround_ms[-1], 1) if self._turnaround_ms else None,
+            "avg_turnaround_ms": _average(self._turnaround_ms),
+        }
@@ -0,0 +1,85 @@
+"""Sequenced race result stream with replay.
+
+Every broadcast result gets a sequence number, and the last
+RESULT_BUFFER_SIZE messages are kept in a ring buffer. A client that
+reconnects sends the last sequence it saw and gets exactly the messages it
+missed - or a resync notice if they've already left the buffer, in which
+case it should refetch /history.
+
+The stream id changes whenever the sequence restarts (process restart), so
+a stale sequence number from an earlier run is never mistaken for a
+current one. In split mode the daemon numbers results and workers adopt
+its sequence and stream id.
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional, Set
+
+# Constants
+RESULT_BUFFER_SIZE = 256       # Messages kept for replay
+SUBSCRIBER_QUEUE_SIZE = 64     # Pending messages per SSE subscriber before it must resync
+
+
+class ResultStream:
+    """Numbers results, keeps a replay buffer and feeds SSE subscribers."""
+
+    def __init__(self, size: int = RESULT_BUFFER_SIZE, stream_id: Optional[str] = None):
+        self.stream_id = stream_id or f"{time.time_ns():x}"
+        self.seq = 0
+        self._buffer: Deque[dict] = deque(maxlen=size)
+        self._is_synced = True  # False after a reset until the next message arrives
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def publish(self, result: dict, seq: Optional[int] = None, stream_id: Optional[str] = None) -> dict:
+        """Number a result (or adopt the upstream number) and buffer it. Returns the message."""
+        if stream_id and stream_id != self.stream_id:
+            # Upstream restarted - nothing buffered so far can be resumed
+            self.reset()
+            self.stream_id = stream_id
+        self.seq = seq if seq is not None else self.seq + 1
+        message = {"type": "race_result", "seq": self.seq, "stream_id": self.stream_id, "data": result}
+        self._buffer.append(message)
+        self._is_synced = True
+
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow to keep up - drop its backlog and tell it to resync
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+        return message
+
+    def getSince(self, last_seq: int, stream_id: Optional[str] = None) -> Optional[List[dict]]:
+        """Messages after `last_seq`, or None if some are no longer available (resync needed)."""
+        if stream_id is not None and stream_id != self.stream_id:
+            return None
+        if last_seq > self.seq or not self._is_synced:
+            return None
+        missed = [message for message in self._buffer if message["seq"] > last_seq]
+        if not missed:
+            return []
+        # Must start right after last_seq and have no holes
+        if missed[0]["seq"] != last_seq + 1 or missed[-1]["seq"] - missed[0]["seq"] != len(missed) - 1:
+            return None
+        return missed
+
+    def getResyncNotice(self) -> dict:
+        return {"type": "resync_needed", "seq": self.seq, "stream_id": self.stream_id}
+
+    def reset(self):
+        """Forget buffered messages (e.g. after losing the upstream connection)."""
+        self._buffer.clear()
+        self._is_synced = False
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue of new messages; a None entry means the subscriber fell behind."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
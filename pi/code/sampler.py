@@ -0,0 +1,96 @@
+"""Background sensor sampler.
+
+Reads every lane sensor at a fixed rate in its own thread, runs the samples
+through the hardware's debounce filter (see sensorfilter.py), records the
+original time of each accepted edge and publishes the result to shared
+memory (see sensorstate.py) so status readers never touch GPIO themselves
+and never see rejected glitches. Each sample also feeds the lane health
+monitor (see sensorhealth.py).
+"""
+
+import os
+import time
+import threading
+from typing import Optional
+
+from sensorhealth import SensorHealthMonitor
+from sensorstate import SharedSensorState, SensorStateReader, SensorSnapshot, SENSOR_STATE_PATH, MAX_LANES
+
+# Configuration from environment
+SENSOR_SAMPLE_HZ = int(os.environ.get("SENSOR_SAMPLE_HZ", 1000))
+
+# Channels beyond the shared state's slots (large split setups) are filtered
+# and timed here but not published
+PUBLISHED_MASK = (1 << MAX_LANES) - 1
+
+
+class SensorSampler:
+    """Samples `hardware.readSensorMask()` and publishes it with edge timestamps."""
+
+    def __init__(self, hardware, path: str = SENSOR_STATE_PATH, rate_hz: int = SENSOR_SAMPLE_HZ):
+        self.hardware = hardware
+        self.interval_sec = 1.0 / rate_hz
+        self.shared_state = SharedSensorState(hardware.num_tracks, path)
+        self.reader = SensorStateReader(path)
+        self.health = SensorHealthMonitor(hardware.sensor_filter.num_lanes)
+        self._has_unpublished_channels = hardware.sensor_filter.num_lanes > MAX_LANES
+        self.lane_mask = 0
+        self.sample_count = 0
+        self._thread: Optional[threading.Thread] = None
+        self._is_running = False
+
+    def read(self) -> SensorSnapshot:
+        """Get a consistent copy of the latest sample (the buffer is reused)."""
+        return self.reader.read()
+
+    def start(self):
+        """Start sampling in a daemon thread."""
+        if self._thread:
+            return
+        self._is_running = True
+        self._thread = threading.Thread(target=self._run, name="sensor-sampler", daemon=True)
+        self._thread.start()
+        print(f"Sensor sampler started at {1.0 / self.interval_sec:.0f}Hz -> {self.shared_state.path}")
+
+    def stop(self):
+        """Stop sampling and wait for the thread to exit."""
+        self._is_running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def sampleOnce(self):
+        """Read all sensors once and publish the sample."""
+        # With many pins (split points) the read itself takes a while: time
+        # the sample at its midpoint so every pin's error stays within half
+        before_ns = time.monotonic_ns()
+        raw_mask = self.hardware.readSensorMask()
+        now_ns = (before_ns + time.monotonic_ns()) // 2
+        sensor_filter = self.hardware.sensor_filter
+        edges = sensor_filter.update(now_ns, raw_mask)
+        mask = sensor_filter.mask
+        self.lane_mask = mask
+        self.health.update(now_ns, mask, edges, sensor_filter.glitches)
+        self.sample_count += 1
+        if edges and self._has_unpublished_channels:
+            edges = {channel: edge_ns for channel, edge_ns in edges.items() if channel < MAX_LANES}
+        self.shared_state.publish(
+            now_ns, mask & PUBLISHED_MASK, self.hardware.is_gate_down, self.hardware.current_servo_angle, edges
+        )
+
+    def _run(self):
+        """Sampling loop, paced against absolute deadlines to avoid drift."""
+        next_ns = time.monotonic_ns()
+        interval_ns = int(self.interval_sec * 1_000_000_000)
+        while self._is_running:
+            try:
+                self.sampleOnce()
+            except Exception as e:
+                print(f"Sensor sampler error: {e}")
+            next_ns += interval_ns
+            delay_ns = next_ns - time.monotonic_ns()
+            if delay_ns > 0:
+                time.sleep(delay_ns / 1_000_000_000)
+            else:
+                # Fell behind (GC pause, heavy load) - don't try to catch up
+                next_ns = time.monotonic_ns()
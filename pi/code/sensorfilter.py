@@ -0,0 +1,139 @@
+"""Per-lane debounce and glitch filter for the break-beam sensors.
+
+IR break-beam sensors see lighting flicker, vibration and wheel gaps as
+short pulses. Every raw sample goes through a small state machine per lane
+before it reaches the race capture or the status displays:
+
+- A new level is accepted once it has been seen in `confirm_k` of the last
+  `confirm_n` samples (including the current one) AND at least
+  `min_pulse_us` has passed since it first appeared.
+- The accepted edge keeps the timestamp of the first sample that showed
+  the new level, so filtering adds confirmation latency but no timing error.
+  Its window - the gap back to the sample before it - is how much earlier
+  the beam may really have changed (see photofinish.py).
+- A pending change whose window drains (the last `confirm_n` samples all
+  show the old level again) is rejected and counted as a glitch.
+
+With confirm_k = confirm_n = 1 this is a plain minimum-pulse-width filter;
+min_pulse_us = 0 and k = n = 1 passes every sample straight through. That
+is the default: any debounce needs a second confirming sample, and a loaded
+Pi that misses it loses real finishes, so tracks with noisy sensors opt in.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+# Configuration from environment (defaults; the API can change them per track)
+SENSOR_MIN_PULSE_US = int(os.environ.get("SENSOR_MIN_PULSE_US", 0))
+SENSOR_CONFIRM_K = int(os.environ.get("SENSOR_CONFIRM_K", 1))
+SENSOR_CONFIRM_N = int(os.environ.get("SENSOR_CONFIRM_N", 1))
+MAX_CONFIRM_N = 64
+
+
+class SensorFilter:
+    """Debounces a lane bitmask sample by sample (bit i = lane i+1 blocked)."""
+
+    def __init__(self, num_lanes: int, min_pulse_us: int = SENSOR_MIN_PULSE_US,
+                 confirm_k: int = SENSOR_CONFIRM_K, confirm_n: int = SENSOR_CONFIRM_N):
+        self.num_lanes = num_lanes
+        self.mask = 0                            # Filtered (accepted) lane states
+        self.glitches = [0] * num_lanes          # Rejected pulses per lane
+        self.last_block_ns = [0] * num_lanes     # Original time of each lane's last accepted blocked edge
+        self.last_edge_ns = [0] * num_lanes      # ...and of its last accepted edge either way
+        self.last_block_window_ns = [0] * num_lanes  # Gap before the blocked edge's sample
+        self.last_sample_ns = 0                  # 0 = no sample yet (windows unknown, reported as 0)
+        self.configure(min_pulse_us, confirm_k, confirm_n)
+
+    def configure(self, min_pulse_us: int, confirm_k: int, confirm_n: int):
+        """Change filter settings (drops any pending changes)."""
+        if min_pulse_us < 0:
+            raise ValueError("min_pulse_us must be >= 0")
+        if not 1 <= confirm_k <= confirm_n <= MAX_CONFIRM_N:
+            raise ValueError(f"Need 1 <= confirm_k <= confirm_n <= {MAX_CONFIRM_N}")
+        self.min_pulse_us = min_pulse_us
+        self.confirm_k = confirm_k
+        self.confirm_n = confirm_n
+        self._min_pulse_ns = min_pulse_us * 1000
+        self._window_mask = (1 << confirm_n) - 1
+        self._is_passthrough = min_pulse_us == 0 and confirm_n == 1
+        # Per lane: bit history of samples disagreeing with the accepted level, and when that started
+        self._windows = [0] * self.num_lanes
+        self._pending_since = [0] * self.num_lanes
+        self._pending_window_ns = [0] * self.num_lanes
+        self._pending_mask = 0
+
+    def getSettings(self) -> Dict:
+        return {
+            "min_pulse_us": self.min_pulse_us,
+            "confirm_k": self.confirm_k,
+            "confirm_n": self.confirm_n,
+        }
+
+    def getStatus(self) -> Dict:
+        """Settings plus glitch counters for the API."""
+        return {
+            **self.getSettings(),
+            "glitches": list(self.glitches),
+            "total_glitches": sum(self.glitches),
+        }
+
+    def update(self, now_ns: int, raw_mask: int) -> Optional[Dict[int, int]]:
+        """Feed one raw sample. Returns accepted edges (0-indexed lane -> original edge time) or None."""
+        window_ns = now_ns - self.last_sample_ns if self.last_sample_ns else 0
+        self.last_sample_ns = now_ns
+        changed = raw_mask ^ self.mask
+        if not changed and not self._pending_mask:
+            return None  # Steady state: nothing to do
+
+        if self._is_passthrough:
+            lanes = self._lanesIn(changed)
+            return self._accept(changed, {lane: now_ns for lane in lanes}, {lane: window_ns for lane in lanes})
+
+        accepted = 0
+        edges = {}
+        windows = {}
+        for lane in self._lanesIn(changed | self._pending_mask):
+            bit = 1 << lane
+            is_different = bool(changed & bit)
+            window = ((self._windows[lane] << 1) | is_different) & self._window_mask
+
+            if not self._pending_mask & bit:
+                # First sample showing a new level
+                self._pending_mask |= bit
+                self._pending_since[lane] = now_ns
+                self._pending_window_ns[lane] = window_ns
+
+            if (is_different and window.bit_count() >= self.confirm_k
+                    and now_ns - self._pending_since[lane] >= self._min_pulse_ns):
+                accepted |= bit
+                edges[lane] = self._pending_since[lane]
+                windows[lane] = self._pending_window_ns[lane]
+                window = 0
+            elif not window:
+                # Back to the accepted level for a whole window: it was a glitch
+                self._pending_mask &= ~bit
+                self.glitches[lane] += 1
+            self._windows[lane] = window
+
+        return self._accept(accepted, edges, windows) if accepted else None
+
+    def _accept(self, accepted: int, edges: Dict[int, int], windows: Dict[int, int]) -> Dict[int, int]:
+        """Flip accepted lanes and remember edge times."""
+        self.mask ^= accepted
+        self._pending_mask &= ~accepted
+        for lane, edge_ns in edges.items():
+            self.last_edge_ns[lane] = edge_ns
+            if self.mask >> lane & 1:
+                self.last_block_ns[lane] = edge_ns
+                self.last_block_window_ns[lane] = windows[lane]
+        return edges
+
+    def _lanesIn(self, mask: int) -> List[int]:
+        lanes = []
+        lane = 0
+        while mask:
+            if mask & 1:
+                lanes.append(lane)
+            mask >>= 1
+            lane += 1
+        return lanes
@@ -0,0 +1,103 @@
+"""Continuous lane sensor health monitor.
+
+Fed by the sensor sampler with every debounced sample, it keeps one-second
+buckets per lane (blocked time, accepted transitions, rejected glitches)
+over a sliding window and classifies each lane:
+
+- "blocked":  beam blocked for longer than SENSOR_STUCK_SEC (misaligned,
+              dirty lens, car left under the beam)
+- "flapping": too many transitions or glitches per minute (loose wiring,
+              lighting flicker the filter can't fully reject)
+- "ok"
+
+Per-sample cost is a couple of comparisons; the work happens on edges and
+once a second when a bucket closes.
+"""
+
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+# Configuration from environment
+SENSOR_HEALTH_WINDOW_SEC = int(os.environ.get("SENSOR_HEALTH_WINDOW_SEC", 60))
+SENSOR_STUCK_SEC = float(os.environ.get("SENSOR_STUCK_SEC", 10))          # Continuous block = stuck
+SENSOR_FLAP_PER_MIN = float(os.environ.get("SENSOR_FLAP_PER_MIN", 30))   # Transitions + glitches
+
+# Constants
+BUCKET_NS = 1_000_000_000
+
+
+class SensorHealthMonitor:
+    """Sliding-window duty cycle, flapping rate and last transition per lane."""
+
+    def __init__(self, num_lanes: int, window_sec: int = SENSOR_HEALTH_WINDOW_SEC):
+        self.num_lanes = num_lanes
+        self.mask = 0
+        self.last_transition_ns = [0] * num_lanes
+        self._blocked_since_ns = [0] * num_lanes
+        self._bucket_start_ns = 0
+        self._bucket_blocked_ns = [0] * num_lanes
+        self._bucket_transitions = [0] * num_lanes
+        self._glitches_at_bucket = [0] * num_lanes
+        # Closed buckets: (blocked ns, transitions, glitches) per lane
+        self._buckets: Deque[Tuple[List[int], List[int], List[int]]] = deque(maxlen=window_sec)
+
+    def update(self, now_ns: int, mask: int, edges: Dict[int, int], glitches: List[int]):
+        """Feed one debounced sample (edges: 0-indexed lane -> edge time)."""
+        if not self._bucket_start_ns:
+            self._bucket_start_ns = now_ns
+            self._glitches_at_bucket = list(glitches)
+        if edges:
+            for lane, edge_ns in edges.items():
+                self.last_transition_ns[lane] = edge_ns
+                self._bucket_transitions[lane] += 1
+                if mask >> lane & 1:
+                    self._blocked_since_ns[lane] = edge_ns
+                else:
+                    self._bucket_blocked_ns[lane] += edge_ns - max(self._blocked_since_ns[lane], self._bucket_start_ns)
+        self.mask = mask
+        if now_ns - self._bucket_start_ns >= BUCKET_NS:
+            self._closeBucket(now_ns, glitches)
+
+    def _closeBucket(self, now_ns: int, glitches: List[int]):
+        for lane in range(self.num_lanes):
+            if self.mask >> lane & 1:
+                self._bucket_blocked_ns[lane] += now_ns - max(self._blocked_since_ns[lane], self._bucket_start_ns)
+        glitch_deltas = [count - before for count, before in zip(glitches, self._glitches_at_bucket)]
+        self._buckets.append((self._bucket_blocked_ns, self._bucket_transitions, glitch_deltas))
+        self._bucket_start_ns = now_ns
+        self._bucket_blocked_ns = [0] * self.num_lanes
+        self._bucket_transitions = [0] * self.num_lanes
+        self._glitches_at_bucket = list(glitches)
+
+    def getLanes(self, now_ns: int = None) -> List[Dict]:
+        """Per-lane health over the window (see SensorHealth in models.py)."""
+        now_ns = now_ns or time.monotonic_ns()
+        buckets = list(self._buckets)
+        window_sec = max(1, len(buckets))
+        lanes = []
+        for lane in range(self.num_lanes):
+            is_blocked = bool(self.mask >> lane & 1)
+            blocked_ns = sum(bucket[0][lane] for bucket in buckets)
+            transitions = sum(bucket[1][lane] for bucket in buckets)
+            glitch_count = sum(bucket[2][lane] for bucket in buckets)
+            flaps_per_min = (transitions + glitch_count) * 60 / window_sec
+            blocked_sec = (now_ns - self._blocked_since_ns[lane]) / 1e9 if is_blocked else 0.0
+            last_ns = self.last_transition_ns[lane]
+
+            status = "ok"
+            if blocked_sec > SENSOR_STUCK_SEC:
+                status = "blocked"
+            elif flaps_per_min > SENSOR_FLAP_PER_MIN:
+                status = "flapping"
+            lanes.append({
+                "lane": lane + 1,
+                "status": status,
+                "is_blocked": is_blocked,
+                "duty_cycle": round(min(1.0, blocked_ns / (window_sec * BUCKET_NS)), 3),
+                "transitions_per_min": round(transitions * 60 / window_sec, 1),
+                "glitches_per_min": round(glitch_count * 60 / window_sec, 1),
+                "sec_since_transition": round((now_ns - last_ns) / 1e9, 1) if last_ns else None,
+            })
+        return lanes
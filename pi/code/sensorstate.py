@@ -0,0 +1,175 @@
+"""Shared-memory live sensor state.
+
+The sensor sampler publishes the current lane bitmask, last edge times,
+gate state and servo angle into a small fixed-layout memory-mapped file.
+Any local process (API workers, a kiosk display, a logger) can read a
+consistent snapshot without syscalls, serialization or a round trip to the
+hardware owner.
+
+Consistency uses a seqlock: the writer bumps `seq` to an odd value, writes
+the fields, then bumps it to the next even value. Readers copy the block
+and retry if `seq` was odd or changed during the copy.
+
+Layout (native byte order, see SensorSnapshot):
+
+    offset  size  field
+    0       8     seq            uint64, odd while a write is in progress
+    8       8     timestamp_ns   uint64, time.monotonic_ns() of the sample
+    16      4     lane_mask      uint32, bit i set = lane i+1 blocked
+    20      1     num_lanes      uint8
+    21      1     is_gate_down   uint8
+    22      2     servo_angle    int16
+    24      256   last_edge_ns   uint64[32], monotonic time of each lane's last edge
+
+Readers in other languages should use acquire loads on `seq`; the Python
+reader relies on the copy being a single memmove.
+"""
+
+import os
+import time
+import ctypes
+import mmap
+import tempfile
+from typing import Dict, List
+
+# Constants
+MAX_LANES = 32
+DEFAULT_STATE_PATH = "/dev/shm/track-sensors" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "track-sensors")
+SENSOR_STATE_PATH = os.environ.get("SENSOR_STATE_PATH", DEFAULT_STATE_PATH)
+MAX_READ_RETRIES = 100
+
+
+class SensorSnapshot(ctypes.Structure):
+    """Fixed layout of the shared sensor state block."""
+    _fields_ = [
+        ("seq", ctypes.c_uint64),
+        ("timestamp_ns", ctypes.c_uint64),
+        ("lane_mask", ctypes.c_uint32),
+        ("num_lanes", ctypes.c_uint8),
+        ("is_gate_down", ctypes.c_uint8),
+        ("servo_angle", ctypes.c_int16),
+        ("last_edge_ns", ctypes.c_uint64 * MAX_LANES),
+    ]
+
+
+SNAPSHOT_SIZE = ctypes.sizeof(SensorSnapshot)
+
+
+class SharedSensorState:
+    """Writer side: owns the mapping and publishes samples into it."""
+
+    def __init__(self, num_lanes: int, path: str = SENSOR_STATE_PATH):
+        if num_lanes > MAX_LANES:
+            raise ValueError(f"At most {MAX_LANES} lanes fit in the shared sensor state")
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, SNAPSHOT_SIZE)
+            self._mmap = mmap.mmap(fd, SNAPSHOT_SIZE, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        self.state = SensorSnapshot.from_buffer(self._mmap)
+        self.state.seq = 0
+        self.state.num_lanes = num_lanes
+
+    def publish(self, timestamp_ns: int, lane_mask: int, is_gate_down: bool,
+                servo_angle: int, edges: Dict[int, int] = None):
+        """Write a sample. `edges` maps 0-indexed lane -> edge time for lanes that changed."""
+        state = self.state
+        state.seq += 1  # odd: write in progress
+        state.timestamp_ns = timestamp_ns
+        state.lane_mask = lane_mask
+        state.is_gate_down = is_gate_down
+        state.servo_angle = servo_angle
+        if edges:
+            for lane_index, edge_ns in edges.items():
+                state.last_edge_ns[lane_index] = edge_ns
+        state.seq += 1  # even: consistent
+
+    def close(self):
+        del self.state
+        self._mmap.close()
+
+
+class SensorStateReader:
+    """Reader side: copies consistent snapshots into a caller-owned buffer.
+
+    All buffers and views are allocated once, so readInto() is a memcpy plus
+    a sequence check.
+    """
+
+    def __init__(self, path: str = SENSOR_STATE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), SNAPSHOT_SIZE, access=mmap.ACCESS_READ)
+        self._src = memoryview(self._mmap)
+        self._src_seq = self._src[:8].cast("Q")
+        self.snapshot = SensorSnapshot()
+        self._dst = memoryview(self.snapshot).cast("B")
+        # read() copies into here first so a failed read never tears self.snapshot
+        self._scratch = SensorSnapshot()
+        self._scratch_bytes = memoryview(self._scratch).cast("B")
+
+    def readInto(self, out: SensorSnapshot) -> bool:
+        """Copy a consistent snapshot into `out`. Returns False if the writer kept it busy.
+
+        On False, `out` holds a torn copy and must not be used.
+        """
+        if out is self.snapshot:
+            dst = self._dst
+        elif out is self._scratch:
+            dst = self._scratch_bytes
+        else:
+            dst = memoryview(out).cast("B")
+        for _ in range(MAX_READ_RETRIES):
+            dst[:] = self._src
+            if not out.seq & 1 and self._src_seq[0] == out.seq:
+                return True
+        return False
+
+    def read(self) -> SensorSnapshot:
+        """Refresh and return the reader's own snapshot buffer (reused across calls).
+
+        If the writer kept the block busy through every retry, the last good
+        snapshot is returned unchanged.
+        """
+        if self.readInto(self._scratch):
+            self._dst[:] = self._scratch_bytes
+        return self.snapshot
+
+    def close(self):
+        self._scratch_bytes.release()
+        self._dst.release()
+        self._src_seq.release()
+        self._src.release()
+        self._mmap.close()
+
+
+def getSensorStatesFromSnapshot(snapshot: SensorSnapshot) -> List[Dict]:
+    """Build the `getSensorStates()` list from a snapshot."""
+    mask = snapshot.lane_mask
+    return [
+        {"lane": i + 1, "is_blocked": bool(mask >> i & 1)}
+        for i in range(snapshot.num_lanes)
+    ]
+
+
+def getHardwareStatusFromSnapshot(snapshot: SensorSnapshot, is_raw: bool = False) -> Dict:
+    """Build the `/ws/status` payload from a snapshot.
+
+    With is_raw, adds the sample time and each lane's last edge time
+    (monotonic ms, None before the first edge) for diagnostic views.
+    """
+    sensors = getSensorStatesFromSnapshot(snapshot)
+    status = {
+        "is_gate_down": bool(snapshot.is_gate_down),
+        "servo_angle": snapshot.servo_angle,
+        "sensors": sensors,
+        "timestamp_ms": int(time.time() * 1000),
+    }
+    if is_raw:
+        status["sample_ms"] = snapshot.timestamp_ns / 1_000_000
+        for sensor in sensors:
+            edge_ns = snapshot.last_edge_ns[sensor["lane"] - 1]
+            sensor["last_edge_ms"] = edge_ns / 1_000_000 if edge_ns else None
+    return status
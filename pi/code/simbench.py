@@ -0,0 +1,165 @@
+"""Timing-accuracy benchmark for the real capture path on simulated hardware.
+
+Builds a RealHardware on the simhw stand-in modules, runs heats with
+known (ground-truth) finish times through it - sampler or direct polling,
+start sensor, debounce, placement and tie detection all unchanged - and
+compares what it measured with what happened:
+
+- finish error:   measured finish_time_ms minus the true time from release
+- relative error: finish error minus the heat's mean (what decides places)
+- latency:        last true finish -> timing done
+- wrong order:    lane pairs placed differently from the truth (ties aside)
+- missed ties:    identical true times that got different places
+
+Optional CPU load threads compete with the sampler and capture for the
+interpreter, as API traffic does on a Pi.
+
+Usage:
+    python cli.py simbench --heats 20 --load 2 --bounce-us 300 --glitches 2
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import simhw
+
+# Constants
+BENCH_FIRST_PIN = 17        # Lane pins 17, 18, ... (any free numbers will do)
+BENCH_START_PIN = 4
+BETWEEN_HEATS_SEC = 0.1     # Lets the last car clear its beam before the next pre-race check
+LOAD_CHUNK = 1000
+DNF_MARGIN_MS = 1000        # A car missed under load is DNF this long after the leader, not after 30s
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _describe(values_us: List[float]) -> str:
+    if not values_us:
+        return "-"
+    ordered = sorted(abs(value) for value in values_us)
+    mean = sum(values_us) / len(values_us)
+    return (f"mean {mean:+.0f}µs  p50 {_percentile(ordered, 0.5):.0f}µs  "
+            f"p99 {_percentile(ordered, 0.99):.0f}µs  max {ordered[-1]:.0f}µs")
+
+
+def _burnCpu(stop: threading.Event):
+    """Pure-Python work that holds the GIL in short slices."""
+    while not stop.is_set():
+        sum(range(LOAD_CHUNK))
+
+
+def _scoreHeat(result, truth: simhw.SimHeat, timing_done_ns: int, stats: Dict):
+    """Compare one measured heat with its ground truth."""
+    true_ms = truth.getFinishMs()
+    measured = {lane.lane_number: lane for lane in result.lane_results if lane.finish_time_ms is not None}
+    errors_us = {lane: (measured[lane].finish_time_ms - true_ms[lane]) * 1000 for lane in measured if lane in true_ms}
+    stats["finish_error_us"].extend(errors_us.values())
+    if errors_us:
+        mean_us = sum(errors_us.values()) / len(errors_us)
+        stats["relative_error_us"].extend(error_us - mean_us for error_us in errors_us.values())
+    stats["missed_finishes"] += len(set(true_ms) - set(measured))
+    stats["false_finishes"] += len(set(measured) - set(true_ms))
+    stats["uncertainty_ms"].extend(lane.finish_uncertainty_ms for lane in measured.values()
+                                   if lane.finish_uncertainty_ms is not None)
+    if truth.finish_ns:
+        stats["latency_us"].append((timing_done_ns - max(truth.finish_ns.values())) / 1000)
+    stats["ties"] += len(result.ties or [])
+    for lane_a, lane_b in combinations(sorted(set(measured) & set(true_ms)), 2):
+        place_a, place_b = measured[lane_a].place, measured[lane_b].place
+        if true_ms[lane_a] == true_ms[lane_b]:
+            stats["missed_ties"] += place_a != place_b
+        elif place_a != place_b and (place_a < place_b) != (true_ms[lane_a] < true_ms[lane_b]):
+            stats["wrong_order"] += 1
+
+
+async def runBench(heats: int = 20, num_lanes: int = 4, load_threads: int = 0, is_sampled: bool = True,
+                   has_start_sensor: bool = True, bounce_us: int = 0, glitches: int = 0,
+                   tie_lanes: Optional[List[int]] = None, finish_ms: Tuple[float, float] = simhw.FINISH_MS_RANGE,
+                   seed: Optional[int] = None, min_pulse_us: Optional[int] = None) -> Dict:
+    """Run heats on a simulated track and return the accuracy stats (see formatReport).
+
+    min_pulse_us turns on the sensor debounce (default: SENSOR_MIN_PULSE_US).
+    """
+    simhw.install()
+    from hardware import RealHardware
+    from models import HeatSetup
+
+    work_dir = tempfile.mkdtemp(prefix="simbench-")
+    lane_pins = list(range(BENCH_FIRST_PIN, BENCH_FIRST_PIN + num_lanes))
+    hardware = RealHardware(num_lanes, sensor_pins=lane_pins, config_file=os.path.join(work_dir, "servo_config.json"),
+                            start_pin=BENCH_START_PIN if has_start_sensor else None)
+    track = simhw.attach(hardware, seed)
+    track.bounce_us = bounce_us
+    track.glitches = glitches
+    track.tie_lanes = list(tie_lanes or [])
+    track.finish_ms_range = finish_ms
+    if min_pulse_us is not None:
+        settings = hardware.sensor_filter.getSettings()
+        hardware.setSensorFilter(min_pulse_us, settings["confirm_k"], settings["confirm_n"])
+    policy = hardware.finish_policy
+    policy.configure("margin", finish_ms[1] - finish_ms[0] + DNF_MARGIN_MS, policy.factor, policy.quantile)
+    if is_sampled:
+        hardware.startSampler(os.path.join(work_dir, "sensors"))
+
+    stop_load = threading.Event()
+    load = [threading.Thread(target=_burnCpu, args=(stop_load,), name=f"bench-load-{i}", daemon=True)
+            for i in range(load_threads)]
+    for thread in load:
+        thread.start()
+
+    stats = {
+        "heats": 0, "finish_error_us": [], "relative_error_us": [], "latency_us": [], "uncertainty_ms": [],
+        "missed_finishes": 0, "false_finishes": 0, "wrong_order": 0, "missed_ties": 0, "ties": 0,
+        "start_sources": {},
+    }
+    pins = [simhw.getBus().gpio.getPin(pin) for pin in hardware._input_pins]
+    reads_before = sum(pin.reads for pin in pins)
+    started = time.monotonic()
+    try:
+        for heat in range(heats):
+            hardware.prepareRace(HeatSetup(heat_id=f"bench-{heat + 1}", occupied_lanes=list(range(1, num_lanes + 1))))
+            result = await hardware.runRace()
+            _scoreHeat(result, track.getLastHeat(), hardware.timing_done_ns, stats)
+            stats["heats"] += 1
+            stats["start_sources"][result.start_source] = stats["start_sources"].get(result.start_source, 0) + 1
+            await asyncio.sleep(BETWEEN_HEATS_SEC)
+    finally:
+        stop_load.set()
+        for thread in load:
+            thread.join()
+        hardware.cleanup()
+    elapsed = time.monotonic() - started
+    stats["pin_reads_per_sec"] = (sum(pin.reads for pin in pins) - reads_before) / elapsed
+    stats["settings"] = {
+        "lanes": num_lanes, "load_threads": load_threads, "is_sampled": is_sampled,
+        "has_start_sensor": has_start_sensor, "bounce_us": bounce_us, "glitches": glitches,
+        "filter": hardware.sensor_filter.getSettings(),
+    }
+    return stats
+
+
+def formatReport(stats: Dict) -> str:
+    settings = stats["settings"]
+    uncertainty = stats["uncertainty_ms"]
+    mean_uncertainty = f"{sum(uncertainty) / len(uncertainty):.3f}ms" if uncertainty else "-"
+    lines = [
+        f"--- {stats['heats']} heats, {settings['lanes']} lanes, "
+        f"{'sampler' if settings['is_sampled'] else 'direct polling'}, {settings['load_threads']} load threads, "
+        f"start {', '.join(f'{source} x{count}' for source, count in stats['start_sources'].items())} ---",
+        f"finish error    {_describe(stats['finish_error_us'])}",
+        f"relative error  {_describe(stats['relative_error_us'])}",
+        f"latency         {_describe(stats['latency_us'])}",
+        f"uncertainty     mean {mean_uncertainty} (reported per finish)",
+        f"places          wrong order {stats['wrong_order']}  missed ties {stats['missed_ties']}  "
+        f"ties flagged {stats['ties']}",
+        f"finishes        missed {stats['missed_finishes']}  false {stats['false_finishes']}",
+        f"pin reads       {stats['pin_reads_per_sec']:.0f}/s",
+    ]
+    return "\n".join(lines)
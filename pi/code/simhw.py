@@ -0,0 +1,553 @@
+"""Simulated Raspberry Pi hardware: stand-ins for RPi.GPIO and the servo stack.
+
+install() registers fake `RPi.GPIO`, `board`, `busio`, `adafruit_pca9685`
+and `adafruit_motor.servo` modules, so RealHardware - polling, sampler,
+debounce, start sensor, splits and placement - runs unchanged on any Linux
+box. Each pin's level comes from a timeline of edges at exact
+time.monotonic_ns() times. A SimTrack attached to a hardware instance
+watches its gate servo: when the gate drops it schedules a heat (scripted
+with armHeat(), or random) on the sensor pins and keeps the ground truth,
+so measured results can be checked against what really happened (see
+simbench.py).
+
+Pins are read on the real clock, so a read returns the level at the moment
+it happens: sampling gaps, scheduling delays and load show up as timing
+error just as they would on a Pi. The GPIO edge-event API
+(add_event_detect, callbacks, event_detected, wait_for_edge) is served by
+one dispatcher thread, like the C library's.
+
+Enable with SIM_HARDWARE=1 (`cli.py serve --sim`); MakeHardware then
+builds RealHardware on these modules and attaches a SimTrack.
+"""
+
+import os
+import sys
+import time
+import types
+import bisect
+import random
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Configuration from environment (defaults for generated heats)
+SIM_RELEASE_MS = float(os.environ.get("SIM_RELEASE_MS", 60))  # Servo command to cars moving
+SIM_BOUNCE_US = int(os.environ.get("SIM_BOUNCE_US", 0))       # Sensor chatter after each car edge
+SIM_GLITCHES = int(os.environ.get("SIM_GLITCHES", 0))         # Short false pulses per lane per heat
+SIM_TIE_LANES = [int(lane) for lane in os.environ.get("SIM_TIE_LANES", "").split(",") if lane.strip()]
+
+# Constants
+HIGH = 1
+LOW = 0
+FINISH_MS_RANGE = (2500.0, 4500.0)  # Random finish times, like MockHardware
+PASS_MS_RANGE = (20.0, 40.0)        # How long a car blocks a beam
+START_PULSE_MS = 20                 # Start sensor blocked by the gate flap
+GLITCH_US = 200
+GLITCH_CLEARANCE_MS = 5             # Glitches end at least this long before the car arrives
+EDGE_KEEP_SEC = 2.0                 # Past edges kept per pin (reads only look at now)
+HEAT_HISTORY = 1000                 # Ground-truth heats kept per track
+EVENT_IDLE_SEC = 0.1
+
+
+# ----- Pins and timelines -----
+
+class SimPin:
+    """One GPIO input: an idle level plus a timeline of (time_ns, level) edges."""
+
+    def __init__(self, pin: int, idle_level: int = HIGH):
+        self.pin = pin
+        self.idle_level = idle_level
+        self.reads = 0
+        # Replaced as a whole (copy on write) so readers never need the lock
+        self._timeline: Tuple[List[int], List[int]] = ([], [])
+        self._lock = threading.Lock()
+
+    def level(self, now_ns: int) -> int:
+        times, levels = self._timeline
+        index = bisect.bisect_right(times, now_ns)
+        return levels[index - 1] if index else self.idle_level
+
+    def addEdges(self, edges: List[Tuple[int, int]]):
+        """Merge (time_ns, level) edges into the timeline; edges long past are dropped."""
+        with self._lock:
+            times, levels = self._timeline
+            keep_from = bisect.bisect_left(times, time.monotonic_ns() - int(EDGE_KEEP_SEC * 1e9))
+            if keep_from:
+                # The level before the kept edges becomes the idle level
+                self.idle_level = levels[keep_from - 1]
+            merged = sorted(list(zip(times[keep_from:], levels[keep_from:])) + list(edges))
+            self._timeline = ([t for t, _ in merged], [level for _, level in merged])
+
+    def edgesBetween(self, after_ns: int, until_ns: int) -> List[Tuple[int, int]]:
+        """Edges in (after_ns, until_ns] as (time_ns, level)."""
+        times, levels = self._timeline
+        start = bisect.bisect_right(times, after_ns)
+        end = bisect.bisect_right(times, until_ns)
+        return list(zip(times[start:end], levels[start:end]))
+
+    def nextEdgeNs(self, after_ns: int) -> Optional[int]:
+        times, _ = self._timeline
+        index = bisect.bisect_right(times, after_ns)
+        return times[index] if index < len(times) else None
+
+
+# ----- RPi.GPIO stand-in -----
+
+class SimGPIO:
+    """The subset of RPi.GPIO the controller (and an interrupt-driven capture) would use."""
+
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    HIGH = HIGH
+    LOW = LOW
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    VERSION = "sim"
+    RPI_INFO = {"TYPE": "Simulated", "P1_REVISION": 3}
+
+    def __init__(self):
+        self.pins: Dict[int, SimPin] = {}
+        self.mode: Optional[int] = None
+        self._outputs: Dict[int, int] = {}
+        self._detect: Dict[int, dict] = {}  # pin -> edge, bouncetime, callbacks, flags
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def getPin(self, pin: int) -> SimPin:
+        """The simulated input behind a pin (created idle-high if not set up yet)."""
+        if pin not in self.pins:
+            self.pins[pin] = SimPin(pin)
+        return self.pins[pin]
+
+    def addEdges(self, pin: int, edges: List[Tuple[int, int]]):
+        """Schedule edges on a pin and wake the event dispatcher."""
+        self.getPin(pin).addEdges(edges)
+        with self._cond:
+            self._cond.notify_all()
+
+    # RPi.GPIO API (names and behaviour follow the C module)
+
+    def setmode(self, mode: int):
+        self.mode = mode
+
+    def getmode(self) -> Optional[int]:
+        return self.mode
+
+    def setwarnings(self, is_enabled: bool):
+        pass
+
+    def setup(self, channel, direction: int, pull_up_down: int = PUD_OFF, initial: int = -1):
+        if self.mode is None:
+            raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)")
+        for pin in channel if isinstance(channel, (list, tuple)) else [channel]:
+            if direction == self.OUT:
+                self._outputs[pin] = initial if initial != -1 else LOW
+                continue
+            sim_pin = self.getPin(pin)
+            if not sim_pin.edgesBetween(-1, sys.maxsize):
+                sim_pin.idle_level = LOW if pull_up_down == self.PUD_DOWN else HIGH
+
+    def input(self, channel: int) -> int:
+        if channel in self._outputs:
+            return self._outputs[channel]
+        sim_pin = self.pins.get(channel)
+        if sim_pin is None:
+            raise RuntimeError("You must setup() the GPIO channel first")
+        sim_pin.reads += 1
+        return sim_pin.level(time.monotonic_ns())
+
+    def output(self, channel, value):
+        for pin in channel if isinstance(channel, (list, tuple)) else [channel]:
+            if pin not in self._outputs:
+                raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+            self._outputs[pin] = int(bool(value))
+
+    def cleanup(self, channel=None):
+        pins = list(self.pins) if channel is None else (channel if isinstance(channel, (list, tuple)) else [channel])
+        with self._cond:
+            for pin in pins:
+                self._detect.pop(pin, None)
+                self._outputs.pop(pin, None)
+            self._cond.notify_all()
+        if channel is None:
+            self.mode = None
+
+    def add_event_detect(self, channel: int, edge: int, callback: Optional[Callable] = None, bouncetime: int = 0):
+        if channel not in self.pins:
+            raise RuntimeError("You must setup() the GPIO channel first")
+        with self._cond:
+            if channel in self._detect:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            self._detect[channel] = {
+                "edge": edge,
+                "bounce_ns": (bouncetime or 0) * 1_000_000,
+                "callbacks": [callback] if callback else [],
+                "is_detected": False,
+                "last_ns": time.monotonic_ns(),  # Dispatched up to here
+                "last_event_ns": None,
+            }
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dispatchEvents, name="sim-gpio-events", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def add_event_callback(self, channel: int, callback: Callable):
+        if channel not in self._detect:
+            raise RuntimeError("Add event detection using add_event_detect first before adding a callback")
+        self._detect[channel]["callbacks"].append(callback)
+
+    def remove_event_detect(self, channel: int):
+        with self._cond:
+            self._detect.pop(channel, None)
+
+    def event_detected(self, channel: int) -> bool:
+        detect = self._detect.get(channel)
+        if not detect or not detect["is_detected"]:
+            return False
+        detect["is_detected"] = False
+        return True
+
+    def wait_for_edge(self, channel: int, edge: int, bouncetime: int = 0, timeout: Optional[int] = None) -> Optional[int]:
+        """Block until an edge (returns the channel) or the timeout in ms (returns None)."""
+        is_edge = threading.Event()
+        self.add_event_detect(channel, edge, lambda _: is_edge.set(), bouncetime)
+        try:
+            return channel if is_edge.wait(None if timeout is None else timeout / 1000) else None
+        finally:
+            self.remove_event_detect(channel)
+
+    # Event dispatch
+
+    def _isMatch(self, edge: int, level: int) -> bool:
+        return edge == self.BOTH or (edge == self.RISING) == (level == HIGH)
+
+    def _dispatchEvents(self):
+        """Fire callbacks for scheduled edges as their time comes (in one thread, like RPi.GPIO)."""
+        while True:
+            with self._cond:
+                if not self._detect:
+                    self._cond.wait(EVENT_IDLE_SEC)
+                    if not self._detect:
+                        return
+                    continue
+                next_ns = min(
+                    (edge_ns for edge_ns in (self.pins[pin].nextEdgeNs(detect["last_ns"])
+                                             for pin, detect in self._detect.items()) if edge_ns is not None),
+                    default=None,
+                )
+                now_ns = time.monotonic_ns()
+                if next_ns is None or next_ns > now_ns:
+                    wait_sec = EVENT_IDLE_SEC if next_ns is None else min(EVENT_IDLE_SEC, (next_ns - now_ns) / 1e9)
+                    self._cond.wait(wait_sec)
+                    continue
+                fired = []
+                for pin, detect in self._detect.items():
+                    sim_pin = self.pins[pin]
+                    for edge_ns, level in sim_pin.edgesBetween(detect["last_ns"], now_ns):
+                        if sim_pin.level(edge_ns - 1) == level or not self._isMatch(detect["edge"], level):
+                            continue
+                        last_event_ns = detect["last_event_ns"]
+                        if last_event_ns is not None and edge_ns - last_event_ns < detect["bounce_ns"]:
+                            continue
+                        detect["last_event_ns"] = edge_ns
+                        detect["is_detected"] = True
+                        fired.append((pin, list(detect["callbacks"])))
+                    detect["last_ns"] = now_ns
+            for pin, callbacks in fired:
+                for callback in callbacks:
+                    try:
+                        callback(pin)
+                    except Exception as e:
+                        print(f"Simulated GPIO callback error on pin {pin}: {e}")
+
+
+# ----- Servo stack stand-ins (board, busio, adafruit_pca9685, adafruit_motor.servo) -----
+
+class SimI2C:
+    """busio.I2C"""
+
+    def __init__(self, scl, sda, frequency: int = 100000):
+        self.scl = scl
+        self.sda = sda
+        self.frequency = frequency
+
+    def deinit(self):
+        pass
+
+
+class SimPWMChannel:
+    """adafruit_pca9685.PWMChannel: reports every duty cycle write to the bus."""
+
+    def __init__(self, pca: "SimPCA9685", index: int):
+        self._pca = pca
+        self.index = index
+        self._duty_cycle = 0
+
+    @property
+    def frequency(self) -> float:
+        return self._pca.frequency
+
+    @property
+    def duty_cycle(self) -> int:
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, value: int):
+        if not 0 <= value <= 0xFFFF:
+            raise ValueError(f"Out of range: value {value} not 0 <= value <= 65,535")
+        self._duty_cycle = value
+        _bus.onServoWrite(self.index, value, time.monotonic_ns())
+
+
+class SimPCA9685:
+    """adafruit_pca9685.PCA9685"""
+
+    def __init__(self, i2c_bus, *, address: int = 0x40, reference_clock_speed: int = 25000000):
+        self.i2c_bus = i2c_bus
+        self.address = address
+        self.reference_clock_speed = reference_clock_speed
+        self.frequency = 200
+        self.channels = [SimPWMChannel(self, index) for index in range(16)]
+
+    def reset(self):
+        pass
+
+    def deinit(self):
+        pass
+
+
+class SimServo:
+    """adafruit_motor.servo.Servo: angle -> pulse width -> duty cycle, as the real driver computes it."""
+
+    def __init__(self, pwm_out, *, actuation_range: int = 180, min_pulse: int = 750, max_pulse: int = 2250):
+        self._pwm_out = pwm_out
+        self.actuation_range = actuation_range
+        self._min_duty = int((min_pulse * pwm_out.frequency) / 1000000 * 0xFFFF)
+        max_duty = (max_pulse * pwm_out.frequency) / 1000000 * 0xFFFF
+        self._duty_range = int(max_duty - self._min_duty)
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if self._pwm_out.duty_cycle == 0:
+            return None
+        return (self._pwm_out.duty_cycle - self._min_duty) / self._duty_range
+
+    @fraction.setter
+    def fraction(self, value: Optional[float]):
+        if value is None:
+            self._pwm_out.duty_cycle = 0
+            return
+        if not 0.0 <= value <= 1.0:
+            raise ValueError("Must be 0.0 to 1.0")
+        self._pwm_out.duty_cycle = self._min_duty + int(value * self._duty_range)
+
+    @property
+    def angle(self) -> Optional[float]:
+        fraction = self.fraction
+        return None if fraction is None else self.actuation_range * fraction
+
+    @angle.setter
+    def angle(self, new_angle: Optional[float]):
+        if new_angle is None:
+            self.fraction = None
+            return
+        if new_angle < 0 or new_angle > self.actuation_range:
+            raise ValueError("Angle out of range")
+        self.fraction = new_angle / self.actuation_range
+
+
+# ----- Tracks: heats on the pins, with ground truth -----
+
+class SimHeat:
+    """One simulated heat's ground truth (monotonic ns)."""
+
+    def __init__(self, drop_ns: int, release_ns: int, finish_ns: Dict[int, int], split_ns: Dict[int, List[int]],
+                 is_scripted: bool):
+        self.drop_ns = drop_ns          # Servo command seen
+        self.release_ns = release_ns    # Cars start moving
+        self.finish_ns = finish_ns      # Lane -> nose breaks the finish beam (DNF lanes absent)
+        self.split_ns = split_ns        # Lane -> time at each split point
+        self.is_scripted = is_scripted
+
+    def getFinishMs(self) -> Dict[int, float]:
+        """True finish times from the release, as RealHardware should report them."""
+        return {lane: (finish_ns - self.release_ns) / 1_000_000 for lane, finish_ns in self.finish_ns.items()}
+
+
+class SimTrack:
+    """Drives one track's sensor pins from its gate servo.
+
+    The first servo write after attaching is the holding position. After
+    that every change of angle alternates release / hold: a release starts
+    the armed (or a random) heat, a hold clears the beams.
+    """
+
+    def __init__(self, lane_pins: List[int], servo_channel: int = 0, start_pin: Optional[int] = None,
+                 split_pins: Optional[List[Tuple[float, List[int]]]] = None, finish_distance_m: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.lane_pins = list(lane_pins)
+        self.servo_channel = servo_channel
+        self.start_pin = start_pin
+        self.split_pins = list(split_pins or [])  # (distance_m, pin per lane) in track order
+        self.finish_distance_m = finish_distance_m
+        self.release_ms = SIM_RELEASE_MS
+        self.bounce_us = SIM_BOUNCE_US
+        self.glitches = SIM_GLITCHES
+        self.tie_lanes = list(SIM_TIE_LANES)
+        self.finish_ms_range = FINISH_MS_RANGE
+        self.heats: Deque[SimHeat] = deque(maxlen=HEAT_HISTORY)
+        self.is_released = False
+        self._last_duty: Optional[int] = None
+        self._armed: Optional[dict] = None
+        self._random = random.Random(seed)
+
+    def armHeat(self, finish_ms: Dict[int, Optional[float]], release_ms: Optional[float] = None,
+                pass_ms: float = 30.0):
+        """Script the next heat: lane -> finish time from the release (None = DNF, stays clear)."""
+        self._armed = {"finish_ms": finish_ms, "release_ms": release_ms, "pass_ms": pass_ms}
+
+    def setBlocked(self, lane: int, is_blocked: bool):
+        """Block or clear a lane's finish beam from now on (e.g. a car parked on it)."""
+        _bus.gpio.addEdges(self.lane_pins[lane - 1], [(time.monotonic_ns(), LOW if is_blocked else HIGH)])
+
+    def getLastHeat(self) -> Optional[SimHeat]:
+        return self.heats[-1] if self.heats else None
+
+    def onServoWrite(self, duty: int, now_ns: int):
+        if self._last_duty is None or duty == self._last_duty:
+            self._last_duty = duty
+            return
+        self._last_duty = duty
+        self.is_released = not self.is_released
+        if self.is_released:
+            self._startHeat(now_ns)
+
+    def _pulse(self, pin: int, start_ns: int, length_ns: int, edges: Dict[int, List[Tuple[int, int]]]):
+        """A blocked pulse, with sensor chatter after both edges if bounce is set."""
+        pin_edges = edges.setdefault(pin, [])
+        pin_edges += [(start_ns, LOW), (start_ns + length_ns, HIGH)]
+        bounce_ns = self.bounce_us * 1000
+        if bounce_ns:
+            for edge_ns, level in ((start_ns, LOW), (start_ns + length_ns, HIGH)):
+                other = HIGH if level == LOW else LOW
+                pin_edges += [(edge_ns + bounce_ns // 3, other), (edge_ns + 2 * bounce_ns // 3, level)]
+
+    def _startHeat(self, drop_ns: int):
+        armed, self._armed = self._armed, None
+        rng = self._random
+        release_ms = self.release_ms
+        if armed and armed["release_ms"] is not None:
+            release_ms = armed["release_ms"]
+        release_ns = drop_ns + int(release_ms * 1_000_000)
+        edges: Dict[int, List[Tuple[int, int]]] = {}
+
+        if armed:
+            finish_ms = armed["finish_ms"]
+        else:
+            tie_ms = rng.uniform(*self.finish_ms_range)
+            finish_ms = {
+                lane: tie_ms if lane in self.tie_lanes else rng.uniform(*self.finish_ms_range)
+                for lane in range(1, len(self.lane_pins) + 1)
+            }
+
+        if self.start_pin is not None:
+            self._pulse(self.start_pin, release_ns, START_PULSE_MS * 1_000_000, edges)
+
+        finish_ns: Dict[int, int] = {}
+        split_ns: Dict[int, List[int]] = {}
+        finish_distance_m = self.finish_distance_m or (self.split_pins[-1][0] * 1.25 if self.split_pins else 1.0)
+        for lane, lane_ms in finish_ms.items():
+            if lane_ms is None or not 1 <= lane <= len(self.lane_pins):
+                continue
+            pass_ns = int((armed["pass_ms"] if armed else rng.uniform(*PASS_MS_RANGE)) * 1_000_000)
+            finish_ns[lane] = release_ns + int(lane_ms * 1_000_000)
+            self._pulse(self.lane_pins[lane - 1], finish_ns[lane], pass_ns, edges)
+            # Accelerating down the slope, like MockHardware's splits
+            split_ns[lane] = []
+            for distance_m, pins in self.split_pins:
+                point_ns = release_ns + int(lane_ms * 1_000_000 * min(1.0, distance_m / finish_distance_m) ** 0.7)
+                split_ns[lane].append(point_ns)
+                self._pulse(pins[lane - 1], point_ns, pass_ns, edges)
+            for _ in range(self.glitches):
+                # Clear of the car's own pulse, so the true finish edge stays exact
+                glitch_ns = release_ns + int(rng.uniform(0, max(0.0, lane_ms - GLITCH_CLEARANCE_MS)) * 1_000_000)
+                self._pulse(self.lane_pins[lane - 1], glitch_ns, GLITCH_US * 1000, edges)
+
+        for pin, pin_edges in edges.items():
+            _bus.gpio.addEdges(pin, pin_edges)
+        self.heats.append(SimHeat(drop_ns, release_ns, finish_ns, split_ns, armed is not None))
+
+
+class SimBus:
+    """Everything the stand-in modules share: the GPIO pins and the tracks listening to servo channels."""
+
+    def __init__(self):
+        self.gpio = SimGPIO()
+        self.tracks: Dict[int, SimTrack] = {}  # Servo channel -> track
+
+    def onServoWrite(self, channel: int, duty: int, now_ns: int):
+        track = self.tracks.get(channel)
+        if track:
+            track.onServoWrite(duty, now_ns)
+
+
+_bus = SimBus()
+
+
+def _makeModule(name: str, attrs: Dict) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    module.__sim__ = True
+    return module
+
+
+def install() -> SimBus:
+    """Register the stand-in modules in sys.modules (idempotent). Returns the shared bus."""
+    if getattr(sys.modules.get("RPi.GPIO"), "__sim__", False):
+        return _bus
+    gpio = _bus.gpio
+    gpio_attrs = {name: getattr(gpio, name) for name in dir(SimGPIO) if not name.startswith("_") and name.isupper()}
+    gpio_attrs.update({
+        name: getattr(gpio, name)
+        for name in ("setmode", "getmode", "setwarnings", "setup", "input", "output", "cleanup", "add_event_detect",
+                     "add_event_callback", "remove_event_detect", "event_detected", "wait_for_edge")
+    })
+    gpio_module = _makeModule("RPi.GPIO", gpio_attrs)
+    sys.modules["RPi"] = _makeModule("RPi", {"GPIO": gpio_module})
+    sys.modules["RPi.GPIO"] = gpio_module
+    sys.modules["board"] = _makeModule("board", {"SCL": 3, "SDA": 2})
+    sys.modules["busio"] = _makeModule("busio", {"I2C": SimI2C})
+    sys.modules["adafruit_pca9685"] = _makeModule("adafruit_pca9685", {"PCA9685": SimPCA9685,
+                                                                       "PWMChannel": SimPWMChannel})
+    servo_module = _makeModule("adafruit_motor.servo", {"Servo": SimServo})
+    sys.modules["adafruit_motor"] = _makeModule("adafruit_motor", {"servo": servo_module})
+    sys.modules["adafruit_motor.servo"] = servo_module
+    print("Simulated GPIO/PCA9685 modules installed")
+    return _bus
+
+
+def getBus() -> SimBus:
+    """The shared pins and tracks (e.g. to read SimPin.reads or schedule edges by hand)."""
+    return _bus
+
+
+def attach(hardware, seed: Optional[int] = None) -> SimTrack:
+    """Drive a RealHardware instance's pins from its gate servo. Returns the track (for scripting/ground truth)."""
+    track = SimTrack(
+        hardware.sensor_pins,
+        hardware.servo_channel,
+        hardware.start_pin if hardware.has_start_sensor else None,
+        [(point.distance_m, point.pins) for point in hardware.split_points],
+        hardware.finish_distance_m,
+        seed,
+    )
+    # The gate is already up: take the current duty cycle as the holding position
+    track._last_duty = hardware.pca.channels[hardware.servo_channel].duty_cycle
+    _bus.tracks[hardware.servo_channel] = track
+    return track
@@ -0,0 +1,89 @@
+"""Startup step timing and per-subsystem readiness.
+
+Startup steps (history load, hardware init, mDNS registration) run
+concurrently; the tracker records how long each took and whether it is
+pending, ready or failed so `/health` and `cli.py serve` can report it.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+# Subsystem states
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+class StartupTracker:
+    """Tracks startup step durations and subsystem readiness."""
+
+    def __init__(self):
+        self.started_ns = time.monotonic_ns()
+        self.states: Dict[str, str] = {}
+        self.timings_ms: Dict[str, float] = {}
+        self._listeners: List[Callable] = []
+        self._is_notified = False
+
+    def expect(self, *names: str):
+        """Register subsystems that must finish before startup is complete."""
+        for name in names:
+            self.states.setdefault(name, PENDING)
+
+    @contextmanager
+    def step(self, name: str):
+        """Time a startup step and mark its subsystem ready (or failed on exception)."""
+        self.states[name] = PENDING
+        step_start_ns = time.monotonic_ns()
+        try:
+            yield
+        except BaseException:
+            self.states[name] = FAILED
+            raise
+        finally:
+            self.timings_ms[name] = round((time.monotonic_ns() - step_start_ns) / 1_000_000, 1)
+            if self.states[name] == PENDING:
+                self.states[name] = READY
+            self._checkComplete()
+
+    def fail(self, name: str):
+        """Mark a subsystem failed without raising (for non-fatal steps)."""
+        self.states[name] = FAILED
+
+    def record(self, name: str, duration_ms: float):
+        """Record a timing measured elsewhere (e.g. imports before the tracker existed)."""
+        self.timings_ms[name] = round(duration_ms, 1)
+
+    def markServing(self):
+        """Record the time from tracker creation until the server accepts requests."""
+        self.record("serving", (time.monotonic_ns() - self.started_ns) / 1_000_000)
+
+    def isReady(self, *names: str) -> bool:
+        """Check that the given subsystems (default: all) are ready."""
+        return all(self.states.get(name) == READY for name in names or self.states)
+
+    @property
+    def is_complete(self) -> bool:
+        """True once no subsystem is pending."""
+        return PENDING not in self.states.values()
+
+    def onComplete(self, callback: Callable):
+        """Call `callback(tracker)` once every expected subsystem has finished."""
+        self._listeners.append(callback)
+        if self._is_notified:
+            callback(self)
+
+    def _checkComplete(self):
+        """Notify listeners the first time startup completes."""
+        if self._is_notified or not self.is_complete:
+            return
+        self._is_notified = True
+        for callback in self._listeners:
+            callback(self)
+
+    def getSummary(self) -> Dict:
+        """Get subsystem states and step timings."""
+        return {
+            "subsystems": dict(self.states),
+            "startup_ms": dict(self.timings_ms),
+        }
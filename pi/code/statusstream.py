@@ -0,0 +1,173 @@
+"""Shared hardware status stream for /ws/status subscribers.
+
+One task per track reads the hardware status at the rate of its fastest
+subscriber and hands each subscriber a frame when its own interval is due,
+so a 100Hz beam-alignment view and a 1Hz lobby display share one sample
+stream. Every subscriber has its own sender task and a one-frame mailbox:
+a slow or high-rate client only ever delays itself, and if it can't keep
+up its stale frames are replaced (coalesced) rather than queued.
+
+Subscribers choose:
+- rate_hz: MIN_STATUS_HZ-MAX_STATUS_HZ (default STATUS_STREAM_HZ)
+- lanes:   subset of lanes to report (default all)
+- mode:    "status"  - the original payload
+           "raw"     - adds sample_ms and each lane's last_edge_ms (server
+                       monotonic clock) for diagnostics
+           "summary" - adds has_changed per lane: a transition since the
+                       previous frame, so slow displays don't miss a pass
+"""
+
+import os
+import json
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+# Configuration from environment
+STATUS_STREAM_HZ = float(os.environ.get("STATUS_STREAM_HZ", 20))  # Default per-subscriber rate
+
+# Constants
+MIN_STATUS_HZ = 0.5
+MAX_STATUS_HZ = 100
+STATUS_MODES = ("status", "raw", "summary")
+RAW_FIELDS = ("sample_ms",)
+RAW_SENSOR_FIELDS = ("last_edge_ms",)
+
+
+def _stripRaw(sensor: Dict) -> Dict:
+    return {field: value for field, value in sensor.items() if field not in RAW_SENSOR_FIELDS}
+
+
+class StatusSubscriber:
+    """One /ws/status client's settings, mailbox and counters."""
+
+    def __init__(self, rate_hz: float = STATUS_STREAM_HZ, lanes: Optional[List[int]] = None,
+                 mode: str = "status"):
+        self.is_paused = False
+        self.frames_sent = 0
+        self.frames_dropped = 0       # Replaced before the client took them
+        self._frame: Optional[str] = None
+        self._has_frame = asyncio.Event()
+        self._next_ns = 0
+        self._last_sample_ms: Optional[float] = None
+        self._last_blocked: Dict[int, bool] = {}
+        self.configure(rate_hz, lanes, mode)
+
+    def configure(self, rate_hz: float, lanes: Optional[List[int]], mode: str):
+        """Change settings (ValueError if invalid); takes effect on the next tick."""
+        if not MIN_STATUS_HZ <= rate_hz <= MAX_STATUS_HZ:
+            raise ValueError(f"rate_hz must be {MIN_STATUS_HZ}-{MAX_STATUS_HZ}")
+        if mode not in STATUS_MODES:
+            raise ValueError(f"Unknown mode '{mode}' (use {', '.join(STATUS_MODES)})")
+        self.rate_hz = rate_hz
+        self.interval_ns = int(1_000_000_000 / rate_hz)
+        self.lanes = set(lanes) if lanes else None
+        self.mode = mode
+        self._next_ns = 0
+
+    def getSettings(self) -> Dict:
+        return {
+            "rate_hz": self.rate_hz,
+            "lanes": sorted(self.lanes) if self.lanes else None,
+            "mode": self.mode,
+        }
+
+    def isDue(self, now_ns: int) -> bool:
+        if self.is_paused or now_ns < self._next_ns:
+            return False
+        self._next_ns += self.interval_ns
+        if self._next_ns <= now_ns:
+            # Fell behind (or first frame) - restart the schedule rather than burst
+            self._next_ns = now_ns + self.interval_ns
+        return True
+
+    def offer(self, frame: str):
+        """Put a frame in the mailbox, replacing one the client hasn't taken yet."""
+        if self._frame is not None:
+            self.frames_dropped += 1
+        self._frame = frame
+        self._has_frame.set()
+
+    async def next(self) -> str:
+        """Wait for the next frame."""
+        await self._has_frame.wait()
+        self._has_frame.clear()
+        frame, self._frame = self._frame, None
+        self.frames_sent += 1
+        return frame
+
+    def buildSummary(self, sample: Dict, sensors: List[Dict]) -> Dict:
+        """Summary frame data: per-lane has_changed since this subscriber's previous frame."""
+        last_sample_ms = self._last_sample_ms
+        summary = []
+        for sensor in sensors:
+            edge_ms = sensor.get("last_edge_ms")
+            has_changed = self._last_blocked.get(sensor["lane"], sensor["is_blocked"]) != sensor["is_blocked"]
+            if edge_ms is not None and last_sample_ms is not None and edge_ms > last_sample_ms:
+                has_changed = True
+            self._last_blocked[sensor["lane"]] = sensor["is_blocked"]
+            summary.append({**_stripRaw(sensor), "has_changed": has_changed})
+        self._last_sample_ms = sample.get("sample_ms")
+        return {**{field: value for field, value in sample.items() if field not in RAW_FIELDS}, "sensors": summary}
+
+
+class StatusStream:
+    """Reads one status sample per tick and fans it out to every subscriber at its own rate."""
+
+    def __init__(self, read_sample: Callable[[], Awaitable[Dict]]):
+        self._read_sample = read_sample  # Track._readStatusSample
+        self._subscribers: Set[StatusSubscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.samples_read = 0
+
+    def subscribe(self, subscriber: StatusSubscriber) -> StatusSubscriber:
+        self._subscribers.add(subscriber)
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: StatusSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def getTickHz(self) -> float:
+        active = [subscriber.rate_hz for subscriber in self._subscribers if not subscriber.is_paused]
+        return max(active) if active else STATUS_STREAM_HZ
+
+    async def _run(self):
+        """Sample at the fastest subscriber's rate until the last one leaves."""
+        next_ns = time.monotonic_ns()
+        while self._subscribers:
+            now_ns = time.monotonic_ns()
+            due = [subscriber for subscriber in self._subscribers if subscriber.isDue(now_ns)]
+            if due:
+                try:
+                    self._publish(await self._read_sample(), due)
+                except Exception as e:
+                    print(f"Status stream error: {e}")
+            next_ns += int(1_000_000_000 / self.getTickHz())
+            delay_ns = next_ns - time.monotonic_ns()
+            if delay_ns < 0:
+                next_ns = time.monotonic_ns()  # Behind - don't try to catch up
+                delay_ns = 0
+            await asyncio.sleep(delay_ns / 1_000_000_000)
+
+    def _publish(self, sample: Dict, due: List[StatusSubscriber]):
+        """Build and offer frames; identical settings share one encoded frame."""
+        self.samples_read += 1
+        encoded: Dict[tuple, str] = {}
+        for subscriber in due:
+            sensors = sample["sensors"]
+            if subscriber.lanes:
+                sensors = [sensor for sensor in sensors if sensor["lane"] in subscriber.lanes]
+            if subscriber.mode == "summary":
+                subscriber.offer(json.dumps({"type": "hardware_status", "data": subscriber.buildSummary(sample, sensors)}))
+                continue
+            key = (subscriber.mode, tuple(sorted(subscriber.lanes)) if subscriber.lanes else None)
+            if key not in encoded:
+                if subscriber.mode == "raw":
+                    data = {**sample, "sensors": sensors}
+                else:
+                    data = {field: value for field, value in sample.items() if field not in RAW_FIELDS}
+                    data["sensors"] = [_stripRaw(sensor) for sensor in sensors]
+                encoded[key] = json.dumps({"type": "hardware_status", "data": data})
+            subscriber.offer(encoded[key])
@@ -1,68 +1,195 @@
-"""JSON file-based storage for heat history."""
+"""JSON file-based storage for heat history.
+
+The JSON file holds the hot set of recent heats. Older heats are moved to
+compressed archive segments (see archive.py) instead of being dropped.
+
+The file is a JSON array with one compact heat per line, most recent first,
+so it can either be loaded whole or indexed by line without decoding (lazy
+mode, HISTORY_LAZY_LOAD=1).
+
+The stores aren't thread-safe, and history is read from threadpool routes
+while the event loop saves heats, so every access to `heats` goes through
+the manager's lock. The file rewrite encodes a snapshot outside the lock.
+"""
 
 import json
 import os
-from typing import List, Optional
+import time
+import threading
+from typing import Iterator, List, Optional
 from datetime import datetime
 
+from heatstore import HeatStore, MappedHeatStore
+from archive import HeatArchive, ARCHIVE_DIR
+
 # Constants
 HISTORY_FILE = "heat_history.json"
-MAX_HISTORY = 1000
+MAX_HISTORY = 1000        # Heats kept in the hot store
+ARCHIVE_BATCH_SIZE = 250  # Heats moved to the archive at a time
+IS_LAZY_LOAD = os.environ.get("HISTORY_LAZY_LOAD") == "1"
 
 
 class HistoryManager:
     """Manages persistent storage of heat results."""
     
-    def __init__(self, file_path: str = HISTORY_FILE):
+    def __init__(self, file_path: str = HISTORY_FILE, archive_dir: str = ARCHIVE_DIR,
+                 is_lazy: bool = IS_LAZY_LOAD):
         self.file_path = file_path
+        self.is_lazy = is_lazy
+        self.version = 0  # Bumped on every change, for response caches
+        self._lock = threading.Lock()  # Guards self.heats (see module docstring)
+        
+        load_start_ns = time.monotonic_ns()
+        self._file_signature = self._getFileSignature()
         self.heats = self._loadHistory()
+        self.load_ms = (time.monotonic_ns() - load_start_ns) / 1_000_000
+        mode = "lazy index" if self.is_lazy else "full load"
+        print(f"Loaded {len(self.heats)} heats in {self.load_ms:.1f}ms ({mode})")
+        
+        self.archive = HeatArchive(archive_dir)
     
-    def _loadHistory(self) -> list:
-        """Load history from disk."""
+    def _loadHistory(self):
+        """Load history from disk into the columnar store, or just index it in lazy mode."""
         if os.path.exists(self.file_path):
             try:
+                if self.is_lazy:
+                    try:
+                        return MappedHeatStore(self.file_path)
+                    except ValueError:
+                        # Older pretty-printed file - load it once, rewritten on next save
+                        print("History file not line-indexed, doing a full load")
                 with open(self.file_path, "r") as f:
-                    return json.load(f)
+                    # File is most recent first, the store is oldest first
+                    return HeatStore(reversed(json.load(f)))
             except (json.JSONDecodeError, IOError):
                 # Corrupted file, start fresh but back up the old one
                 backup_path = f"{self.file_path}.backup.{int(datetime.now().timestamp())}"
                 os.rename(self.file_path, backup_path)
-                return []
-        return []
+                return HeatStore()
+        return HeatStore()
+    
+    def _getFileSignature(self) -> Optional[tuple]:
+        """Identify the current contents of the history file (mtime, size)."""
+        try:
+            stat = os.stat(self.file_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def reloadIfChanged(self) -> bool:
+        """Reload if another process (the hardware daemon) rewrote the file."""
+        signature = self._getFileSignature()
+        if signature == self._file_signature:
+            return False
+        self._file_signature = signature
+        heats = self._loadHistory()
+        archive = HeatArchive(self.archive.archive_dir)
+        with self._lock:
+            self.heats = heats
+            self.archive = archive
+            self.version += 1
+        return True
     
     def _saveHistory(self):
         """Persist history to disk."""
         # Write to temp file first, then rename for atomicity
+        with self._lock:
+            heats = self.heats.snapshot()
         temp_path = f"{self.file_path}.tmp"
-        with open(temp_path, "w") as f:
-            json.dump(self.heats, f, indent=2, default=str)
+        with open(temp_path, "wb") as f:
+            f.write(b"[\n")
+            f.write(b",\n".join(heats.encodedLines()))
+            f.write(b"\n]\n")
         os.replace(temp_path, self.file_path)
+        self._file_signature = self._getFileSignature()
     
     def saveHeat(self, heat_result: dict):
-        """Save a heat result, maintaining max history limit."""
-        # Remove existing entry with same heat_id if present (update case)
-        self.heats = [h for h in self.heats if h.get("heat_id") != heat_result.get("heat_id")]
-        
-        # Insert at beginning (most recent first)
-        self.heats.insert(0, heat_result)
+        """Save a heat result and write the history file."""
+        self.addHeat(heat_result)
+        self.flush()
+    
+    def addHeat(self, heat_result: dict):
+        """Add a heat in memory.
         
-        # Trim to max history
-        self.heats = self.heats[:MAX_HISTORY]
+        Readers see it at once; call flush() (safe from a worker thread while
+        the event loop keeps reading) to persist it.
+        """
+        with self._lock:
+            # Replaces any existing entry with same heat_id (update case)
+            self.heats.put(heat_result)
+            self.version += 1
+    
+    def flush(self):
+        """Archive the oldest heats once the hot store is full, then persist history to disk.
         
-        # Persist to disk
+        Does the compression and fsyncs, so call it from a worker thread.
+        """
+        self._archiveOldest()
         self._saveHistory()
     
+    def _archiveOldest(self):
+        """Move a batch to the archive rather than trimming one heat per save.
+        
+        Heats leave the hot store only once the archive holds them durably,
+        so a crash or archive error never loses a heat (at worst it exists in
+        both places and the hot copy wins).
+        """
+        with self._lock:
+            if len(self.heats) < MAX_HISTORY + ARCHIVE_BATCH_SIZE:
+                return
+            oldest = self.heats.peekOldest(len(self.heats) - MAX_HISTORY)
+        self.archive.archiveHeats(oldest)
+        with self._lock:
+            for heat in oldest:
+                self.heats.delete(heat["heat_id"])
+            self.version += 1
+    
     def getHeats(self, limit: int = 100) -> list:
         """Get most recent heats."""
-        return self.heats[:limit]
+        with self._lock:
+            return self.heats.recent(limit)
     
     def getHeatById(self, heat_id: str) -> Optional[dict]:
-        """Get a specific heat by ID."""
-        for heat in self.heats:
-            if heat.get("heat_id") == heat_id:
-                return heat
-        return None
+        """Get a specific heat by ID, falling back to the archive."""
+        with self._lock:
+            heat = self.heats.get(heat_id)
+        if heat is None:
+            heat = self.archive.getHeat(heat_id)
+        return heat
+    
+    def iterHeatsInRange(self, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield heats that started within [start, end] across archive and hot store, oldest first.
+        
+        The hot store is snapshotted when this is called, so the iterator can
+        be consumed slowly or from another thread (e.g. a streaming export)
+        while heats are saved. Each heat_id is yielded once, even if it gets
+        archived meanwhile.
+        """
+        with self._lock:
+            heats = self.heats.snapshot()
+        return self._iterHeatsInRange(heats, start, end)
+    
+    def _iterHeatsInRange(self, heats, start: Optional[datetime],
+                          end: Optional[datetime]) -> Iterator[dict]:
+        for heat in self.archive.iterRange(start, end):
+            # Hot store holds the newer copy of any re-saved heat
+            if heat.get("heat_id") not in heats:
+                yield heat
+        for heat in heats.iterRange(start, end):
+            yield heat
+    
+    def getHeatsInRange(self, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, limit: int = 1000) -> list:
+        """Get up to `limit` heats that started within [start, end], oldest first."""
+        heats = []
+        for heat in self.iterHeatsInRange(start, end):
+            if len(heats) >= limit:
+                break
+            heats.append(heat)
+        return heats
     
     def getLastHeat(self) -> Optional[dict]:
         """Get the most recent heat."""
-        return self.heats[0] if self.heats else None
+        with self._lock:
+            return self.heats.last()
@@ -0,0 +1,290 @@
+"""Multi-track configuration.
+
+One controller can host several physical tracks (e.g. two or three tracks
+on one Pi sharing a PCA9685). Each track has its own servo channel, sensor
+pins, calibration file, shared sensor state and history partition, and
+runs its heats independently of the others.
+
+Without TRACKS_CONFIG a single track is built from the existing settings
+(NUM_TRACKS, SERVO_CHANNEL, SENSOR_PIN_n) and keeps the original file
+names, so single-track installs are unchanged. TRACKS_CONFIG points to a
+JSON file:
+
+    {"tracks": [
+        {"name": "red",  "num_lanes": 4, "servo_channel": 0, "sensor_pins": [17, 27, 22, 23]},
+        {"name": "blue", "num_lanes": 4, "servo_channel": 1, "sensor_pins": [5, 6, 13, 19]}
+    ]}
+
+The first track is the default: unprefixed routes act on it, and every
+track is reachable under /tracks/{name}/...
+
+A track may add split points - extra sensors partway down, one per lane,
+ordered from the start - for split times and trap speeds:
+
+    {"name": "red", "sensor_pins": [17, 27, 22, 23], "finish_distance_m": 10.5,
+     "split_points": [{"name": "mid", "distance_m": 5.0, "pins": [5, 6, 13, 19]}]}
+
+The single env-configured track reads the same list from SPLIT_POINTS (JSON)
+and FINISH_DISTANCE_M.
+"""
+
+import os
+import re
+import json
+import asyncio
+from typing import Dict, List, Optional
+
+from models import TrackConfig
+from storage import HistoryManager, HISTORY_FILE
+from archive import ARCHIVE_DIR
+from hardware import MakeHardware, CONFIG_FILE, SERVO_CHANNEL
+from sensorstate import SENSOR_STATE_PATH
+from resultstream import ResultStream
+from httpcache import ResponseCache
+from finishpolicy import LEARNED_SAMPLES
+from postrace import PostRacePipeline, PIPELINE_JOURNAL
+from statusstream import StatusStream
+
+# Configuration from environment
+TRACKS_CONFIG = os.environ.get("TRACKS_CONFIG")  # JSON file listing tracks
+TRACK_NAME = os.environ.get("TRACK_NAME", "main")  # Name of the single track without TRACKS_CONFIG
+NUM_TRACKS = int(os.environ.get("NUM_TRACKS", 4))
+SPLIT_POINTS = os.environ.get("SPLIT_POINTS")  # JSON list of split points for the single track
+FINISH_DISTANCE_M = float(os.environ["FINISH_DISTANCE_M"]) if os.environ.get("FINISH_DISTANCE_M") else None
+
+# Names appear in URLs and file names
+TRACK_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def loadTrackConfigs(config_path: Optional[str] = TRACKS_CONFIG) -> List[TrackConfig]:
+    """Load track definitions, or a single default track from env settings."""
+    if not config_path:
+        config = TrackConfig(
+            name=TRACK_NAME, num_lanes=NUM_TRACKS, servo_channel=SERVO_CHANNEL,
+            split_points=json.loads(SPLIT_POINTS) if SPLIT_POINTS else [],
+            finish_distance_m=FINISH_DISTANCE_M,
+        )
+        _checkSplitPoints(config)
+        _checkPins([config])
+        return [config]
+    
+    with open(config_path, "r") as f:
+        configs = [TrackConfig(**track) for track in json.load(f)["tracks"]]
+    
+    if not configs:
+        raise ValueError(f"No tracks defined in {config_path}")
+    names = set()
+    channels = set()
+    for config in configs:
+        if not TRACK_NAME_PATTERN.match(config.name):
+            raise ValueError(f"Invalid track name '{config.name}' (use letters, digits, - and _)")
+        if config.name in names:
+            raise ValueError(f"Duplicate track name '{config.name}'")
+        if config.servo_channel in channels:
+            raise ValueError(f"Servo channel {config.servo_channel} used by more than one track")
+        _checkSplitPoints(config)
+        names.add(config.name)
+        channels.add(config.servo_channel)
+    _checkPins(configs)
+    return configs
+
+
+def _checkPins(configs: List[TrackConfig]):
+    """Every lane needs its own pin, and no pin may serve two sensors on any track."""
+    owners: Dict[int, str] = {}
+    
+    def claim(pin: int, owner: str):
+        if pin in owners:
+            raise ValueError(f"GPIO pin {pin} is used by both {owners[pin]} and {owner}")
+        owners[pin] = owner
+    
+    for config in configs:
+        if config.sensor_pins and len(config.sensor_pins) != config.num_lanes:
+            raise ValueError(f"Track '{config.name}' has {config.num_lanes} lanes but "
+                             f"{len(config.sensor_pins)} sensor_pins")
+        for lane, pin in enumerate(config.sensor_pins, start=1):
+            claim(pin, f"lane {lane} on track '{config.name}'")
+        if config.start_pin is not None:
+            claim(config.start_pin, f"the start sensor on track '{config.name}'")
+        for point in config.split_points:
+            for lane, pin in enumerate(point.pins, start=1):
+                claim(pin, f"split '{point.name}' lane {lane} on track '{config.name}'")
+    
+    # Tracks without sensor_pins read SENSOR_PIN_n, so at most one may leave them out
+    on_defaults = [config.name for config in configs if not config.sensor_pins]
+    if len(on_defaults) > 1:
+        raise ValueError(f"Tracks {', '.join(on_defaults)} would share the SENSOR_PIN_n pins; "
+                         f"give each its own sensor_pins")
+
+
+def _checkSplitPoints(config: TrackConfig):
+    """Split points need a pin per lane and must be in order down the track."""
+    prev_distance_m = 0.0
+    for point in config.split_points:
+        if len(point.pins) != config.num_lanes:
+            raise ValueError(f"Split point '{point.name}' on track '{config.name}' needs "
+                             f"{config.num_lanes} pins (one per lane)")
+        if point.distance_m <= prev_distance_m:
+            raise ValueError(f"Split points on track '{config.name}' must be in increasing distance from the start")
+        prev_distance_m = point.distance_m
+    if config.finish_distance_m is not None and config.finish_distance_m <= prev_distance_m:
+        raise ValueError(f"finish_distance_m on track '{config.name}' must be beyond the last split point")
+
+
+class Track:
+    """One physical track: its hardware, history and WebSocket clients."""
+    
+    def __init__(self, config: TrackConfig, is_default: bool = False):
+        self.config = config
+        self.name = config.name
+        self.is_default = is_default
+        self.hardware = None
+        self.history_manager: Optional[HistoryManager] = None
+        self.active_websockets: List = []
+        self.results = ResultStream()
+        self.response_cache = ResponseCache()
+        self.pipeline: Optional[PostRacePipeline] = None  # Only where history is written
+        self.status_stream = StatusStream(self._readStatusSample)
+    
+    def _partition(self, base_path: str) -> str:
+        """Per-track file name; the default track keeps the original name."""
+        if self.is_default:
+            return base_path
+        root, ext = os.path.splitext(base_path)
+        return f"{root}_{self.name}{ext}"
+    
+    @property
+    def history_file(self) -> str:
+        return self._partition(HISTORY_FILE)
+    
+    @property
+    def archive_dir(self) -> str:
+        return self._partition(ARCHIVE_DIR)
+    
+    @property
+    def calibration_file(self) -> str:
+        return self._partition(CONFIG_FILE)
+    
+    @property
+    def sensor_state_path(self) -> str:
+        return self._partition(SENSOR_STATE_PATH)
+    
+    @property
+    def journal_file(self) -> str:
+        return self._partition(PIPELINE_JOURNAL)
+    
+    def loadHistory(self) -> HistoryManager:
+        """Load this track's heat history (blocking)."""
+        self.history_manager = HistoryManager(self.history_file, self.archive_dir)
+        self._seedFinishPolicy()
+        return self.history_manager
+    
+    def initHardware(self):
+        """Initialize this track's servo and sensors and start its sampler (blocking)."""
+        self.hardware = MakeHardware(
+            self.config.num_lanes,
+            self.config.servo_channel,
+            self.config.sensor_pins or None,
+            self.calibration_file,
+            self.config.start_pin,
+            self.config.split_points,
+            self.config.finish_distance_m,
+        )
+        self.hardware.setEventCallback(self.broadcastEvent)
+        self.hardware.startSampler(self.sensor_state_path)
+        self._seedFinishPolicy()
+        return self.hardware
+    
+    def _seedFinishPolicy(self):
+        """Give the learned finish policy recent times (once history and hardware are both loaded)."""
+        finish_policy = getattr(self.hardware, "finish_policy", None)  # Not on RemoteHardware
+        if finish_policy and self.history_manager:
+            finish_policy.seed(self.history_manager.getHeats(LEARNED_SAMPLES))
+    
+    async def startPipeline(self, broadcast=None):
+        """Start the post-race stage that persists and broadcasts heats (after history is loaded)."""
+        self.pipeline = PostRacePipeline(self.journal_file, self._persistHeat, broadcast or self.broadcastResult)
+        await self.pipeline.start()
+    
+    async def _persistHeat(self, result: dict):
+        """Add a heat to history; archiving and the file rewrite run in a thread so the loop keeps serving."""
+        self.history_manager.addHeat(result)
+        await asyncio.to_thread(self.history_manager.flush)
+    
+    def getPipelineStatus(self) -> Dict:
+        """Post-race queue and turnaround timings, plus whether the next heat can start."""
+        return {**self.pipeline.getStatus(), "is_ready": not self.hardware.is_racing}
+    
+    def retryPipeline(self) -> Dict:
+        """Queue heats whose persist failed again; returns the pipeline status."""
+        self.pipeline.retryFailed()
+        return self.getPipelineStatus()
+    
+    async def broadcastResult(self, result: dict, seq: Optional[int] = None, stream_id: Optional[str] = None):
+        """Number a race result and broadcast it to this track's WebSocket and SSE clients."""
+        message = json.dumps(self.results.publish(result, seq, stream_id))
+        # Copy: clients come and go (and replays take one off) during the sends
+        for ws in list(self.active_websockets):
+            try:
+                await ws.send_text(message)
+            except Exception:
+                if ws in self.active_websockets:
+                    self.active_websockets.remove(ws)
+    
+    async def broadcastEvent(self, event: dict):
+        """Send a live, unnumbered event (race_start, split) to this track's WebSocket clients.
+        
+        Unlike results these aren't buffered for replay - they only matter while the heat runs.
+        """
+        message = json.dumps(event)
+        for ws in list(self.active_websockets):
+            try:
+                await ws.send_text(message)
+            except Exception:
+                if ws in self.active_websockets:
+                    self.active_websockets.remove(ws)
+    
+    async def onDaemonEvent(self, event: str, data: dict):
+        """Handle events published by the hardware daemon for this track."""
+        if event == "connected":
+            # May have missed heats while disconnected - and can't replay them
+            await asyncio.to_thread(self.history_manager.reloadIfChanged)
+            self.results.reset()
+        elif event == "race_result":
+            # Daemon already persisted and numbered the heat
+            await asyncio.to_thread(self.history_manager.reloadIfChanged)
+            await self.broadcastResult(data["data"], data["seq"], data["stream_id"])
+        elif event in ("race_start", "split"):
+            await self.broadcastEvent(data)
+    
+    async def _readStatusSample(self) -> Dict:
+        """One raw status sample for the status stream."""
+        if getattr(self.hardware, "is_status_rpc", False):
+            # Blocking daemon call (up to its timeout) - keep it off the loop
+            return await asyncio.to_thread(self.hardware.getHardwareStatus, is_raw=True)
+        return self.hardware.getHardwareStatus(is_raw=True)
+    
+    def getInfo(self) -> Dict:
+        """Summary for GET /tracks."""
+        status = self.hardware.getStatus()
+        return {
+            "name": self.name,
+            "num_lanes": status["num_tracks"],
+            "servo_channel": self.config.servo_channel,
+            "is_gate_down": status["is_gate_down"],
+            "current_heat_id": status["current_heat_id"],
+            "is_default": self.is_default,
+        }
+    
+    def cleanup(self):
+        if self.hardware and hasattr(self.hardware, "cleanup"):
+            self.hardware.cleanup()
+
+
+def MakeTracks(configs: Optional[List[TrackConfig]] = None) -> Dict[str, Track]:
+    """Create tracks by name; the first one is the default."""
+    configs = configs or loadTrackConfigs()
+    return {
+        config.name: Track(config, is_default=(index == 0))
+        for index, config in enumerate(configs)
+    }
@@ -33,6 +33,9 @@ eval "$SCP_CMD -r setup/* $PI_USER@$PI_HOST:$REMOTE_DIR/setup/"
 echo ""
 echo "Files deployed successfully!"
 
+# Split mode (opt-in, see README): restart the hardware daemon first if it's enabled
+eval "$SSH_CMD $PI_USER@$PI_HOST 'systemctl is-enabled --quiet track-hardware 2>/dev/null && sudo systemctl restart track-hardware && echo Hardware daemon restarted || true'"
+
 # Check if service exists and restart it
 echo ""
 echo "Restarting track-api service..."
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The controller's modules live flat in pi/code
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
@@ -0,0 +1,67 @@
+"""CSV export round trip."""
+
+import csv
+import io
+
+from export import CSV_COLUMNS, iterExport
+from heatstore import HeatStore
+from models import FinishEvidence, HeatResult, LaneResult, TieGroup
+
+
+def _optionalFloat(value: str):
+    return float(value) if value else None
+
+
+def _tiedHeat() -> HeatResult:
+    return HeatResult(
+        heat_id="heat-7",
+        started_at="2024-01-15T10:00:00",
+        finished_at="2024-01-15T10:00:04.5",
+        is_complete=True,
+        start_source="sensor",
+        release_ms=12.5,
+        lane_results=[
+            LaneResult(lane_number=1, finish_time_ms=2950.12, place=1, finish_speed_mps=4.812,
+                       finish_uncertainty_ms=0.5, is_tie=True),
+            LaneResult(lane_number=2, finish_time_ms=2950.31, place=1, finish_speed_mps=4.809,
+                       finish_uncertainty_ms=0.5, is_tie=True),
+            LaneResult(lane_number=3, finish_time_ms=3120.4, place=3, finish_uncertainty_ms=0.5),
+            LaneResult(lane_number=4, is_dnf=True),
+        ],
+        ties=[TieGroup(place=1, lanes=[1, 2], spread_ms=0.19, evidence=[
+            FinishEvidence(lane_number=1, edge_ns=2950120000, window_ns=500000),
+            FinishEvidence(lane_number=2, edge_ns=2950310000, window_ns=500000),
+        ])],
+    )
+
+
+def testTiedHeatRoundTripsThroughCsv():
+    heat = _tiedHeat()
+    store = HeatStore()
+    store.put(heat.model_dump(mode="json"))
+
+    exported = b"".join(iterExport(store.iterHeats(), "csv")).decode("utf-8")
+    reader = csv.DictReader(io.StringIO(exported))
+    assert reader.fieldnames == CSV_COLUMNS
+    rows = list(reader)
+    assert len(rows) == len(heat.lane_results)
+
+    for row in rows:
+        assert row["heat_id"] == heat.heat_id
+        assert row["is_complete"] == "True"
+        assert row["start_source"] == heat.start_source
+        assert float(row["release_ms"]) == heat.release_ms
+
+    lanes = [
+        LaneResult(
+            lane_number=int(row["lane_number"]),
+            finish_time_ms=_optionalFloat(row["finish_time_ms"]),
+            place=int(row["place"]) if row["place"] else None,
+            is_dnf=row["is_dnf"] == "True",
+            finish_speed_mps=_optionalFloat(row["finish_speed_mps"]),
+            finish_uncertainty_ms=_optionalFloat(row["finish_uncertainty_ms"]),
+            is_tie=row["is_tie"] == "True",
+        )
+        for row in rows
+    ]
+    assert lanes == heat.lane_results